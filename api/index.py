@@ -10,44 +10,62 @@ Calculator, Notes, and more.
 
 import os
 import re
+import sys
 import json
 import math
 import time
 import datetime
 import random
+import hashlib
+import unicodedata
 
 from flask import Flask, request, jsonify
 import requests
 
-try:
-    import wikipedia
-    HAS_WIKIPEDIA = True
-except ImportError:
-    HAS_WIKIPEDIA = False
+# Shared modules live at the repository root (bundled via vercel.json includeFiles)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from slots import extract
+from normalize import normalize
+from records import Note, Result, RecordJSONProvider, json_default
+from conversions import RateTable, answer as conversion_answer
+from users import UserSettings, USER_KEYS, open_overlay_store, public_settings
+from logs import log, error_fields
 
 # ============================================
 # APP SETUP
 # ============================================
 
 app = Flask(__name__)
+app.json = RecordJSONProvider(app)
+
+# The instance can be frozen once a response is out, so no background log writer
+log.configure(sync=True)
 
 # ============================================
 # CONFIGURATION (from environment variables)
 # ============================================
 
-config = {
+defaults = {
     'assistant_name': os.environ.get('ASSISTANT_NAME', 'Diya'),
     'weather_city': os.environ.get('WEATHER_CITY', 'Delhi'),
     'weather_api_key': os.environ.get('WEATHER_API_KEY', ''),
     'youtube_api_key': os.environ.get('YOUTUBE_API_KEY', ''),
     'voice_speed': 150,
     'voice_volume': 1.0,
-    'language': 'en'
+    'language': os.environ.get('ASSISTANT_LANGUAGE', 'en')
 }
 
+# Per-user overlays on those defaults: in Redis when REDIS_URL is set,
+# otherwise in memory for as long as the instance stays warm
+users = UserSettings(open_overlay_store(None, os.environ.get('REDIS_URL')), defaults)
+config = users.config
+
 # In-memory notes (wiped on cold start — serverless limitation)
 notes_store = []
 
+# Exchange rates: built-in table, refreshed in memory while the instance is warm
+rate_table = RateTable(fetch=lambda: requests.get('https://open.er-api.com/v6/latest/USD', timeout=10).json())
+
 
 # ============================================
 # COMMAND PROCESSING ENGINE
@@ -55,35 +73,41 @@ notes_store = []
 
 def process_command(user_input):
     """Process a user command and return a response dict."""
-    text = user_input.strip()
-    lower = text.lower()
+    text = unicodedata.normalize('NFKC', user_input).strip()
+    lower = normalize(text, config.get('language', 'en'))
 
     # ---- WAKE WORD ----
     wake_names = ['hey diya', 'hey ' + config['assistant_name'].lower()]
     for wake in wake_names:
         if lower.startswith(wake):
-            after = text[len(wake):].strip()
-            if after:
-                return process_command(after)
-            return resp("Hey! I'm here. How can I help you?")
+            lower = lower[len(wake):].strip()
+            if not lower:
+                return resp("Hey! I'm here. How can I help you?")
+            text = text[len(wake):].lstrip(' ,.!') if text.lower().startswith(wake) else lower
+            break
+
+    # ---- CONVERSIONS (units, currencies, dates) ----
+    conversion = conversion_answer(lower, rates=rate_table)
+    if conversion:
+        return resp(conversion[0], action='conversion', data=conversion[1])
 
     # ---- TIME ----
-    if any(kw in lower for kw in ['time', 'samay', 'baje']):
-        if any(kw in lower for kw in ['what', 'tell', 'current', 'kya', 'kitne', 'batao']):
+    if 'time' in lower:
+        if any(kw in lower for kw in ['what', 'tell', 'current']):
             now = datetime.datetime.now()
             time_str = now.strftime('%I:%M %p')
             return resp(f"The current time is {time_str}.")
 
+    # ---- WEATHER ----
+    if any(kw in lower for kw in ['weather', 'temperature']):
+        return handle_weather(lower)
+
     # ---- DATE ----
-    if any(kw in lower for kw in ['date', 'today', 'din', 'tarikh']):
+    if any(kw in lower for kw in ['date', 'today']):
         now = datetime.datetime.now()
         date_str = now.strftime('%A, %B %d, %Y')
         return resp(f"Today is {date_str}.")
 
-    # ---- WEATHER ----
-    if any(kw in lower for kw in ['weather', 'temperature', 'mausam', 'taapmaan']):
-        return handle_weather(lower)
-
     # ---- OPEN WEBSITES (send URL to frontend) ----
     websites = {
         'youtube': ('https://www.youtube.com', 'YouTube'),
@@ -115,7 +139,7 @@ def process_command(user_input):
 
     # ---- WEB SEARCH ----
     if lower.startswith('search') or lower.startswith('google') or 'search for' in lower:
-        query = re.sub(r'^(search|google|search for)\s*', '', text, flags=re.IGNORECASE).strip()
+        query = (extract('search', text) or extract('search', lower)).get('query')
         if query:
             url = f"https://www.google.com/search?q={requests.utils.quote(query)}"
             return resp(
@@ -127,22 +151,17 @@ def process_command(user_input):
 
     # ---- PLAY MUSIC / YOUTUBE ----
     if 'play' in lower:
-        query = re.sub(r'^.*?play\s*', '', text, flags=re.IGNORECASE).strip()
-        query = re.sub(r'^(a |the |some |me )?(song |music |video |gaana |gana )?', '', query, flags=re.IGNORECASE).strip()
-        search_term = query or 'relaxing music'
+        search_term = (extract('play', text) or extract('play', lower)).get('query') or 'relaxing music'
         return handle_youtube_search(search_term)
 
     # ---- CALCULATOR ----
     if 'calculate' in lower or ('what is' in lower and re.search(r'[\d+\-*/^%]', lower)):
-        expr = re.sub(r'^.*?(calculate|what is|what\'s)\s*', '', text, flags=re.IGNORECASE).strip()
-        return handle_calculation(expr)
+        return handle_calculation(extract('calculate', lower).get('expr', ''))
 
     # Math words
-    math_match = re.search(r'(\d+\.?\d*)\s*(plus|minus|times|multiplied by|divided by|into|x)\s*(\d+\.?\d*)', lower)
-    if math_match:
-        a = float(math_match.group(1))
-        op = math_match.group(2)
-        b = float(math_match.group(3))
+    math_slots = extract('arithmetic', lower)
+    if math_slots:
+        a, op, b = math_slots['a'], math_slots['op'], math_slots['b']
         result = None
         if op == 'plus': result = a + b
         elif op == 'minus': result = a - b
@@ -152,13 +171,9 @@ def process_command(user_input):
 
     # ---- NOTES ----
     if any(kw in lower for kw in ['take a note', 'save a note', 'note down', 'remember this']):
-        content = re.sub(r'^.*?(take a note|save a note|note down|remember this)\s*', '', text, flags=re.IGNORECASE).strip()
+        content = (extract('note', text) or extract('note', lower)).get('content')
         if content:
-            note = {
-                'id': int(time.time() * 1000),
-                'content': content,
-                'time': datetime.datetime.now().strftime('%d %b %Y, %I:%M %p')
-            }
+            note = Note.new(content)
             notes_store.append(note)
             return resp(f'Got it! I\'ve saved your note: "{content}".', action='note_saved', data=note)
         return resp("What would you like me to note down?")
@@ -175,7 +190,7 @@ def process_command(user_input):
         return resp("All notes have been cleared!", action='notes_cleared')
 
     # ---- GREETINGS ----
-    if re.match(r'^(hi|hello|hey|namaste|namaskar|hola|good morning|good afternoon|good evening)', lower):
+    if re.match(r'^(hi|hello|hey|hola|good morning|good afternoon|good evening)', lower):
         hour = datetime.datetime.now().hour
         greeting = 'Good morning' if hour < 12 else ('Good afternoon' if hour < 17 else 'Good evening')
         responses = [
@@ -194,7 +209,7 @@ def process_command(user_input):
 
     # ---- WIKIPEDIA ----
     if any(kw in lower for kw in ['tell me about', 'who is', 'what is', 'wikipedia', 'explain']):
-        query = re.sub(r'^.*?(tell me about|who is|what is|wikipedia|explain)\s*', '', text, flags=re.IGNORECASE).strip()
+        query = (extract('wikipedia', text) or extract('wikipedia', lower)).get('query')
         if query:
             return handle_wikipedia(query)
 
@@ -233,12 +248,8 @@ def process_command(user_input):
 # ============================================
 
 def resp(text, action=None, data=None):
-    """Build a standard response dict."""
-    return {
-        'response': text,
-        'action': action,
-        'data': data
-    }
+    """Build a standard response (a Result record; the same JSON as before)."""
+    return Result(text, action, data)
 
 
 def handle_weather(lower):
@@ -247,10 +258,7 @@ def handle_weather(lower):
     if not api_key:
         return resp("Weather API key is not configured. Please add it in Settings.")
 
-    city = config.get('weather_city', 'Delhi')
-    city_match = re.search(r'(?:weather|temperature)\s+(?:in|at|of|for)\s+(.+)', lower)
-    if city_match:
-        city = city_match.group(1).strip()
+    city = extract('weather', lower).get('city') or config.get('weather_city', 'Delhi')
 
     try:
         url = f"http://api.openweathermap.org/data/2.5/weather?q={city}&appid={api_key}&units=metric"
@@ -329,7 +337,7 @@ def handle_youtube_search(query):
                     }
                 )
     except Exception as e:
-        print(f"YouTube error: {e}")
+        log.error('youtube_search_error', query=query, **error_fields(e))
 
     url = f"https://www.youtube.com/results?search_query={requests.utils.quote(query)}"
     return resp(
@@ -341,7 +349,10 @@ def handle_youtube_search(query):
 
 def handle_wikipedia(query):
     """Fetch a Wikipedia summary."""
-    if not HAS_WIKIPEDIA:
+    # Imported on first use so cold starts don't pay for it
+    try:
+        import wikipedia
+    except ImportError:
         return resp("Wikipedia module is not available.")
     try:
         summary = wikipedia.summary(query, sentences=3)
@@ -377,6 +388,11 @@ def handle_calculation(expr):
 # FLASK ROUTES
 # ============================================
 
+@app.before_request
+def activate_user():
+    users.activate((request.headers.get('X-Diya-User') or request.args.get('user') or '')[:64])
+
+
 @app.route('/api/health')
 def api_health():
     return jsonify({
@@ -405,15 +421,39 @@ def api_settings():
         return '', 200
     if request.method == 'POST':
         data = request.get_json(force=True)
-        config['assistant_name'] = data.get('assistant_name', config['assistant_name'])
-        config['weather_city'] = data.get('weather_city', config['weather_city'])
-        config['weather_api_key'] = data.get('weather_api_key', config['weather_api_key'])
+        user = users.current().user
+        if not user:
+            return jsonify({'error': 'Settings are per user; send an X-Diya-User header'}), 400
+        users.update(user, {k: v for k, v in data.items() if k in USER_KEYS})
         return jsonify({'status': 'ok'})
-    return jsonify({
-        'assistant_name': config['assistant_name'],
-        'weather_city': config['weather_city'],
-        'weather_api_key': config.get('weather_api_key', ''),
-    })
+    shown = ('assistant_name', 'weather_city', 'weather_api_key')
+    return jsonify(public_settings({k: config.get(k, '') for k in shown}))
+
+
+@app.route('/api/bootstrap', methods=['GET'])
+def api_bootstrap():
+    """Health, settings, the newest notes and suggested commands in one ETag-validated response."""
+    settings = users.current().settings
+    body = json.dumps({
+        'health': {'status': 'ok', 'assistant': settings['assistant_name'], 'version': '1.0.0',
+                   'platform': 'vercel', 'websocket': {'enabled': False}},
+        'settings': public_settings({k: settings[k] for k in ('assistant_name', 'weather_city', 'weather_api_key')}),
+        'notes': {'items': notes_store[-20:], 'total': len(notes_store)},
+        'suggestions': [
+            {'label': '🌤 Weather', 'command': f"What's the weather in {settings['weather_city']}?"},
+            {'label': '🕐 Time', 'command': 'What time is it?'},
+            {'label': '😄 Joke', 'command': 'Tell me a joke'},
+            {'label': '▶ YouTube', 'command': 'Open YouTube'},
+            {'label': '🎶 Music', 'command': 'Play relaxing music'},
+            {'label': '💡 Help', 'command': 'What can you do?'},
+        ],
+        'assets': {},   # static files are served by Vercel's CDN, which versions them itself
+    }, ensure_ascii=False, sort_keys=True, default=json_default).encode('utf-8')
+    reply = app.response_class(body, mimetype='application/json')
+    reply.set_etag(hashlib.sha1(body).hexdigest()[:16])
+    reply.headers['Cache-Control'] = 'private, no-cache'
+    reply.vary.add('X-Diya-User')
+    return reply.make_conditional(request)
 
 
 @app.route('/api/notes', methods=['GET', 'OPTIONS'])
@@ -428,11 +468,7 @@ def api_add_note():
     data = request.get_json(force=True)
     content = data.get('content', '').strip()
     if content:
-        note = {
-            'id': int(time.time() * 1000),
-            'content': content,
-            'time': datetime.datetime.now().strftime('%d %b %Y, %I:%M %p')
-        }
+        note = Note.new(content)
         notes_store.append(note)
         return jsonify(note)
     return jsonify({'error': 'No content'}), 400
@@ -451,7 +487,7 @@ def api_delete_note(note_id):
     if request.method == 'OPTIONS':
         return '', 200
     global notes_store
-    notes_store = [n for n in notes_store if n['id'] != note_id]
+    notes_store = [n for n in notes_store if n.id != note_id]
     return jsonify({'status': 'deleted'})
 
 
@@ -0,0 +1,368 @@
+"""
+============================================
+DIYA — Server-Side Audio Ingestion
+============================================
+Lets headless devices stream raw microphone
+audio instead of running speech recognition in
+a browser. Audio is 16-bit little-endian mono
+PCM at ?rate= Hz (16000 by default), sent as:
+
+  POST /api/audio          chunked upload; the reply
+                           lists every segment heard
+  /ws/audio                binary frames of PCM; one
+                           JSON message per segment
+
+Both take ?session_id= and ?user_id= (or the
+X-Diya-User header): commands heard on the
+stream run with that user's settings.
+
+Chunks are framed as zero-copy NumPy views and
+run through a vectorized energy / zero-crossing
+voice activity detector. Only voiced segments
+reach the ASR backend ('vosk', or 'fake' for
+tests), and only transcripts that start with a
+wake phrase (or follow one within WAKE_WINDOW
+seconds) become commands.
+
+A silent chunk costs one max/min scan: if its
+peak is below the quietest voiced level, no
+frame is looked at. Background noise costs one
+vectorized VAD pass; frames are only walked one
+by one around speech.
+============================================
+"""
+
+import json
+import time
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+
+np = None    # numpy, imported on first use (see load_numpy)
+
+from channel import Client, websocket_route
+from records import json_default
+from logs import log
+
+SAMPLE_RATE = 16000
+RATES = (8000, 16000, 22050, 32000, 44100, 48000)
+FRAME_MS = 20
+ENERGY_DB = -45          # dBFS a frame needs to count as voiced (with a speech-like ZCR)
+LOUD_DB = -30            # dBFS above which a frame counts as voiced whatever its ZCR
+ZCR_MAX = 0.35           # zero crossings per sample; hiss and fans sit above this
+START_MS = 60            # voiced audio needed to open a segment
+HANGOVER_MS = 400        # silence that closes a segment
+PREROLL_MS = 200         # audio kept from before a segment opens
+MAX_SEGMENT_S = 12       # segments are cut at this length
+MIN_SEGMENT_MS = 200     # shorter segments are dropped as clicks
+
+WAKE_WINDOW = 8          # seconds after a bare wake phrase that a command is accepted
+ASR_WORKERS = 2          # transcriptions running at once per process
+COMMAND_WORKERS = 8      # transcribed commands (with their upstream calls) running at once per process
+READ_SIZE = 8192         # bytes read per step from an HTTP upload
+IDLE_TIMEOUT = 60        # seconds a /ws/audio stream may send nothing
+
+# Peak amplitude below which no frame can reach ENERGY_DB (RMS <= peak)
+SILENCE_PEAK = int(32768 * 10 ** (ENERGY_DB / 20))
+
+
+# ============================================
+# VOICE ACTIVITY DETECTION
+# ============================================
+
+def load_numpy():
+    """Import numpy the first time audio is handled (None if it isn't installed)."""
+    global np
+    if np is None:
+        try:
+            import numpy
+        except ImportError:
+            return None
+        np = numpy
+    return np
+
+
+def voiced_frames(frames):
+    """Boolean mask of voiced rows in an (n, frame_len) int16 array."""
+    np = load_numpy()
+    frame_len = frames.shape[1]
+    full_scale = frame_len * 32768.0 ** 2
+    # Thresholds compared as sums of squares, so no float copy and no log per frame
+    energy = np.einsum('ij,ij->i', frames, frames, dtype=np.int64)
+    signs = np.signbit(frames)
+    crossings = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1)
+    loud = energy > full_scale * 10 ** (LOUD_DB / 10)
+    speech_like = (energy > full_scale * 10 ** (ENERGY_DB / 10)) & (crossings < ZCR_MAX * frame_len)
+    return loud | speech_like
+
+
+class VoiceSegmenter:
+    """Cuts a PCM byte stream into voiced segments (int16 arrays)."""
+
+    def __init__(self, rate=SAMPLE_RATE):
+        if load_numpy() is None:
+            raise RuntimeError("audio ingestion needs numpy")
+        self.rate = rate
+        self.frame_len = rate * FRAME_MS // 1000
+        self.frame_bytes = self.frame_len * 2
+        self.start_frames = max(1, START_MS // FRAME_MS)
+        self.hangover_frames = HANGOVER_MS // FRAME_MS
+        self.max_frames = MAX_SEGMENT_S * 1000 // FRAME_MS
+        self.min_frames = MIN_SEGMENT_MS // FRAME_MS
+        self.pending = b''
+        self.preroll = deque(maxlen=PREROLL_MS // FRAME_MS)
+        self.segment = None
+        self.voiced_run = 0
+        self.silent_run = 0
+
+    def feed(self, data):
+        """Add PCM bytes; returns the segments that finished in them."""
+        if self.pending:
+            data = self.pending + data
+        usable = len(data) - len(data) % self.frame_bytes
+        self.pending = bytes(data[usable:]) if usable < len(data) else b''
+        if not usable:
+            return []
+        # Views over the received buffer: no copy until a segment is kept
+        samples = np.frombuffer(data, dtype='<i2', count=usable // 2)
+        frames = samples.reshape(-1, self.frame_len)
+
+        if self.segment is None and max(int(samples.max()), -int(samples.min())) < SILENCE_PEAK:
+            self.preroll.extend(frames[-self.preroll.maxlen:])
+            self.voiced_run = 0
+            return []
+
+        voiced = voiced_frames(frames)
+        if self.segment is None and not voiced.any():
+            self.preroll.extend(frames[-self.preroll.maxlen:])
+            self.voiced_run = 0
+            return []
+
+        done = []
+        for frame, voiced in zip(frames, voiced.tolist()):
+            if self.segment is None:
+                self.preroll.append(frame)
+                self.voiced_run = self.voiced_run + 1 if voiced else 0
+                if self.voiced_run >= self.start_frames:
+                    self.segment = list(self.preroll)
+                    self.preroll.clear()
+                    self.silent_run = 0
+                continue
+            self.segment.append(frame)
+            self.silent_run = 0 if voiced else self.silent_run + 1
+            if self.silent_run >= self.hangover_frames or len(self.segment) >= self.max_frames:
+                done.extend(self._close())
+        return done
+
+    def flush(self):
+        """End of stream: return the open segment, if any."""
+        self.pending = b''
+        return self._close() if self.segment is not None else []
+
+    def _close(self):
+        frames = self.segment[:len(self.segment) - self.silent_run] if self.silent_run else self.segment
+        self.segment = None
+        self.voiced_run = self.silent_run = 0
+        if len(frames) < self.min_frames:
+            return []
+        return [np.concatenate(frames)]
+
+
+# ============================================
+# ASR BACKENDS
+# ============================================
+
+class FakeASR:
+    """Test backend: answers each segment with the next queued transcript."""
+
+    def __init__(self, transcripts=()):
+        self.transcripts = deque(transcripts)
+        self.segments = []   # seconds of audio per segment received
+
+    def transcribe(self, samples, rate):
+        self.segments.append(len(samples) / rate)
+        return self.transcripts.popleft() if self.transcripts else ''
+
+
+class VoskASR:
+    """Offline recognition with a Vosk model directory (pip install vosk)."""
+
+    def __init__(self, model):
+        from vosk import Model
+        self.model = Model(model)
+
+    def transcribe(self, samples, rate):
+        from vosk import KaldiRecognizer
+        recognizer = KaldiRecognizer(self.model, rate)
+        recognizer.AcceptWaveform(samples.tobytes())
+        return json.loads(recognizer.FinalResult()).get('text', '')
+
+
+ASR_BACKENDS = {'fake': FakeASR, 'vosk': VoskASR}
+
+
+def load_asr(name, model=''):
+    if name not in ASR_BACKENDS:
+        raise ValueError(f"unknown ASR backend {name!r}")
+    return ASR_BACKENDS[name](model) if name != 'fake' else FakeASR()
+
+
+# ============================================
+# STREAMS & WAKE GATING
+# ============================================
+
+class WakeGate:
+    """Admits transcripts that start with a wake phrase, or the one right after a bare wake."""
+
+    def __init__(self, window=WAKE_WINDOW):
+        self.window = window
+        self.awake_until = 0.0
+
+    def admit(self, lower, phrases):
+        now = time.monotonic()
+        for phrase in phrases:
+            if lower.startswith(phrase):
+                # "hey diya" alone opens the window; "hey diya, open youtube" is self-contained
+                self.awake_until = now + self.window if not lower[len(phrase):].strip() else 0.0
+                return True
+        if now < self.awake_until:
+            self.awake_until = 0.0
+            return True
+        return False
+
+
+class AudioStream:
+    """One microphone: its segmenter, wake state and in-order command chain."""
+
+    def __init__(self, ingest, rate, session_id, user_id=''):
+        self.ingest = ingest
+        self.rate = rate
+        self.session_id = session_id
+        self.user_id = user_id
+        self.segmenter = VoiceSegmenter(rate)
+        self.gate = WakeGate()
+        self.last = None
+
+    def feed(self, data):
+        self.ingest.stats['bytes'] += len(data)
+        return self.segmenter.feed(data)
+
+    def submit(self, segment, deliver=None):
+        """
+        Transcribe a segment on the ASR pool, then gate and run it on the command pool.
+        A segment's command starts only once the previous one's is done (the wake gate
+        must see them in order), but no thread waits for that: each step schedules the next.
+        Returns a Future of the segment's event.
+        """
+        done = Future()
+        transcript = self.ingest.pool.submit(self._transcribe, segment)
+        previous, self.last = self.last, done
+
+        def start(_):
+            self.ingest.commands.submit(self._command, segment, transcript, done, deliver)
+
+        if previous is None:
+            transcript.add_done_callback(start)
+        else:
+            transcript.add_done_callback(lambda _: previous.add_done_callback(start))
+        return done
+
+    def _transcribe(self, segment):
+        self.ingest.stats['segments'] += 1
+        try:
+            return self.ingest.backend().transcribe(segment, self.rate).strip()
+        except Exception as e:
+            log.error('asr_error', error=str(e))
+            return ''
+
+    def _command(self, segment, transcript, done, deliver):
+        text = transcript.result()
+        result = None
+        if text:
+            try:
+                result = self.ingest.on_transcript(self, text)
+            except Exception as e:
+                log.error('audio_command_error', error=str(e))
+        self.ingest.stats['commands' if result is not None else 'ignored'] += 1
+        event = {'type': 'segment', 'seconds': round(len(segment) / self.rate, 2),
+                 'transcript': text, 'ignored': result is None, 'result': result}
+        try:
+            if deliver:
+                deliver(event)
+        finally:
+            done.set_result(event)
+
+
+class AudioIngest:
+    """Per-process audio front end: ASR backend, transcription pool and endpoints."""
+
+    def __init__(self, on_transcript, backend_config):
+        """
+        on_transcript(stream, text) -> response dict, or None when the wake gate drops it
+        backend_config() -> (backend name, model path); '' disables ingestion
+        """
+        self.on_transcript = on_transcript
+        self.backend_config = backend_config
+        self.asr = None
+        self.asr_config = None
+        self.lock = threading.Lock()
+        self.pool = ThreadPoolExecutor(max_workers=ASR_WORKERS, thread_name_prefix='asr')
+        # Commands wait on upstream services; they must never hold up transcription
+        self.commands = ThreadPoolExecutor(max_workers=COMMAND_WORKERS, thread_name_prefix='audio-command')
+        self.stats = {'streams': 0, 'bytes': 0, 'segments': 0, 'commands': 0, 'ignored': 0}
+
+    def ready(self):
+        return bool(self.backend_config()[0]) and load_numpy() is not None
+
+    def backend(self):
+        """The configured ASR backend, (re)loaded when the config changes."""
+        wanted = self.backend_config()
+        if self.asr is None or self.asr_config != wanted:
+            with self.lock:
+                if self.asr is None or self.asr_config != wanted:
+                    self.asr, self.asr_config = load_asr(*wanted), wanted
+        return self.asr
+
+    def open_stream(self, rate, session_id='', user_id=''):
+        self.stats['streams'] += 1
+        return AudioStream(self, rate, session_id, user_id)
+
+    def attach(self, app, path='/ws/audio'):
+        """Register the streaming WebSocket route if flask-sock is installed."""
+        return websocket_route(app, path, 'ws_audio', self.serve)
+
+    def serve(self, ws):
+        from flask import request
+        from simple_websocket import ConnectionClosed
+        client = Client(ws)
+        if not self.ready():
+            client.send(json.dumps({'type': 'error', 'error': 'audio ingestion is not configured'}))
+            return
+        rate = request.args.get('rate', SAMPLE_RATE, type=int)
+        if rate not in RATES:
+            client.send(json.dumps({'type': 'error', 'error': f'unsupported rate {rate}'}))
+            return
+        user_id = request.args.get('user_id') or request.headers.get('X-Diya-User') or ''
+        stream = self.open_stream(rate, request.args.get('session_id', '')[:64], user_id[:64])
+        deliver = lambda event: client.send(json.dumps(event, ensure_ascii=False, default=json_default))
+        try:
+            while not client.closed:
+                message = ws.receive(timeout=IDLE_TIMEOUT)
+                if message is None:
+                    break   # the microphone went away
+                if isinstance(message, str):
+                    if json.loads(message).get('type') == 'end':
+                        for segment in stream.segmenter.flush():
+                            stream.submit(segment, deliver)
+                    continue
+                for segment in stream.feed(message):
+                    stream.submit(segment, deliver)
+        except (ConnectionClosed, ValueError):
+            pass
+        finally:
+            if stream.last is not None:
+                stream.last.result()   # let queued segments finish before closing
+            client.close()
+
+    def snapshot(self):
+        return dict(self.stats, enabled=self.ready())
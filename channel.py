@@ -0,0 +1,259 @@
+"""
+============================================
+DIYA — WebSocket Command Channel
+============================================
+One long-lived connection per browser carries
+commands, their responses and server-pushed
+events, instead of a fresh POST /api/command
+per utterance. Needs the optional flask-sock
+package; without it /ws is simply not served
+and clients stay on HTTP.
+
+Messages are JSON text frames:
+
+  -> {"id": 7, "type": "command", "command": "...", "session_id": "..."}
+  <- {"id": 7, "type": "result", "result": {...}}
+  <- {"id": 7, "type": "error", "error": "busy", "retry_ms": 250}
+  <- {"type": "ping"}        -> {"type": "pong"}
+  <- {"type": "event", "event": "cache_refreshed", "data": {...}}
+
+A client names its session in the URL
+(/ws?session_id=...) or in its commands; events
+that belong to one session (a reminder, the end
+of its server-side speech) go only to that
+session's sockets.
+
+Ids let a client pipeline several commands;
+results come back as they finish, in any order.
+A connection may have MAX_IN_FLIGHT commands
+running and a process MAX_PENDING; past that
+the command is refused with "busy" rather than
+queued. The server pings after a quiet
+HEARTBEAT_INTERVAL and drops the connection if
+the next interval is silent too.
+============================================
+"""
+
+import json
+import threading
+import importlib.util
+from concurrent.futures import ThreadPoolExecutor
+
+from logs import log
+
+# flask-sock is only looked up here; it is imported when the first socket connects
+HAS_SOCK = importlib.util.find_spec('flask_sock') is not None
+
+HEARTBEAT_INTERVAL = 25      # seconds of silence before the server pings
+MAX_IN_FLIGHT = 8            # commands running per connection
+MAX_PENDING = 256            # commands running per process (all connections)
+COMMAND_WORKERS = 32         # threads running channel commands
+SEND_TIMEOUT = 5             # seconds a reply may wait on a slow reader
+EVENT_SEND_TIMEOUT = 0.1     # pushed events are best-effort
+MAX_MESSAGE = 16 * 1024      # bytes per incoming frame
+BUSY_RETRY_MS = 250
+
+
+class _Capture:
+    """Stands in for a blueprint so Sock.route hands us its wrapped view."""
+
+    def __init__(self, views):
+        self.views = views
+
+    def route(self, path, **options):
+        return self.views.append
+
+
+def websocket_route(app, path, endpoint, handler):
+    """Serve handler(ws) as a WebSocket route, if flask-sock is installed."""
+    if not HAS_SOCK:
+        return False
+    views = []
+
+    def connect(**kwargs):
+        if not views:
+            from flask_sock import Sock
+            Sock().route(path, bp=_Capture(views))(handler)
+        return views[0](**kwargs)
+
+    app.add_url_rule(path, endpoint, connect, websocket=True)
+    return True
+
+
+class Client:
+    """One connected socket."""
+
+    __slots__ = ('ws', 'send_lock', 'in_flight', 'lock', 'closed', 'session')
+
+    def __init__(self, ws, session=''):
+        self.ws = ws
+        self.session = session
+        self.send_lock = threading.Lock()
+        self.in_flight = 0
+        self.lock = threading.Lock()
+        self.closed = False
+
+    def send(self, payload, timeout=SEND_TIMEOUT):
+        """Send one frame; a reader too slow to take it within timeout is disconnected."""
+        if self.closed:
+            return False
+        if not self.send_lock.acquire(timeout=timeout):
+            if timeout >= SEND_TIMEOUT:
+                self.close()
+            return False
+        try:
+            self.ws.send(payload)
+            return True
+        except Exception:
+            self.close()
+            return False
+        finally:
+            self.send_lock.release()
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            try:
+                self.ws.close()
+            except Exception:
+                pass
+
+
+class CommandHub:
+    """Serves /ws: runs commands off the socket's thread and pushes events to clients."""
+
+    def __init__(self, run_command):
+        """run_command(message) -> the JSON text of the command's response."""
+        self.run_command = run_command
+        self.clients = set()
+        self.sessions = {}      # session id -> its connected clients
+        self.lock = threading.Lock()
+        self.pending = threading.BoundedSemaphore(MAX_PENDING)
+        self.pool = ThreadPoolExecutor(max_workers=COMMAND_WORKERS, thread_name_prefix='ws-command')
+        self.enabled = False
+        self.stats = {'connections': 0, 'commands': 0, 'busy': 0, 'dropped': 0}
+
+    def attach(self, app, path='/ws'):
+        """Register the WebSocket route if flask-sock is installed."""
+        self.enabled = websocket_route(app, path, 'ws_command', self.serve)
+        return self.enabled
+
+    def serve(self, ws):
+        from flask import request
+        from simple_websocket import ConnectionClosed
+        client = Client(ws)
+        with self.lock:
+            self.clients.add(client)
+            self.stats['connections'] += 1
+        self.bind_session(client, request.args.get('session_id', '')[:64])
+        try:
+            quiet = False
+            while not client.closed:
+                message = ws.receive(timeout=HEARTBEAT_INTERVAL)
+                if message is None:
+                    if quiet:
+                        self.stats['dropped'] += 1
+                        break  # no answer to the last ping
+                    quiet = True
+                    client.send('{"type":"ping"}')
+                    continue
+                quiet = False
+                self.handle(client, message)
+        except ConnectionClosed:
+            pass
+        finally:
+            self.bind_session(client, '')
+            with self.lock:
+                self.clients.discard(client)
+            client.close()
+
+    def bind_session(self, client, session):
+        """Index client under session (moving it from any previous one)."""
+        if session == client.session:
+            return
+        with self.lock:
+            if client.session:
+                peers = self.sessions.get(client.session)
+                if peers is not None:
+                    peers.discard(client)
+                    if not peers:
+                        del self.sessions[client.session]
+            client.session = session
+            if session:
+                self.sessions.setdefault(session, set()).add(client)
+
+    def handle(self, client, message):
+        if len(message) > MAX_MESSAGE:
+            client.send(json.dumps({'type': 'error', 'error': 'message too large'}))
+            return
+        try:
+            msg = json.loads(message)
+            kind = msg.get('type', 'command')
+        except (ValueError, AttributeError):
+            client.send(json.dumps({'type': 'error', 'error': 'invalid JSON'}))
+            return
+        if kind == 'pong':
+            return
+        if kind == 'ping':
+            client.send(json.dumps({'id': msg.get('id'), 'type': 'pong'}))
+            return
+        if kind != 'command':
+            client.send(json.dumps({'id': msg.get('id'), 'type': 'error', 'error': f'unknown type {kind!r}'}))
+            return
+
+        if msg.get('session_id'):
+            self.bind_session(client, str(msg['session_id'])[:64])
+        with client.lock:
+            accepted = client.in_flight < MAX_IN_FLIGHT and self.pending.acquire(blocking=False)
+            if accepted:
+                client.in_flight += 1
+        if not accepted:
+            self.stats['busy'] += 1
+            client.send(json.dumps({'id': msg.get('id'), 'type': 'error', 'error': 'busy', 'retry_ms': BUSY_RETRY_MS}))
+            return
+        self.stats['commands'] += 1
+        self.pool.submit(self._run, client, msg)
+
+    def _run(self, client, msg):
+        msg_id = json.dumps(msg.get('id'))
+        try:
+            body = self.run_command(msg)
+            payload = f'{{"id":{msg_id},"type":"result","result":{body}}}'
+        except Exception as e:
+            log.error('channel_command_error', error=str(e))
+            payload = f'{{"id":{msg_id},"type":"error","error":"internal error"}}'
+        finally:
+            self.pending.release()
+            with client.lock:
+                client.in_flight -= 1
+        client.send(payload)
+
+    def broadcast(self, event, data=None):
+        """Push an event to every connected client (skipping any that are mid-send)."""
+        payload = json.dumps({'type': 'event', 'event': event, 'data': data}, ensure_ascii=False)
+        with self.lock:
+            clients = list(self.clients)
+        for client in clients:
+            client.send(payload, timeout=EVENT_SEND_TIMEOUT)
+        return len(clients)
+
+    def send_to(self, session, event, data=None):
+        """Push an event to one session's clients only (none when session is empty)."""
+        if not session:
+            return 0
+        payload = json.dumps({'type': 'event', 'event': event, 'data': data}, ensure_ascii=False)
+        with self.lock:
+            clients = list(self.sessions.get(session, ()))
+        for client in clients:
+            client.send(payload, timeout=EVENT_SEND_TIMEOUT)
+        return len(clients)
+
+    def close_all(self):
+        """Disconnect everyone (on worker shutdown); clients reconnect elsewhere."""
+        with self.lock:
+            clients = list(self.clients)
+        for client in clients:
+            client.close()
+
+    def snapshot(self):
+        return dict(self.stats, enabled=self.enabled, clients=len(self.clients), sessions=len(self.sessions))
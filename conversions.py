@@ -0,0 +1,680 @@
+"""
+============================================
+DIYA — Offline Conversions
+============================================
+Units, currencies and date arithmetic answered
+locally instead of a web search:
+
+  "convert 5 km to miles"
+  "100 usd in inr" / "how many grams in a pound"
+  "what day is 45 days from today"
+  "how many days until christmas"
+
+Unit aliases resolve to (dimension, factor to
+the dimension's base unit, offset) through one
+table built at import, so a conversion is two
+dict lookups and a multiply. Exchange rates
+come from a RateTable: a built-in seed, a local
+JSON copy that survives restarts, refreshed in
+the background when it gets old (never while a
+command waits). Grammars are compiled once and
+answers are memoized per (command, day, rates).
+
+Shared by main.py (skills/convert.py) and the
+serverless api/index.py. Commands come in the
+normalized, lowercase form (see normalize.py).
+============================================
+"""
+
+import os
+import re
+import json
+import time
+import calendar
+import datetime
+import threading
+from functools import lru_cache
+
+from normalize import EN_NUMBERS
+from logs import log
+
+# ============================================
+# UNITS
+# ============================================
+# dimension -> [(singular, plural, other aliases, factor to the base unit)]
+# Base units: metre, square metre, litre, kilogram, second, metre per second,
+# byte, joule, watt, pascal, kelvin. Temperatures carry (factor, offset).
+
+UNIT_TABLE = {
+    'length': [
+        ('millimetre', 'millimetres', 'mm, millimeter, millimeters', 0.001),
+        ('centimetre', 'centimetres', 'cm, cms, centimeter, centimeters', 0.01),
+        ('metre', 'metres', 'm, meter, meters, mtr, mtrs', 1.0),
+        ('kilometre', 'kilometres', 'km, kms, kilometer, kilometers', 1000.0),
+        ('micrometre', 'micrometres', 'micron, microns, micrometer, micrometers', 1e-6),
+        ('inch', 'inches', '', 0.0254),
+        ('foot', 'feet', 'ft', 0.3048),
+        ('yard', 'yards', 'yd, yds', 0.9144),
+        ('mile', 'miles', 'mi', 1609.344),
+        ('nautical mile', 'nautical miles', 'nmi', 1852.0),
+        ('light year', 'light years', 'lightyear, lightyears', 9.4607304725808e15),
+    ],
+    'area': [
+        ('square centimetre', 'square centimetres', 'cm2, cm², sq cm, square centimeter, square centimeters', 1e-4),
+        ('square metre', 'square metres', 'm2, m², sq m, sqm, square meter, square meters', 1.0),
+        ('square kilometre', 'square kilometres', 'km2, km², sq km, square kilometer, square kilometers', 1e6),
+        ('square inch', 'square inches', 'sq in, in2, in²', 0.00064516),
+        ('square foot', 'square feet', 'sq ft, sqft, ft2, ft²', 0.09290304),
+        ('square yard', 'square yards', 'sq yd, yd2, yd², gaj', 0.83612736),
+        ('square mile', 'square miles', 'sq mi, mi2, mi²', 2589988.110336),
+        ('acre', 'acres', '', 4046.8564224),
+        ('hectare', 'hectares', 'ha', 10000.0),
+    ],
+    'volume': [
+        ('millilitre', 'millilitres', 'ml, milliliter, milliliters', 0.001),
+        ('litre', 'litres', 'l, liter, liters, ltr, ltrs', 1.0),
+        ('cubic centimetre', 'cubic centimetres', 'cc, cm3, cm³, cubic centimeter, cubic centimeters', 0.001),
+        ('cubic metre', 'cubic metres', 'm3, m³, cubic meter, cubic meters', 1000.0),
+        ('cubic inch', 'cubic inches', 'in3, in³', 0.016387064),
+        ('cubic foot', 'cubic feet', 'ft3, ft³', 28.316846592),
+        ('gallon', 'gallons', 'gal, us gallon, us gallons', 3.785411784),
+        ('imperial gallon', 'imperial gallons', 'uk gallon, uk gallons', 4.54609),
+        ('quart', 'quarts', 'qt', 0.946352946),
+        ('pint', 'pints', 'pt', 0.473176473),
+        ('cup', 'cups', '', 0.2365882365),
+        ('fluid ounce', 'fluid ounces', 'fl oz', 0.0295735295625),
+        ('tablespoon', 'tablespoons', 'tbsp', 0.01478676478125),
+        ('teaspoon', 'teaspoons', 'tsp', 0.00492892159375),
+    ],
+    'mass': [
+        ('milligram', 'milligrams', 'mg', 1e-6),
+        ('gram', 'grams', 'g, gm, gms, gramme, grammes', 0.001),
+        ('kilogram', 'kilograms', 'kg, kgs, kilo, kilos', 1.0),
+        ('tonne', 'tonnes', 'ton, tons, metric ton, metric tons', 1000.0),
+        ('quintal', 'quintals', '', 100.0),
+        ('pound', 'pounds', 'lb, lbs', 0.45359237),
+        ('ounce', 'ounces', 'oz', 0.028349523125),
+        ('stone', 'stone', 'stones', 6.35029318),
+        ('carat', 'carats', '', 0.0002),
+        ('tola', 'tolas', '', 0.0116638125),
+    ],
+    'time': [
+        ('millisecond', 'milliseconds', 'ms', 0.001),
+        ('second', 'seconds', 's, sec, secs', 1.0),
+        ('minute', 'minutes', 'min, mins', 60.0),
+        ('hour', 'hours', 'h, hr, hrs', 3600.0),
+        ('day', 'days', '', 86400.0),
+        ('week', 'weeks', '', 604800.0),
+        ('month', 'months', '', 2629746.0),
+        ('year', 'years', 'yr, yrs', 31556952.0),
+        ('decade', 'decades', '', 315569520.0),
+        ('century', 'centuries', '', 3155695200.0),
+    ],
+    'speed': [
+        ('metre per second', 'metres per second', 'm/s, meter per second, meters per second', 1.0),
+        ('kilometre per hour', 'kilometres per hour',
+         'km/h, km/hr, kmph, kph, kilometer per hour, kilometers per hour', 1 / 3.6),
+        ('mile per hour', 'miles per hour', 'mph', 0.44704),
+        ('foot per second', 'feet per second', 'ft/s', 0.3048),
+        ('knot', 'knots', '', 1852 / 3600),
+    ],
+    'data': [
+        ('bit', 'bits', '', 0.125),
+        ('byte', 'bytes', '', 1.0),
+        ('kilobyte', 'kilobytes', 'kb', 1e3),
+        ('megabyte', 'megabytes', 'mb', 1e6),
+        ('gigabyte', 'gigabytes', 'gb', 1e9),
+        ('terabyte', 'terabytes', 'tb', 1e12),
+        ('kibibyte', 'kibibytes', 'kib', 1024.0),
+        ('mebibyte', 'mebibytes', 'mib', 1024.0 ** 2),
+        ('gibibyte', 'gibibytes', 'gib', 1024.0 ** 3),
+        ('kilobit', 'kilobits', 'kbit', 125.0),
+        ('megabit', 'megabits', 'mbit', 125e3),
+        ('gigabit', 'gigabits', 'gbit', 125e6),
+    ],
+    'energy': [
+        ('joule', 'joules', 'j', 1.0),
+        ('kilojoule', 'kilojoules', 'kj', 1e3),
+        ('calorie', 'calories', 'cal', 4.184),
+        ('kilocalorie', 'kilocalories', 'kcal', 4184.0),
+        ('watt hour', 'watt hours', 'wh', 3600.0),
+        ('kilowatt hour', 'kilowatt hours', 'kwh', 3.6e6),
+        ('British thermal unit', 'British thermal units', 'btu', 1055.05585262),
+    ],
+    'power': [
+        ('watt', 'watts', 'w', 1.0),
+        ('kilowatt', 'kilowatts', 'kw', 1e3),
+        ('megawatt', 'megawatts', 'mw', 1e6),
+        ('horsepower', 'horsepower', 'hp, bhp', 745.69987158227),
+    ],
+    'pressure': [
+        ('pascal', 'pascals', 'pa', 1.0),
+        ('kilopascal', 'kilopascals', 'kpa', 1e3),
+        ('bar', 'bar', 'bars', 1e5),
+        ('atmosphere', 'atmospheres', 'atm', 101325.0),
+        ('psi', 'psi', '', 6894.757293168),
+        ('millimetre of mercury', 'millimetres of mercury', 'mmhg', 133.322387415),
+    ],
+    'temperature': [
+        ('degree Celsius', 'degrees Celsius', 'celsius, celcius, centigrade, c, °c, deg c, degree c, degrees c',
+         (1.0, 273.15)),
+        ('degree Fahrenheit', 'degrees Fahrenheit',
+         'fahrenheit, farenheit, f, °f, deg f, degree f, degrees f', (5 / 9, 273.15 - 32 * 5 / 9)),
+        ('kelvin', 'kelvin', 'k', (1.0, 0.0)),
+    ],
+}
+
+
+class Unit:
+    """One unit: its dimension and how to get to the dimension's base unit."""
+
+    __slots__ = ('dimension', 'singular', 'plural', 'factor', 'offset')
+
+    def __init__(self, dimension, singular, plural, factor, offset=0.0):
+        self.dimension = dimension
+        self.singular = singular
+        self.plural = plural
+        self.factor = factor
+        self.offset = offset
+
+    def name(self, amount):
+        return self.singular if amount == 1 else self.plural
+
+
+def _build_units(table):
+    """{alias: Unit} for every spelling in the table."""
+    units = {}
+    for dimension, entries in table.items():
+        for singular, plural, aliases, factor in entries:
+            factor, offset = factor if isinstance(factor, tuple) else (factor, 0.0)
+            unit = Unit(dimension, singular, plural, factor, offset)
+            for alias in [singular, plural] + [a.strip() for a in aliases.split(',') if a.strip()]:
+                units.setdefault(alias.lower(), unit)
+    return units
+
+
+UNITS = _build_units(UNIT_TABLE)
+
+# ============================================
+# CURRENCIES
+# ============================================
+
+# Approximate mid-market rates per US dollar, used until a refresh succeeds
+DEFAULT_RATES = {
+    'USD': 1.0, 'INR': 85.6, 'EUR': 0.96, 'GBP': 0.80, 'JPY': 157.2, 'CNY': 7.30, 'AUD': 1.61,
+    'CAD': 1.44, 'CHF': 0.91, 'SGD': 1.36, 'HKD': 7.77, 'NZD': 1.79, 'AED': 3.6725, 'SAR': 3.75,
+    'QAR': 3.64, 'KWD': 0.308, 'PKR': 278.5, 'BDT': 119.5, 'NPR': 137.0, 'LKR': 293.0, 'THB': 34.1,
+    'MYR': 4.47, 'IDR': 16100.0, 'KRW': 1470.0, 'ZAR': 18.8, 'BRL': 6.18, 'MXN': 20.8, 'RUB': 110.0,
+    'SEK': 11.0, 'NOK': 11.35, 'DKK': 7.17, 'TRY': 35.4,
+}
+DEFAULT_RATES_TIME = datetime.datetime(2025, 1, 1).timestamp()
+
+CURRENCY_NAMES = {
+    'USD': ('US dollar', 'US dollars'), 'INR': ('Indian rupee', 'Indian rupees'), 'EUR': ('euro', 'euros'),
+    'GBP': ('British pound', 'British pounds'), 'JPY': ('Japanese yen', 'Japanese yen'),
+    'CNY': ('Chinese yuan', 'Chinese yuan'), 'AUD': ('Australian dollar', 'Australian dollars'),
+    'CAD': ('Canadian dollar', 'Canadian dollars'), 'CHF': ('Swiss franc', 'Swiss francs'),
+    'SGD': ('Singapore dollar', 'Singapore dollars'), 'HKD': ('Hong Kong dollar', 'Hong Kong dollars'),
+    'NZD': ('New Zealand dollar', 'New Zealand dollars'), 'AED': ('UAE dirham', 'UAE dirhams'),
+    'SAR': ('Saudi riyal', 'Saudi riyals'), 'QAR': ('Qatari riyal', 'Qatari riyals'),
+    'KWD': ('Kuwaiti dinar', 'Kuwaiti dinars'), 'PKR': ('Pakistani rupee', 'Pakistani rupees'),
+    'BDT': ('Bangladeshi taka', 'Bangladeshi taka'), 'NPR': ('Nepalese rupee', 'Nepalese rupees'),
+    'LKR': ('Sri Lankan rupee', 'Sri Lankan rupees'), 'THB': ('Thai baht', 'Thai baht'),
+    'MYR': ('Malaysian ringgit', 'Malaysian ringgit'), 'IDR': ('Indonesian rupiah', 'Indonesian rupiah'),
+    'KRW': ('South Korean won', 'South Korean won'), 'ZAR': ('South African rand', 'South African rand'),
+    'BRL': ('Brazilian real', 'Brazilian reais'), 'MXN': ('Mexican peso', 'Mexican pesos'),
+    'RUB': ('Russian ruble', 'Russian rubles'), 'SEK': ('Swedish krona', 'Swedish kronor'),
+    'NOK': ('Norwegian krone', 'Norwegian kroner'), 'DKK': ('Danish krone', 'Danish kroner'),
+    'TRY': ('Turkish lira', 'Turkish lira'),
+}
+
+CURRENCY_ALIASES = {
+    'dollar': 'USD', 'dollars': 'USD', 'us dollar': 'USD', 'us dollars': 'USD', 'bucks': 'USD', '$': 'USD',
+    'rupee': 'INR', 'rupees': 'INR', 'indian rupee': 'INR', 'indian rupees': 'INR', 'rs': 'INR',
+    'rupaye': 'INR', 'rupaiya': 'INR', 'rupay': 'INR', '₹': 'INR',
+    'euro': 'EUR', 'euros': 'EUR', '€': 'EUR',
+    'pound': 'GBP', 'pounds': 'GBP', 'pound sterling': 'GBP', 'pounds sterling': 'GBP',
+    'british pound': 'GBP', 'british pounds': 'GBP', 'sterling': 'GBP', '£': 'GBP',
+    'yen': 'JPY', '¥': 'JPY', 'yuan': 'CNY', 'renminbi': 'CNY', 'rmb': 'CNY',
+    'australian dollar': 'AUD', 'australian dollars': 'AUD', 'canadian dollar': 'CAD', 'canadian dollars': 'CAD',
+    'singapore dollar': 'SGD', 'singapore dollars': 'SGD', 'hong kong dollar': 'HKD', 'hong kong dollars': 'HKD',
+    'new zealand dollar': 'NZD', 'new zealand dollars': 'NZD',
+    'franc': 'CHF', 'francs': 'CHF', 'swiss franc': 'CHF', 'swiss francs': 'CHF',
+    'dirham': 'AED', 'dirhams': 'AED', 'riyal': 'SAR', 'riyals': 'SAR', 'dinar': 'KWD', 'dinars': 'KWD',
+    'pakistani rupee': 'PKR', 'pakistani rupees': 'PKR', 'taka': 'BDT',
+    'nepali rupee': 'NPR', 'nepali rupees': 'NPR', 'nepalese rupee': 'NPR', 'nepalese rupees': 'NPR',
+    'sri lankan rupee': 'LKR', 'sri lankan rupees': 'LKR', 'baht': 'THB', 'ringgit': 'MYR', 'rupiah': 'IDR',
+    'won': 'KRW', 'rand': 'ZAR', 'real': 'BRL', 'reais': 'BRL', 'peso': 'MXN', 'pesos': 'MXN',
+    'ruble': 'RUB', 'rubles': 'RUB', 'rouble': 'RUB', 'roubles': 'RUB', 'lira': 'TRY',
+}
+
+SCALES = {'k': 1e3, 'thousand': 1e3, 'lakh': 1e5, 'lakhs': 1e5, 'lac': 1e5, 'crore': 1e7, 'crores': 1e7,
+          'million': 1e6, 'millions': 1e6, 'billion': 1e9, 'billions': 1e9}
+
+RATES_MAX_AGE = 12 * 60 * 60   # refresh exchange rates older than this
+RATES_RETRY = 10 * 60          # wait after a failed refresh
+CHECK_INTERVAL = 60            # seconds between checks of the local copy (another worker may have refreshed)
+
+
+class RateTable:
+    """Exchange rates per US dollar: a built-in seed, a local JSON copy and background refreshes."""
+
+    def __init__(self, path=None, fetch=None, max_age=RATES_MAX_AGE):
+        """
+        path   local copy (None: keep rates in memory only)
+        fetch  fetch() -> provider payload {"rates": {...}, "base_code", "time_last_update_unix"}
+        """
+        self.path = path
+        self.fetch = fetch
+        self.max_age = max_age
+        self.rates = DEFAULT_RATES     # replaced wholesale, so readers never need a lock
+        self.updated = DEFAULT_RATES_TIME
+        self.fetched = 0.0
+        self.version = 0               # bumped whenever the rates change (part of the memo key)
+        self.mtime = None
+        self.checked = 0.0
+        self.refreshing = False
+        self.lock = threading.Lock()
+        self.stats = {'refreshes': 0, 'errors': 0}
+
+    def start(self):
+        """Load the local copy now and refresh it in the background if it is old."""
+        self.checked = 0.0
+        self.current()
+
+    def current(self):
+        """This table, after at most one stat of the local copy every CHECK_INTERVAL seconds."""
+        now = time.time()
+        if now - self.checked >= CHECK_INTERVAL:
+            self.checked = now
+            self._reload()
+            if self.fetch is not None and now - self.fetched >= self.max_age:
+                self._refresh_async()
+        return self
+
+    def rate(self, code):
+        return self.rates.get(code)
+
+    def _reload(self):
+        if not self.path:
+            return
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            return
+        if mtime == self.mtime:
+            return
+        self.mtime = mtime
+        try:
+            with open(self.path) as f:
+                saved = json.load(f)
+            self._apply(saved['rates'], saved.get('updated') or mtime, saved.get('fetched') or mtime)
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            log.warning('rates_file_error', error=str(e))
+
+    def _apply(self, rates, updated, fetched):
+        rates = {code.upper(): float(value) for code, value in rates.items() if value}
+        if 'USD' not in rates:
+            raise ValueError('rates have no USD entry')
+        usd = rates['USD']
+        self.rates = {code: value / usd for code, value in rates.items()}
+        self.updated, self.fetched = float(updated), float(fetched)
+        self.version += 1
+
+    def _refresh_async(self):
+        with self.lock:
+            if self.refreshing:
+                return
+            self.refreshing = True
+        threading.Thread(target=self.refresh, daemon=True, name='rates-refresh').start()
+
+    def refresh(self):
+        """Fetch new rates and store the local copy (runs off the request path)."""
+        try:
+            payload = self.fetch()
+            now = time.time()
+            self._apply(payload['rates'], payload.get('time_last_update_unix') or now, now)
+            self.stats['refreshes'] += 1
+            if self.path:
+                self._save()
+        except Exception as e:
+            self.stats['errors'] += 1
+            self.fetched = time.time() - self.max_age + RATES_RETRY
+            log.warning('rates_refresh_error', error=str(e))
+        finally:
+            self.refreshing = False
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp, 'w') as f:
+            json.dump({'base': 'USD', 'updated': self.updated, 'fetched': self.fetched, 'rates': self.rates}, f)
+        os.replace(tmp, self.path)
+        self.mtime = os.path.getmtime(self.path)
+
+    def snapshot(self):
+        return dict(self.stats, currencies=len(self.rates), updated=self.updated, fetched=self.fetched)
+
+
+# ============================================
+# DATES
+# ============================================
+
+MONTHS = {name.lower(): i for i, name in enumerate(calendar.month_name) if name}
+MONTHS.update({name.lower(): i for i, name in enumerate(calendar.month_abbr) if name})
+MONTHS['sept'] = 9
+
+# Fixed-date days people count down to
+HOLIDAYS = {
+    'christmas': (12, 25), 'christmas day': (12, 25), 'new year': (1, 1), "new year's day": (1, 1),
+    'new years day': (1, 1), 'new year day': (1, 1), 'independence day': (8, 15), 'republic day': (1, 26),
+    'gandhi jayanti': (10, 2), "valentine's day": (2, 14), 'valentines day': (2, 14), 'halloween': (10, 31),
+    "children's day": (11, 14), 'childrens day': (11, 14), "teachers' day": (9, 5), 'teachers day': (9, 5),
+}
+
+DATE_UNITS = {'day': 1, 'days': 1, 'week': 7, 'weeks': 7, 'fortnight': 14, 'fortnights': 14,
+              'month': 'm', 'months': 'm', 'year': 'y', 'years': 'y'}
+
+
+def add_months(day, months):
+    """Calendar month arithmetic: Jan 31 + 1 month is the last day of February."""
+    month = day.month - 1 + months
+    year, month = day.year + month // 12, month % 12 + 1
+    return day.replace(year=year, month=month, day=min(day.day, calendar.monthrange(year, month)[1]))
+
+
+def shift(day, count, unit):
+    step = DATE_UNITS[unit]
+    if step == 'm':
+        return add_months(day, count)
+    if step == 'y':
+        return add_months(day, 12 * count)
+    return day + datetime.timedelta(days=count * step)
+
+
+def _month_day(year, month, day):
+    return datetime.date(year, month, min(day, calendar.monthrange(year, month)[1]))
+
+
+def resolve_date(phrase, today, prefer='next'):
+    """A date phrase as a date. Without a year: the next occurrence ('next') or the last one ('last')."""
+    phrase = ' '.join(phrase.split())
+    if phrase in ('today', 'now'):
+        return today
+    if phrase == 'tomorrow':
+        return today + datetime.timedelta(days=1)
+    if phrase == 'yesterday':
+        return today - datetime.timedelta(days=1)
+    if phrase == 'day after tomorrow':
+        return today + datetime.timedelta(days=2)
+    if phrase in HOLIDAYS:
+        month, day, year = HOLIDAYS[phrase] + (None,)
+    else:
+        m = re.fullmatch(r'(\d{4})-(\d{1,2})-(\d{1,2})', phrase)
+        if m:
+            return datetime.date(int(m.group(1)), int(m.group(2)), int(m.group(3)))
+        m = re.fullmatch(r'(\d{1,2})/(\d{1,2})/(\d{2}|\d{4})', phrase)
+        if m:
+            year = int(m.group(3))
+            return datetime.date(year + 2000 if year < 100 else year, int(m.group(2)), int(m.group(1)))
+        numbers = re.findall(r'\d+', phrase)
+        month = next(MONTHS[w] for w in phrase.split() if w in MONTHS)
+        day = int(numbers[0])
+        year = int(numbers[1]) if len(numbers) > 1 else None
+    if year is not None:
+        return datetime.date(year, month, day)
+    candidate = _month_day(today.year, month, day)
+    if prefer == 'next' and candidate < today:
+        return _month_day(today.year + 1, month, day)
+    if prefer == 'last' and candidate > today:
+        return _month_day(today.year - 1, month, day)
+    return candidate
+
+
+def format_date(day):
+    return f"{day:%A}, {day.day} {day:%B %Y}"
+
+
+def describe_span(days, unit):
+    """"67 days", "9 weeks and 4 days", "2 months and 3 days" for a span in days."""
+    def plural(n, word):
+        return f"{n:,} {word}" + ('' if n == 1 else 's')
+    if unit.startswith('week') and days >= 7:
+        weeks, rest = divmod(days, 7)
+        return plural(weeks, 'week') + (f" and {plural(rest, 'day')}" if rest else '')
+    if unit.startswith(('month', 'year')) and days >= 28:
+        return f"about {plural(round(days / 30.436875), 'month')}" if unit.startswith('month') \
+            else f"about {days / 365.2425:.1f} years"
+    return plural(days, 'day')
+
+
+# ============================================
+# GRAMMAR (compiled once)
+# ============================================
+
+def _alternation(words):
+    return '|'.join(re.escape(w) for w in sorted(words, key=len, reverse=True))
+
+
+NUMBER = r'\d+(?:\.\d+)?|\.\d+'
+WORD_NUMBER = _alternation(EN_NUMBERS)
+AMOUNT = (rf'(?:(?P<sym>[$₹€£¥])\s*)?(?P<amount>{NUMBER}|(?:an?|one)(?= )|(?:{WORD_NUMBER})(?= ))'
+          rf'(?:\s*(?P<scale>{_alternation(SCALES)})\b)?')
+# Any known unit or currency name, or a three-letter currency code the rate table may know
+UNIT = rf'(?:{_alternation(set(UNITS) | set(CURRENCY_ALIASES))}|[a-z]{{3}})(?![\w²³/])'
+CONVERT_TO = r'(?:to|in|into|as|in terms of|equals|is how many|is how much in|=)'
+
+LEAD_IN = (r"(?:please )?(?:(?:can|could|will) you )?(?:please )?(?:tell me )?"
+           r"(?:convert|change|what(?:'s| is| are| will be| was)|how much (?:is|are)|how many is)? ?")
+TRAIL = r'(?: please| for me| now| today| approximately| exactly)?'
+
+CONVERSIONS = [
+    re.compile(rf'{LEAD_IN}(?:{AMOUNT} ?)?(?P<src>{UNIT})? {CONVERT_TO} (?P<dst>{UNIT}){TRAIL}'),
+    re.compile(rf'{LEAD_IN}how (?:many|much) (?P<dst>{UNIT}) (?:are |is )?(?:there )?'
+               rf'(?:in|make|makes|make up|equals?|is|are|to|for) (?:{AMOUNT} ?)?(?P<src>{UNIT}){TRAIL}'),
+]
+
+DATE = (rf"(?:day after tomorrow|today|tomorrow|yesterday|now|{_alternation(HOLIDAYS)}"
+        rf"|\d{{1,2}}(?:st|nd|rd|th)? (?:of )?(?:{_alternation(MONTHS)})(?: \d{{4}})?"
+        rf"|(?:{_alternation(MONTHS)}) \d{{1,2}}(?:st|nd|rd|th)?(?: \d{{4}})?"
+        rf"|\d{{4}}-\d{{1,2}}-\d{{1,2}}|\d{{1,2}}/\d{{1,2}}/(?:\d{{4}}|\d{{2}}))")
+COUNT = rf'(?:\d+|an?|one|{WORD_NUMBER})'
+DATE_UNIT = rf'(?:{_alternation(DATE_UNITS)})'
+SPAN_UNIT = r'(?P<unit>days|weeks|months|years)'
+ASK_DAY = (r"(?:(?:what|which) (?:day|date)(?: of the week)?(?: is it| will it be| was it| is| was| will be| would be)?"
+           r"|what(?:'s| is| was| will be) the date) ?")
+
+DATE_QUERIES = [
+    ('offset', re.compile(
+        rf'(?:{ASK_DAY})?(?P<n>{COUNT}) (?P<unit>{DATE_UNIT}) (?:(?P<dir>from|after|before) (?P<base>{DATE})'
+        rf'|(?P<rel>ago|back|later|hence))')),
+    ('offset', re.compile(rf'{ASK_DAY}in (?P<n>{COUNT}) (?P<unit>{DATE_UNIT})(?: from now| from today)?')),
+    ('until', re.compile(
+        rf'how many {SPAN_UNIT} (?:are |is it )?(?:there )?(?:left )?(?:until|till|untill|to|before) (?P<date>{DATE})')),
+    ('until', re.compile(rf'(?:how long|how many days left|days left) (?:is it |is there )?(?:until|till|to|for) '
+                         rf'(?P<date>{DATE})')),
+    ('since', re.compile(rf'how many {SPAN_UNIT} (?:has it been |have passed |ago was |is it )?since (?P<date>{DATE})')),
+    ('since', re.compile(rf'how (?:many days|long) ago was (?P<date>{DATE})')),
+    ('between', re.compile(rf'how many {SPAN_UNIT} (?:are )?(?:there )?(?:between|from) (?P<a>{DATE}) '
+                           rf'(?:and|to|till|until) (?P<b>{DATE})')),
+    ('weekday', re.compile(rf'(?:what|which) day(?: of the week)? (?:is it |was it |will it be )?'
+                           rf'(?:(?:is|was|will be|falls on|on) )?(?P<date>{DATE})')),
+    ('weekday', re.compile(rf'(?:what|which) day (?:does|did|will) (?P<date>{DATE}) fall(?: on)?')),
+]
+
+
+def _number(value):
+    if value in ('a', 'an', 'one'):
+        return 1
+    if value in EN_NUMBERS:
+        return EN_NUMBERS[value]
+    return float(value) if '.' in value else int(value)
+
+
+def format_number(value, places=3):
+    """Readable number: 3.107, 1,609.344, 0.000621, 2.5e+15."""
+    if value != 0 and (abs(value) >= 1e15 or abs(value) < 10 ** -places):
+        return f"{value:.4g}"
+    text = f"{value:,.{places}f}".rstrip('0').rstrip('.')
+    return '0' if text in ('-0', '') else text
+
+
+# ============================================
+# ANSWERS
+# ============================================
+
+def answer(query, today=None, rates=None):
+    """(reply, data) for a conversion or date question in normalized form, else None. Memoized."""
+    today = today or datetime.date.today()
+    rates = rates.current() if rates is not None else None
+    hit = _answer(query, today, rates, rates.version if rates is not None else 0)
+    return (hit[0], dict(hit[1])) if hit else None
+
+
+@lru_cache(maxsize=4096)
+def _answer(query, today, rates, version):
+    # version is part of the key only: new rates must not be answered from old entries
+    query = ' '.join(query.split())
+    for regex in CONVERSIONS:
+        m = regex.fullmatch(query)
+        if m:
+            return _convert(m, rates)
+    for kind, regex in DATE_QUERIES:
+        m = regex.fullmatch(query)
+        if m:
+            try:
+                return DATE_ANSWERS[kind](m, today)
+            except (ValueError, OverflowError, StopIteration):
+                return None
+    return None
+
+
+def _amount(m):
+    if m.group('amount') is None:
+        return 1
+    amount = _number(m.group('amount'))
+    if m.group('scale'):
+        amount *= SCALES[m.group('scale')]
+    return amount
+
+
+def _currency(word, rates):
+    code = CURRENCY_ALIASES.get(word) or (word.upper() if len(word) == 3 else None)
+    return code if code and rates is not None and rates.rate(code) is not None else None
+
+
+def _convert(m, rates):
+    src_word, dst_word = m.group('src'), m.group('dst')
+    amount = _amount(m)
+    symbol = m.group('sym')
+    if not src_word and not symbol:
+        return None
+    src, dst = UNITS.get(src_word), UNITS.get(dst_word)
+    if not symbol and src is not None and dst is not None and src.dimension == dst.dimension:
+        return _convert_units(amount, src, dst)
+    src_code = CURRENCY_ALIASES[symbol] if symbol else _currency(src_word, rates)
+    dst_code = _currency(dst_word, rates)
+    if src_code and dst_code:
+        return _convert_currency(amount, src_code, dst_code, rates)
+    return None
+
+
+def _convert_units(amount, src, dst):
+    value = ((amount * src.factor + src.offset) - dst.offset) / dst.factor
+    reply = f"{format_number(amount)} {src.name(amount)} is {format_number(value)} {dst.name(value)}."
+    return reply, (('kind', 'unit'), ('dimension', src.dimension), ('amount', amount), ('from', src.singular),
+                   ('to', dst.singular), ('result', value))
+
+
+def _currency_name(code, amount):
+    names = CURRENCY_NAMES.get(code)
+    return (names[0] if amount == 1 else names[1]) if names else code
+
+
+def _convert_currency(amount, src, dst, rates):
+    value = amount / rates.rate(src) * rates.rate(dst)
+    as_of = datetime.datetime.fromtimestamp(rates.updated)
+    reply = (f"{format_number(amount, 2)} {_currency_name(src, amount)} is about "
+             f"{format_number(value, 2)} {_currency_name(dst, value)} "
+             f"(rates from {as_of.day} {as_of:%b %Y}).")
+    return reply, (('kind', 'currency'), ('amount', amount), ('from', src), ('to', dst),
+                   ('result', round(value, 4)), ('rates_updated', rates.updated))
+
+
+def _date_data(kind, day, days=None):
+    return (('kind', 'date'), ('query', kind), ('date', day.isoformat()), ('days', days))
+
+
+def _offset(m, today):
+    count, unit = _number(m.group('n')), m.group('unit')
+    direction = m.groupdict().get('dir') or m.groupdict().get('rel')
+    base_phrase = m.groupdict().get('base')
+    base = resolve_date(base_phrase, today) if base_phrase else today
+    sign = -1 if direction in ('before', 'ago', 'back') else 1
+    day = shift(base, sign * count, unit)
+    unit_name = unit if count != 1 or not unit.endswith('s') else unit[:-1]
+    if base_phrase in (None, 'today', 'now'):
+        anchor = 'ago' if sign < 0 else 'from today'
+    else:
+        anchor = f"{'before' if sign < 0 else 'after'} {format_date(base)}"
+    verb = 'was' if day < today else 'is'
+    return f"{count} {unit_name} {anchor} {verb} {format_date(day)}.", _date_data('offset', day, (day - today).days)
+
+
+def _until(m, today):
+    phrase = m.group('date')
+    day = resolve_date(phrase, today, 'next')
+    days = (day - today).days
+    if days < 0:
+        return f"{format_date(day)} was {describe_span(-days, 'days')} ago.", _date_data('until', day, days)
+    unit = m.groupdict().get('unit') or 'days'
+    return (f"There {'is' if days == 1 else 'are'} {describe_span(days, unit)} until {_date_label(phrase, day)}.",
+            _date_data('until', day, days))
+
+
+def _since(m, today):
+    phrase = m.group('date')
+    day = resolve_date(phrase, today, 'last')
+    days = (today - day).days
+    if days < 0:
+        return f"{format_date(day)} is {describe_span(-days, 'days')} from now.", _date_data('since', day, days)
+    unit = m.groupdict().get('unit') or 'days'
+    return f"It has been {describe_span(days, unit)} since {_date_label(phrase, day)}.", _date_data('since', day, days)
+
+
+def _between(m, today):
+    a = resolve_date(m.group('a'), today, 'this')
+    b = resolve_date(m.group('b'), today, 'this')
+    if b < a and not re.search(r'\d{4}', m.group('b')):
+        b = _month_day(b.year + 1, b.month, b.day)
+    days = abs((b - a).days)
+    return (f"There {'is' if days == 1 else 'are'} {describe_span(days, m.group('unit'))} between "
+            f"{format_date(a)} and {format_date(b)}.", _date_data('between', b, days))
+
+
+def _weekday(m, today):
+    phrase = m.group('date')
+    day = resolve_date(phrase, today, 'next')
+    if phrase in ('today', 'now'):
+        return f"Today is {format_date(day)}.", _date_data('weekday', day, 0)
+    label = _date_label(phrase, day, f"{day.day} {day:%B %Y}")
+    return (f"{label} {'fell' if day < today else 'falls'} on a {day:%A}.",
+            _date_data('weekday', day, (day - today).days))
+
+
+def _date_label(phrase, day, date_text=None):
+    """"Christmas (Friday, 25 December 2026)" for named days, else just the date."""
+    date_text = date_text or format_date(day)
+    if phrase in HOLIDAYS:
+        name = phrase.title().replace("'S", "'s")
+        return f"{name} ({date_text})"
+    return date_text
+
+
+DATE_ANSWERS = {
+    'offset': _offset,
+    'until': _until,
+    'since': _since,
+    'between': _between,
+    'weekday': _weekday,
+}
@@ -0,0 +1,293 @@
+"""
+============================================
+DIYA — Adaptive Timeouts & Hedged Requests
+============================================
+Every upstream (weather, YouTube, Wikipedia...)
+learns its own latency distribution online: a
+log-bucketed histogram whose counts decay, so
+it follows the upstream as it speeds up or
+slows down. From it each call gets:
+
+  deadline  p99 x DEADLINE_FACTOR, kept within
+            the upstream's [floor, ceiling] and
+            cut to what is left of the request's
+            own time budget
+  hedge     if the first attempt hasn't answered
+            by p95, one duplicate is sent; the
+            first answer wins and the other is
+            cancelled
+
+Hedges spend tokens earned at HEDGE_RATIO per
+call, so they add at most that fraction of
+extra upstream load. Until an upstream has
+MIN_SAMPLES answers it gets its old fixed
+timeout and no hedging.
+
+A call that misses its deadline raises
+UpstreamTimeout (a requests Timeout), so the
+callers' existing timeout handling, a stale
+cached answer or their fallback reply, applies.
+============================================
+"""
+
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+import requests
+
+DEADLINE_FACTOR = 2.0     # deadline = p99 x this (before floor/ceiling)
+MIN_SAMPLES = 20          # answers needed before percentiles are trusted
+HEDGE_RATIO = 0.05        # hedge tokens earned per call (max extra load)
+HEDGE_BURST = 3.0         # hedge tokens that can be saved up
+BUDGET_RESERVE = 0.05     # seconds of a request budget kept for building the reply
+
+BUCKET_BASE = 0.005       # seconds: upper bound of the first histogram bucket
+BUCKET_GROWTH = 1.15      # each bucket is 15% wider than the one before
+BUCKETS = 80              # up to ~350 s
+DECAY_EVERY = 200         # samples between halvings of every bucket
+
+
+class UpstreamTimeout(requests.exceptions.Timeout):
+    """An upstream call ran out of time (its deadline or the request's budget)."""
+
+
+class LatencyHistogram:
+    """Decaying log-bucketed latency histogram; quantiles in O(BUCKETS)."""
+
+    __slots__ = ('counts', 'total', 'samples', 'lock')
+
+    def __init__(self):
+        self.counts = [0.0] * BUCKETS
+        self.total = 0.0
+        self.samples = 0
+        self.lock = threading.Lock()
+
+    def add(self, seconds):
+        if seconds <= BUCKET_BASE:
+            i = 0
+        else:
+            i = min(BUCKETS - 1, int(math.ceil(math.log(seconds / BUCKET_BASE, BUCKET_GROWTH))))
+        with self.lock:
+            self.counts[i] += 1
+            self.total += 1
+            self.samples += 1
+            if self.samples % DECAY_EVERY == 0:
+                # Old samples fade out, so the estimate tracks the upstream as it changes
+                self.counts = [c / 2 for c in self.counts]
+                self.total /= 2
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding quantile q (seconds), or None if empty."""
+        with self.lock:
+            target, seen = q * self.total, 0.0
+            if not self.total:
+                return None
+            for i, count in enumerate(self.counts):
+                seen += count
+                if seen >= target:
+                    return BUCKET_BASE * BUCKET_GROWTH ** i
+        return BUCKET_BASE * BUCKET_GROWTH ** (BUCKETS - 1)
+
+
+class Upstream:
+    """One upstream service: its latency histogram, timeout bounds, hedge tokens and counters."""
+
+    def __init__(self, name, timeout, floor, ceiling):
+        self.name = name
+        self.timeout = timeout      # fixed timeout used until MIN_SAMPLES answers
+        self.floor = floor
+        self.ceiling = ceiling
+        self.latency = LatencyHistogram()
+        self.tokens = HEDGE_BURST
+        self.lock = threading.Lock()
+        self.stats = {'calls': 0, 'hedged': 0, 'hedge_wins': 0, 'timeouts': 0, 'errors': 0}
+
+    def learned(self):
+        return self.latency.samples >= MIN_SAMPLES
+
+    def deadline(self):
+        """Seconds this upstream gets per call, from its p99."""
+        if not self.learned():
+            return self.timeout
+        return min(self.ceiling, max(self.floor, self.latency.quantile(0.99) * DEADLINE_FACTOR))
+
+    def hedge_delay(self):
+        """Seconds to wait for the first attempt before hedging (None: don't hedge)."""
+        return self.latency.quantile(0.95) if self.learned() else None
+
+    def take_hedge_token(self):
+        with self.lock:
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            return False
+
+    def count(self, stat):
+        with self.lock:
+            self.stats[stat] += 1
+            if stat == 'calls':
+                self.tokens = min(HEDGE_BURST, self.tokens + HEDGE_RATIO)
+
+    def snapshot(self):
+        q = self.latency.quantile if self.latency.total else (lambda _: None)
+        ms = lambda s: round(s * 1000) if s is not None else None
+        return dict(self.stats, samples=self.latency.samples, p50_ms=ms(q(0.5)), p95_ms=ms(q(0.95)),
+                    p99_ms=ms(q(0.99)), deadline_ms=ms(self.deadline()))
+
+
+# The attempt running on this thread, for libraries that make their own requests
+attempt_ctx = threading.local()
+
+
+class Attempt:
+    """One try of an upstream call, with its own HTTP session so it can be cancelled."""
+
+    __slots__ = ('fn', 'deadline', 'session', 'started', 'finished', 'cancelled', 'future')
+
+    def __init__(self, fn, deadline):
+        self.fn = fn
+        self.deadline = deadline
+        self.session = requests.Session()
+        self.started = None
+        self.finished = None
+        self.cancelled = False
+        self.future = None
+
+    def run(self):
+        if self.cancelled:
+            return None
+        self.started = time.monotonic()
+        attempt_ctx.current = self
+        try:
+            return self.fn(self.session, self.time_left())
+        finally:
+            attempt_ctx.current = None
+            self.finished = time.monotonic()
+            self.session.close()
+
+    def time_left(self):
+        return max(0.001, self.deadline - time.monotonic())
+
+    def cancel(self):
+        """Skip it if it hasn't started; otherwise drop its connections (its read timeout bounds the rest)."""
+        self.cancelled = True
+        if self.future is not None and self.future.cancel():
+            return
+        self.session.close()
+
+
+class AdaptiveTimeouts:
+    """Per-upstream adaptive deadlines and hedged attempts, run on a shared thread pool."""
+
+    def __init__(self, workers=32):
+        self.upstreams = {}
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='upstream')
+
+    def register(self, name, timeout, floor, ceiling):
+        self.upstreams[name] = Upstream(name, timeout, floor, ceiling)
+
+    def call(self, name, fn, budget=None):
+        """
+        fn(session, timeout) -> result, run with an adaptive deadline and maybe hedged.
+        budget is what is left of the request's time (None: no request waiting).
+        """
+        upstream = self.upstreams[name]
+        upstream.count('calls')
+        timeout = upstream.deadline()
+        if budget is not None:
+            timeout = min(timeout, budget - BUDGET_RESERVE)
+        if timeout <= 0:
+            upstream.count('timeouts')
+            raise UpstreamTimeout(f"{name}: no time left in the request budget")
+
+        start = time.monotonic()
+        deadline = start + timeout
+        attempts = [self._submit(fn, deadline)]
+        hedge_at = upstream.hedge_delay()
+        if hedge_at is not None and hedge_at < timeout * 0.8:
+            done, _ = wait([attempts[0].future], timeout=hedge_at)
+            if not done and upstream.take_hedge_token():
+                upstream.count('hedged')
+                attempts.append(self._submit(fn, deadline))
+
+        try:
+            winner, error = self._first_answer(attempts, deadline)
+        finally:
+            for attempt in attempts:
+                if attempt.future.done():
+                    continue
+                attempt.cancel()
+
+        if winner is None:
+            if error is not None and not isinstance(error, requests.exceptions.Timeout):
+                upstream.count('errors')
+                raise error
+            upstream.count('timeouts')
+            # A miss still tells us the upstream is at least this slow
+            upstream.latency.add(time.monotonic() - start)
+            raise UpstreamTimeout(f"{name}: no answer within {timeout:.2f}s") from error
+        upstream.latency.add(winner.finished - winner.started)
+        if winner is not attempts[0]:
+            upstream.count('hedge_wins')
+        return winner.future.result()
+
+    def _submit(self, fn, deadline):
+        attempt = Attempt(fn, deadline)
+        attempt.future = self.pool.submit(attempt.run)
+        return attempt
+
+    @staticmethod
+    def _first_answer(attempts, deadline):
+        """(winning attempt, None) or (None, last error) or (None, None) on timeout."""
+        pending = {a.future: a for a in attempts}
+        error = None
+        while pending:
+            done, _ = wait(list(pending), timeout=max(0.0, deadline - time.monotonic()), return_when=FIRST_COMPLETED)
+            if not done:
+                return None, None
+            for future in done:
+                attempt = pending.pop(future)
+                if future.cancelled():
+                    continue
+                if future.exception() is None:
+                    return attempt, None
+                error = future.exception()
+        return None, error
+
+    def snapshot(self):
+        return {name: upstream.snapshot() for name, upstream in self.upstreams.items()}
+
+
+# ============================================
+# LIBRARIES WITHOUT TIMEOUTS
+# ============================================
+
+def attempt_timeout(default):
+    """Time left for the attempt running on this thread (default outside one)."""
+    attempt = getattr(attempt_ctx, 'current', None)
+    return attempt.time_left() if attempt is not None else default
+
+
+class TimeoutShim:
+    """Stands in for the requests module inside a library that calls requests.get() with no timeout."""
+
+    def __init__(self, module, default):
+        self._module = module
+        self._default = default
+
+    def __getattr__(self, name):
+        return getattr(self._module, name)
+
+    def get(self, *args, **kwargs):
+        kwargs.setdefault('timeout', attempt_timeout(self._default))
+        attempt = getattr(attempt_ctx, 'current', None)
+        # Through the attempt's session, so cancelling a hedge loser reaches this request too
+        return (attempt.session if attempt is not None else self._module).get(*args, **kwargs)
+
+
+def patch_timeouts(library, default):
+    """Give a library module that uses the requests module directly our per-attempt timeouts."""
+    if not isinstance(library.requests, TimeoutShim):
+        library.requests = TimeoutShim(library.requests, default)
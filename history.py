@@ -0,0 +1,394 @@
+"""
+============================================
+DIYA — Command History Store
+============================================
+Append-only log of every command the backend
+handles, stored as fixed-width binary records
+in rolling segment files, plus a memory-mapped
+reader for analytics (intent frequency, latency
+percentiles, top queries).
+
+Retention is applied whenever a writer rolls
+over to a new segment: segments past
+max_segments (oldest first) or older than
+max_age are deleted, and once strings.tsv
+passes STRINGS_MAX_BYTES it is rewritten with
+only the strings the remaining records use.
+A segment another worker is still writing is
+never deleted.
+============================================
+"""
+
+import os
+import re
+import glob
+import math
+import mmap
+import queue
+import struct
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: one writer process, the thread lock is enough
+    fcntl = None
+
+# ts (float64), latency_ms (float32), intent, upstream, query (string ids), cache_hit
+RECORD = struct.Struct('<dfIIIB3x')
+
+SEGMENT_RECORDS = 1 << 20      # ~28 MB per segment before rolling over
+MAX_SEGMENTS = 16              # segments kept across all workers (0 = no limit)
+MAX_AGE = 30 * 24 * 60 * 60    # seconds a segment is kept after its last write (0 = no limit)
+STRINGS_MAX_BYTES = 8 << 20    # strings.tsv is compacted at rollover past this
+QUEUE_SIZE = 10000             # pending records before new ones are dropped
+FLUSH_INTERVAL = 0.5           # seconds the writer waits to batch records
+
+# Latency histogram: log-spaced buckets from 0.1 ms, ~5% relative error
+HIST_BASE = 0.1
+HIST_GROWTH = 1.1
+HIST_BUCKETS = 200
+
+
+def clean_string(text):
+    """The form a string is interned in (one line, single spaces)."""
+    return " ".join(text.split()) if text else ''
+
+
+@contextmanager
+def file_locked(path):
+    """Hold an exclusive lock on path across worker processes."""
+    if fcntl is None:
+        yield
+        return
+    with open(path, 'a') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _mtime(path):
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return time.time()
+
+
+def _alive(pid):
+    if pid == os.getpid() or fcntl is None:
+        return pid == os.getpid()   # without fcntl there is only one writer process
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        pass   # exists, but not ours to signal
+    return True
+
+
+def _bucket(latency_ms):
+    if latency_ms <= HIST_BASE:
+        return 0
+    return min(HIST_BUCKETS - 1, int(math.log(latency_ms / HIST_BASE, HIST_GROWTH)) + 1)
+
+
+def _bucket_upper(index):
+    return HIST_BASE * HIST_GROWTH ** index
+
+
+class HistoryLog:
+    """Non-blocking writer and streaming reader for the command history."""
+
+    def __init__(self, directory, segment_records=SEGMENT_RECORDS, queue_size=QUEUE_SIZE,
+                 max_segments=MAX_SEGMENTS, max_age=MAX_AGE):
+        self.directory = directory
+        self.segment_records = segment_records
+        self.max_segments = max_segments
+        self.max_age = max_age
+        self.strings_file = os.path.join(directory, 'strings.tsv')
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._pid = None
+        self._seq = 0
+        self._start_lock = threading.Lock()
+        # String table: sequential ids (0 = empty) appended to strings.tsv, shared by every worker
+        self._table_lock = threading.RLock()
+        self._strings = {}
+        self._ids = {}
+        self._last_id = 0
+        self._strings_size = 0
+        self._strings_ino = None
+
+    # ---------- writing ----------
+
+    def record(self, intent, latency_ms, cache_hit=False, upstream='', query='', ts=None):
+        """Queue one command record. Never blocks; drops the record if the queue is full."""
+        if self._pid != os.getpid():
+            self._start_writer()
+        item = (ts or time.time(), latency_ms, intent or '', upstream or '', query or '', cache_hit)
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            self.dropped += 1
+
+    def _start_writer(self):
+        """Start the writer thread (again, after a fork) with a fresh per-process segment."""
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            os.makedirs(self.directory, exist_ok=True)
+            self._load_strings()
+            if self._pid is not None:
+                # Forked child: the parent's queue and thread are not ours
+                self._queue = queue.Queue(maxsize=self._queue.maxsize)
+            self._pid = os.getpid()
+            thread = threading.Thread(target=self._writer, daemon=True)
+            thread.start()
+
+    def _new_segment(self):
+        self._seq += 1
+        name = f'seg-{int(time.time() * 1000)}-{os.getpid()}-{self._seq}.bin'
+        return open(os.path.join(self.directory, name), 'ab')
+
+    def _writer(self):
+        segment = self._new_segment()
+        written = 0
+        while True:
+            batch = [self._queue.get()]
+            time.sleep(FLUSH_INTERVAL)
+            try:
+                while True:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                pass
+
+            rolled = False
+            try:
+                rows = [(ts, latency, clean_string(intent), clean_string(upstream), clean_string(query), hit)
+                        for ts, latency, intent, upstream, query, hit in batch]
+                # Under the strings lock, so compaction never misses an id that is being written
+                with self._strings_locked():
+                    # Strings first, so a reader never sees an id it can't resolve
+                    ids = self._intern(text for row in rows for text in row[2:5])
+                    buf = bytearray()
+                    for ts, latency, intent, upstream, query, hit in rows:
+                        buf += RECORD.pack(ts, latency, ids.get(intent, 0), ids.get(upstream, 0),
+                                           ids.get(query, 0), 1 if hit else 0)
+
+                    while buf:
+                        room = (self.segment_records - written) * RECORD.size
+                        segment.write(buf[:room])
+                        written += min(len(buf), room) // RECORD.size
+                        del buf[:room]
+                        if written >= self.segment_records:
+                            segment.close()
+                            segment = self._new_segment()
+                            written = 0
+                            rolled = True
+                    segment.flush()
+                if rolled:
+                    self.prune()
+            except OSError:
+                self.dropped += len(batch)
+
+    @contextmanager
+    def _strings_locked(self):
+        """Hold the string table lock shared by every worker, with the table up to date."""
+        with self._table_lock, file_locked(self.strings_file + '.lock'):
+            self._load_strings()   # another worker may have added (or compacted) some meanwhile
+            yield
+
+    def _intern(self, texts):
+        """text -> id for texts; unseen ones get the next free id (call with _strings_locked held)."""
+        lines = []
+        for text in dict.fromkeys(texts):
+            if text and text not in self._ids:
+                sid = self._next_id()
+                self._strings[sid], self._ids[text] = text, sid
+                lines.append(f'{sid}\t{text}\n')
+        if lines:
+            data = ''.join(lines).encode('utf-8')
+            with open(self.strings_file, 'ab') as f:
+                f.write(data)
+            self._strings_size += len(data)
+        return self._ids
+
+    def _next_id(self):
+        sid = self._last_id
+        while True:
+            sid = sid % 0xFFFFFFFF + 1   # 1 .. 2**32 - 1; 0 means empty
+            if sid not in self._strings:
+                self._last_id = sid
+                return sid
+
+    # ---------- retention ----------
+
+    def prune(self):
+        """Delete segments past max_segments or max_age, then compact strings.tsv if it has grown too big."""
+        with self._strings_locked():
+            paths = self.segments()
+            writing = self._writing(paths)
+            idle = [path for path in paths if path not in writing]
+            doomed = set(idle[:max(0, len(paths) - self.max_segments)]) if self.max_segments else set()
+            if self.max_age:
+                cutoff = time.time() - self.max_age
+                doomed.update(path for path in idle if _mtime(path) < cutoff)
+            for path in doomed:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            if self._strings_size > STRINGS_MAX_BYTES:
+                self._compact_strings()
+
+    @staticmethod
+    def _writing(paths):
+        """The segment each live writer process is appending to (its newest)."""
+        newest = {}
+        for path in paths:   # oldest first, so the last one seen per pid wins
+            match = re.search(r'seg-\d+-(\d+)-\d+\.bin$', path)
+            if match:
+                newest[int(match.group(1))] = path
+        return {path for pid, path in newest.items() if _alive(pid)}
+
+    def _compact_strings(self):
+        """Rewrite strings.tsv with only the ids still referenced (call with _strings_locked held)."""
+        used = set()
+        for rec in self.iter_records():
+            used.update(rec[2:5])
+        lines = [f'{sid}\t{text}\n' for sid, text in self._strings.items() if sid in used]
+        tmp = self.strings_file + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            f.writelines(lines)
+        # A new file: every worker notices (_load_strings) and reloads it from the start
+        os.replace(tmp, self.strings_file)
+        self._load_strings()
+
+    # ---------- reading ----------
+
+    def _load_strings(self):
+        """Bring the string table up to date, reading only what was appended since last time."""
+        with self._table_lock:
+            try:
+                st = os.stat(self.strings_file)
+            except OSError:
+                return self._strings
+            size = st.st_size
+            if st.st_ino != self._strings_ino:
+                # First load, or the file was rewritten by a compaction: read it from the start
+                if self._strings_ino is not None:
+                    self._strings, self._ids = {}, {}
+                self._strings_ino, self._strings_size = st.st_ino, 0
+            if size > self._strings_size:
+                with open(self.strings_file, 'rb') as f:
+                    f.seek(self._strings_size)
+                    chunk = f.read(size - self._strings_size)
+                # Whole lines only; one still being written is read next time
+                end = chunk.rfind(b'\n') + 1
+                for line in chunk[:end].decode('utf-8').splitlines():
+                    sid, _, text = line.partition('\t')
+                    sid = int(sid)
+                    self._strings[sid] = text
+                    self._ids.setdefault(text, sid)
+                    self._last_id = max(self._last_id, sid)
+                self._strings_size += end
+            return self._strings
+
+    def segments(self):
+        """Segment paths, oldest first."""
+        def started(path):
+            match = re.search(r'seg-(\d+)-\d+-(\d+)\.bin$', path)
+            return (int(match.group(1)), int(match.group(2))) if match else (0, 0)
+        return sorted(glob.glob(os.path.join(self.directory, 'seg-*.bin')), key=started)
+
+    def iter_records(self, since=0.0):
+        """Yield raw record tuples from every segment via mmap, without loading them all."""
+        for path in self.segments():
+            try:
+                size = os.path.getsize(path)
+            except OSError:
+                continue
+            usable = size - size % RECORD.size
+            if not usable:
+                continue
+            with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                # Records are time-ordered within a segment; skip old segments cheaply
+                last_ts = RECORD.unpack_from(mm, usable - RECORD.size)[0]
+                if last_ts < since:
+                    continue
+                full = memoryview(mm)
+                view = full[:usable]
+                records = RECORD.iter_unpack(view)
+                try:
+                    for rec in records:
+                        if rec[0] >= since:
+                            yield rec
+                finally:
+                    # Every export must be gone before the mmap can close
+                    del records
+                    view.release()
+                    full.release()
+
+    def stats(self, since=0.0, top=10):
+        """Intent frequency, latency percentiles, cache hit rate and top queries."""
+        intents = Counter()
+        upstreams = Counter()
+        queries = Counter()
+        hist = [0] * HIST_BUCKETS
+        total = hits = 0
+        first = last = None
+
+        for ts, latency, intent, upstream, query, hit in self.iter_records(since):
+            total += 1
+            hits += hit
+            intents[intent] += 1
+            if upstream:
+                upstreams[upstream] += 1
+            queries[query] += 1
+            hist[_bucket(latency)] += 1
+            if first is None:
+                first = ts
+            last = ts
+
+        strings = self._load_strings()
+
+        def name(sid):
+            return strings.get(sid, '') if sid else None
+
+        def percentile(p):
+            if not total:
+                return None
+            rank, seen = p / 100 * total, 0
+            for i, count in enumerate(hist):
+                seen += count
+                if seen >= rank:
+                    return round(_bucket_upper(i), 2)
+            return None
+
+        return {
+            'total': total,
+            'from': first,
+            'to': last,
+            'dropped': self.dropped,
+            'cache_hit_rate': round(hits / total, 4) if total else None,
+            'intents': {name(k): v for k, v in intents.most_common()},
+            'upstreams': {name(k): v for k, v in upstreams.most_common()},
+            'latency_ms': {f'p{p}': percentile(p) for p in (50, 90, 95, 99)},
+            'top_queries': [
+                {'query': name(k), 'count': v}
+                for k, v in queries.most_common(top + 1) if k
+            ][:top],
+        }
+
+    def top_queries(self, upstream, k=5, since=0.0):
+        """Most frequent lookup keys for one upstream, most common first."""
+        strings = self._load_strings()
+        target = self._ids.get(clean_string(upstream))
+        if target is None:
+            return []
+        counts = Counter(rec[4] for rec in self.iter_records(since) if rec[3] == target and rec[4])
+        return [strings[sid] for sid, _ in counts.most_common(k) if sid in strings]
@@ -0,0 +1,233 @@
+"""
+============================================
+DIYA — Structured Logging
+============================================
+Diagnostics are JSON records, one per line:
+
+  {"ts": 1767225600.123, "level": "error",
+   "event": "youtube_api_error", "cid": "9f2c...",
+   "pid": 4242, "status": 403, ...}
+
+Logging a record never waits on I/O: the
+caller only puts a tuple on a bounded queue
+(serialization happens on the writer). A
+background writer drains the queue in batches
+to stdout or to a size-rotated file. If the
+queue is full the record is dropped and
+counted. Drops are reported in a "log_dropped"
+record and under "logging" in /api/health.
+
+  cid     the correlation id of the command
+          being handled on this thread (bind())
+  debug   records are sampled (debug_sample);
+          a sampled record carries "sample"
+          so counts can be scaled back up
+
+DIYA_LOG=<path> writes to a file, rotated to
+<path>.1 ... <path>.LOG_BACKUPS past
+LOG_MAX_BYTES; unset or "-" means stdout.
+
+Serverless instances can be frozen as soon as
+a response is out, writer thread and all, so
+there configure(sync=True) writes each record
+to stdout straight away instead.
+============================================
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import queue
+import atexit
+import random
+import threading
+
+LEVELS = {'debug': 10, 'info': 20, 'warning': 30, 'error': 40}
+
+QUEUE_SIZE = 10000         # pending records before new ones are dropped
+BATCH_MAX = 1000           # records written per batch
+FLUSH_INTERVAL = 0.2       # seconds the writer waits to batch records
+LOG_MAX_BYTES = 10 << 20   # the log file is rotated past this
+LOG_BACKUPS = 5            # rotated files kept (<path>.1 is the newest)
+
+# The correlation id of the command running on this thread
+log_ctx = threading.local()
+
+# Query strings in error text (upstream URLs carry API keys: key=, appid=)
+URL_QUERY = re.compile(r'\?[^\s\'"()?]*=[^\s\'"()]*')
+
+
+def bind(cid):
+    """Tag records logged on this thread with a correlation id ('' to clear). Returns the previous one."""
+    previous = getattr(log_ctx, 'cid', '')
+    log_ctx.cid = cid
+    return previous
+
+
+def correlation_id():
+    return getattr(log_ctx, 'cid', '')
+
+
+def redact(text):
+    """Text with URL query strings cut off, safe to log or show."""
+    return URL_QUERY.sub('', str(text))
+
+
+def error_fields(e):
+    """Record fields for an exception: its type, HTTP status if any, and redacted text."""
+    fields = {'error_type': type(e).__name__, 'error': redact(e)}
+    status = getattr(getattr(e, 'response', None), 'status_code', None)
+    if status is not None:
+        fields['status'] = status
+    return fields
+
+
+class LogPipeline:
+    """Bounded queue of log records plus the background writer that batches them out."""
+
+    def __init__(self, path=None, level='info', debug_sample=1.0, queue_size=QUEUE_SIZE):
+        self.path = path if path and path != '-' else None
+        self.threshold = LEVELS[level]
+        self.debug_sample = debug_sample
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._pid = None
+        self._start_lock = threading.Lock()
+        self.stats = {'written': 0, 'dropped': 0, 'sampled_out': 0, 'write_errors': 0}
+        self._reported_drops = 0
+        self.sync = False
+
+    def configure(self, level=None, debug_sample=None, sync=None):
+        """Change the level, debug sampling or synchronous mode on the fly."""
+        if level in LEVELS:
+            self.threshold = LEVELS[level]
+        if debug_sample is not None:
+            self.debug_sample = max(0.0, min(1.0, float(debug_sample)))
+        if sync is not None:
+            self.sync = sync
+
+    # ---------- logging (request threads) ----------
+
+    def log(self, level, event, **fields):
+        """Queue one record (sync: write it now). Never blocks on a full queue; drops the record."""
+        severity = LEVELS[level]
+        if severity < self.threshold:
+            return
+        sample = 1.0
+        if severity == LEVELS['debug'] and self.debug_sample < 1.0:
+            sample = self.debug_sample
+            if random.random() >= sample:
+                self.stats['sampled_out'] += 1
+                return
+        if self.sync:
+            try:
+                self._write(self._format(os.getpid(), time.time(), level, event, correlation_id(), sample, fields))
+                self.stats['written'] += 1
+            except OSError:
+                self.stats['write_errors'] += 1
+            return
+        if self._pid != os.getpid():
+            self._start_writer()
+        try:
+            self._queue.put_nowait((time.time(), level, event, correlation_id(), sample, fields))
+        except queue.Full:
+            self.stats['dropped'] += 1
+
+    def debug(self, event, **fields):
+        self.log('debug', event, **fields)
+
+    def info(self, event, **fields):
+        self.log('info', event, **fields)
+
+    def warning(self, event, **fields):
+        self.log('warning', event, **fields)
+
+    def error(self, event, **fields):
+        self.log('error', event, **fields)
+
+    # ---------- writing (background) ----------
+
+    def _start_writer(self):
+        """Start the writer thread (again, after a fork: the parent's thread is not ours)."""
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            if self._pid is not None:
+                self._queue = queue.Queue(maxsize=self._queue.maxsize)
+            self._pid = os.getpid()
+            thread = threading.Thread(target=self._writer, daemon=True, name='log-writer')
+            thread.start()
+
+    def _writer(self):
+        pid = os.getpid()
+        while True:
+            batch = [self._queue.get()]
+            time.sleep(FLUSH_INTERVAL)
+            try:
+                while len(batch) < BATCH_MAX:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                pass
+            lines = [self._format(pid, *item) for item in batch]
+            dropped = self.stats['dropped']
+            if dropped != self._reported_drops:
+                lines.append(self._format(pid, time.time(), 'warning', 'log_dropped', '', 1.0,
+                                          {'count': dropped - self._reported_drops, 'total': dropped}))
+                self._reported_drops = dropped
+            try:
+                self._write(''.join(lines))
+                self.stats['written'] += len(batch)
+            except OSError:
+                self.stats['write_errors'] += 1
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    @staticmethod
+    def _format(pid, ts, level, event, cid, sample, fields):
+        record = {'ts': round(ts, 3), 'level': level, 'event': event, 'pid': pid}
+        if cid:
+            record['cid'] = cid
+        if sample < 1.0:
+            record['sample'] = sample
+        record.update(fields)
+        return json.dumps(record, ensure_ascii=False, default=str) + '\n'
+
+    def _write(self, text):
+        if self.path is None:
+            sys.stdout.write(text)
+            sys.stdout.flush()
+            return
+        try:
+            if os.path.getsize(self.path) > LOG_MAX_BYTES:
+                self._rotate()
+        except OSError:
+            pass
+        # Append mode: each batch is one write, so workers sharing the file don't interleave lines
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(text)
+
+    def _rotate(self):
+        for i in range(LOG_BACKUPS - 1, 0, -1):
+            try:
+                os.replace(f'{self.path}.{i}', f'{self.path}.{i + 1}')
+            except OSError:
+                pass
+        os.replace(self.path, self.path + '.1')
+
+    def flush(self, timeout=2.0):
+        """Wait (up to timeout seconds) for queued records to be written."""
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    def snapshot(self):
+        level = next(name for name, value in LEVELS.items() if value == self.threshold)
+        return dict(self.stats, queued=self._queue.qsize(), level=level, debug_sample=self.debug_sample,
+                    output=self.path or 'stdout', sync=self.sync)
+
+
+# One pipeline per process, shared by every module
+log = LogPipeline(os.environ.get('DIYA_LOG'))
+atexit.register(log.flush)
@@ -0,0 +1,283 @@
+"""
+============================================
+DIYA — Text Normalization
+============================================
+Turns whatever the browser's speech recognition
+(or the user's keyboard) produced into the plain
+lowercase English-keyword form the router
+matches against:
+
+  NFKC → Devanagari to Latin → punctuation
+  → Hinglish phrase aliases → number words
+
+  "मौसम कैसा है?"        -> "weather kaisa hai"
+  "kitne baje hain"      -> "what time hain"
+  "calculate five plus 3" -> "calculate 5 plus 3"
+
+All tables are compiled once at import time;
+config['language'] picks which set is used.
+Hindi words that double as names ("kal",
+"gaana") are only aliased for 'hi', and never
+in a slot ("open gaana").
+============================================
+"""
+
+import re
+import unicodedata
+
+# ============================================
+# DEVANAGARI → LATIN
+# ============================================
+# A light, Hinglish-style romanization (ा → a, ी → i) that matches how
+# people type Hindi in Latin script, with the usual schwa deletion rules.
+
+CONSONANTS = {
+    'क': 'k', 'ख': 'kh', 'ग': 'g', 'घ': 'gh', 'ङ': 'n',
+    'च': 'ch', 'छ': 'chh', 'ज': 'j', 'झ': 'jh', 'ञ': 'n',
+    'ट': 't', 'ठ': 'th', 'ड': 'd', 'ढ': 'dh', 'ण': 'n',
+    'त': 't', 'थ': 'th', 'द': 'd', 'ध': 'dh', 'न': 'n',
+    'प': 'p', 'फ': 'ph', 'ब': 'b', 'भ': 'bh', 'म': 'm',
+    'य': 'y', 'र': 'r', 'ल': 'l', 'व': 'v', 'ळ': 'l',
+    'श': 'sh', 'ष': 'sh', 'स': 's', 'ह': 'h',
+    'क़': 'q', 'ख़': 'kh', 'ग़': 'g', 'ज़': 'z', 'ड़': 'r', 'ढ़': 'rh', 'फ़': 'f', 'य़': 'y',
+}
+
+VOWELS = {
+    'अ': 'a', 'आ': 'a', 'इ': 'i', 'ई': 'i', 'उ': 'u', 'ऊ': 'u', 'ऋ': 'ri',
+    'ए': 'e', 'ऐ': 'ai', 'ओ': 'o', 'औ': 'au', 'ऑ': 'o',
+}
+
+MATRAS = {
+    'ा': 'a', 'ि': 'i', 'ी': 'i', 'ु': 'u', 'ू': 'u', 'ृ': 'ri',
+    'े': 'e', 'ै': 'ai', 'ो': 'o', 'ौ': 'au', 'ॉ': 'o',
+}
+
+MARKS = {'ं': 'n', 'ँ': 'n', 'ः': 'h'}
+VIRAMA = '्'
+NUKTA = '़'
+DIGITS = {chr(0x0966 + i): str(i) for i in range(10)}
+
+DEVANAGARI = re.compile(r'[ऀ-ॿ]+')
+
+
+def _syllables(word):
+    """Split a Devanagari word into (consonant, vowel) pairs; vowel None = inherent 'a'."""
+    out, i = [], 0
+    while i < len(word):
+        ch = word[i]
+        if i + 1 < len(word) and word[i + 1] == NUKTA:
+            ch += NUKTA
+            i += 1
+        i += 1
+        if ch in CONSONANTS:
+            vowel = None
+            if i < len(word) and word[i] == VIRAMA:
+                vowel, i = '', i + 1
+            elif i < len(word) and word[i] in MATRAS:
+                vowel, i = MATRAS[word[i]], i + 1
+            out.append([CONSONANTS[ch], vowel])
+        elif ch in VOWELS:
+            out.append(['', VOWELS[ch]])
+        elif ch in MARKS and out:
+            out[-1].append(MARKS[ch])
+        elif ch in DIGITS:
+            out.append([DIGITS[ch], ''])
+    return out
+
+
+def _romanize(match):
+    parts = _syllables(match.group())
+    for i, part in enumerate(parts):
+        if part[1] is not None:
+            continue
+        last = i == len(parts) - 1
+        # Schwa deletion: drop the inherent 'a' at the end of a word, and in a
+        # medial syllable that follows a vowel and precedes a consonant with its own vowel
+        medial = (
+            0 < i < len(parts) - 1
+            and parts[i - 1][1] != ''
+            and parts[i + 1][0] and parts[i + 1][1] not in (None, '')
+        )
+        part[1] = '' if (last and i > 0) or medial else 'a'
+    return ''.join(''.join(p) for p in parts)
+
+
+def transliterate(text):
+    """Romanize any Devanagari runs in the text."""
+    return DEVANAGARI.sub(_romanize, text)
+
+
+# ============================================
+# PHRASE ALIASES & WORD ORDER
+# ============================================
+# Hinglish phrases map onto the English keywords the router already knows,
+# so the router keeps a single keyword list per intent. These are safe in
+# every language: none of them is an English word or a common name part.
+
+HINGLISH_ALIASES = {
+    'samay': 'time', 'kitne baje': 'what time', 'kya time': 'what time', 'baje': 'time',
+    'tarikh': 'date', 'kaun sa din': 'date',
+    'mausam': 'weather', 'mosam': 'weather', 'taapmaan': 'temperature', 'tapman': 'temperature',
+    'namaste': 'hello', 'namaskar': 'hello', 'kaise ho': 'how are you', 'kaisi ho': 'how are you',
+    'mazak': 'joke', 'majak': 'joke', 'chutkula': 'joke',
+    'kisne banaya': 'who made you', 'tumhara naam': 'your name', 'tumhara nam': 'your name',
+    'aapka naam': 'your name', 'aapka nam': 'your name',
+    'shukriya': 'thanks', 'dhanyawad': 'thanks', 'dhanyavaad': 'thanks', 'dhanyavad': 'thanks',
+    'alvida': 'bye',
+}
+
+# Hindi words that are also names or parts of them ("kal ho naa ho",
+# "gaana"): only the 'hi' table set uses them
+HINDI_WORD_ALIASES = {
+    'aaj': 'today', 'kal': 'tomorrow', 'parso': 'day after tomorrow',
+    'kya': 'what', 'batao': 'tell', 'bataao': 'tell',
+    'gaana': 'song', 'gana': 'song',
+    'ghante': 'hours', 'minat': 'minutes', 'din': 'days',
+}
+
+# Operators only become English between two numbers ("do jama teen", not "jama masjid")
+HINDI_OPERATORS = {'jama': 'plus', 'jod': 'plus', 'ghata': 'minus', 'guna': 'times', 'bhaag': 'divided by'}
+
+# Everything after one of these is a slot (an app, a query, a title) and is
+# never aliased: "open gaana" stays "open gaana"
+SLOT_VERBS = re.compile(
+    r'^(?:hey \S+ )?(?:open|launch|play|search(?: for)?|google|who is|what is|tell me about|define|explain'
+    r'|take a note|save a note|note down|remember this)\b'
+)
+
+# Hindi puts the verb last: "tum hi ho bajao" -> "play tum hi ho"
+HINGLISH_ORDER = [
+    (re.compile(r'^(?!(?:ek )?(?:chutkula|mazak|majak|joke)\b)(.+?) (?:bajao|chalao|sunao)$'), r'play \1'),
+    (re.compile(r'^(.+?) (?:kholo|khol do)$'), r'open \1'),
+    (re.compile(r'^(.+?) (?:search karo|khojo|dhundo)$'), r'search \1'),
+    (re.compile(r'^(.+?) ke bare (?:mein|me) (?:batao|bataao|kya hai)$'), r'tell me about \1'),
+    (re.compile(r'^(?:note karo|likh lo|yaad rakhna) (.+)$'), r'take a note \1'),
+    (re.compile(r'^(.+?) (?:note karo|likh lo|yaad rakhna)$'), r'take a note \1'),
+    # "tata" on its own is goodbye; "tata motors" is a company
+    (re.compile(r'^(?:tata|ta ta)$'), 'bye'),
+]
+
+# ============================================
+# NUMBER WORDS
+# ============================================
+
+EN_NUMBERS = {
+    'zero': 0, 'one': 1, 'two': 2, 'three': 3, 'four': 4, 'five': 5, 'six': 6, 'seven': 7,
+    'eight': 8, 'nine': 9, 'ten': 10, 'eleven': 11, 'twelve': 12, 'thirteen': 13,
+    'fourteen': 14, 'fifteen': 15, 'sixteen': 16, 'seventeen': 17, 'eighteen': 18,
+    'nineteen': 19, 'twenty': 20, 'thirty': 30, 'forty': 40, 'fifty': 50, 'sixty': 60,
+    'seventy': 70, 'eighty': 80, 'ninety': 90,
+}
+
+HI_NUMBERS = {
+    'shunya': 0, 'ek': 1, 'do': 2, 'teen': 3, 'char': 4, 'chaar': 4, 'panch': 5, 'paanch': 5,
+    'chhe': 6, 'chheh': 6, 'saat': 7, 'sat': 7, 'aath': 8, 'ath': 8, 'nau': 9, 'das': 10,
+    'gyarah': 11, 'barah': 12, 'terah': 13, 'chaudah': 14, 'pandrah': 15, 'solah': 16,
+    'satrah': 17, 'atharah': 18, 'unnis': 19, 'bees': 20, 'pachchis': 25, 'tees': 30,
+    'chalis': 40, 'pachas': 50, 'pachaas': 50, 'saath': 60, 'sattar': 70, 'assi': 80, 'nabbe': 90,
+}
+
+EN_SCALES = {'hundred': 100, 'thousand': 1000, 'lakh': 100000, 'million': 1000000}
+HI_SCALES = {'sau': 100, 'hazar': 1000, 'hazaar': 1000, 'lakh': 100000, 'crore': 10000000}
+
+# A lone number word ("one", "do") only becomes a digit next to one of these,
+# so "the next one" and "how do you do" are left alone
+NUMBER_CONTEXT = {
+    'plus', 'minus', 'times', 'into', 'x', 'by', 'divided', 'multiplied', 'and', 'point',
+    'days', 'day', 'hours', 'hour', 'minutes', 'minute', 'seconds', 'second', 'percent',
+    'calculate', 'in', '+', '-', '*', '/', '^', '%',
+}
+
+
+def _parse_number(words, units, scales):
+    """Value of a run of number words ("twenty five", "do sau"), or None."""
+    total = current = 0
+    for word in words:
+        if word in units:
+            current += units[word]
+        elif word in scales:
+            scale = scales[word]
+            if scale == 100:
+                current = (current or 1) * 100
+            else:
+                total += (current or 1) * scale
+                current = 0
+        else:
+            return None
+    return total + current
+
+
+# ============================================
+# PIPELINE
+# ============================================
+
+# Sentence punctuation goes; math symbols, apostrophes and dots inside a
+# token ("2.5", "x.com") stay
+PUNCTUATION = re.compile(r'[?!,;:"“”।॥…]|\.(?!\w)|(?<!\w)\.')
+QUOTES = str.maketrans({'‘': "'", '’': "'"})
+
+
+class Normalizer:
+    """One compiled table set: aliases, word-order rewrites, number words and operators."""
+
+    def __init__(self, aliases, reorder, units, scales, operators=None):
+        self.aliases = aliases
+        self.alias_re = re.compile(
+            r'\b(?:' + '|'.join(re.escape(k) for k in sorted(aliases, key=len, reverse=True)) + r')\b'
+        ) if aliases else None
+        self.reorder = reorder
+        self.units = units
+        self.scales = scales
+        self.operators = operators or {}
+        self.context = NUMBER_CONTEXT | set(self.operators)
+
+    def __call__(self, text):
+        text = unicodedata.normalize('NFKC', text).translate(QUOTES)
+        if DEVANAGARI.search(text):
+            text = transliterate(text)
+        text = ' '.join(PUNCTUATION.sub(' ', text.lower()).split())
+        for pattern, replacement in self.reorder:
+            text = pattern.sub(replacement, text)
+        if self.alias_re is not None:
+            slot = SLOT_VERBS.match(text)
+            head, tail = (text[:slot.end()], text[slot.end():]) if slot else (text, '')
+            text = self.alias_re.sub(lambda m: self.aliases[m.group()], head) + tail
+        return self._numbers(text)
+
+    def _numbers(self, text):
+        words = text.split(' ')
+        out, i = [], 0
+        while i < len(words):
+            j = i
+            while j < len(words) and (words[j] in self.units or (j > i and words[j] in self.scales)):
+                j += 1
+            if j == i:
+                out.append(words[i])
+                i += 1
+                continue
+            run = words[i:j]
+            value = _parse_number(run, self.units, self.scales)
+            neighbours = {out[-1] if out else '', words[j] if j < len(words) else ''}
+            numeric = any(n[:1].isdigit() for n in neighbours)
+            if value is not None and (len(run) > 1 or numeric or neighbours & self.context):
+                out.append(str(value))
+            else:
+                out.extend(run)
+            i = j
+        if self.operators:
+            for i in range(1, len(out) - 1):
+                if out[i] in self.operators and out[i - 1][:1].isdigit() and out[i + 1][:1].isdigit():
+                    out[i] = self.operators[out[i]]
+        return ' '.join(out)
+
+
+TABLE_SETS = {
+    'en': Normalizer(HINGLISH_ALIASES, HINGLISH_ORDER, EN_NUMBERS, EN_SCALES),
+    'hi': Normalizer({**HINGLISH_ALIASES, **HINDI_WORD_ALIASES}, HINGLISH_ORDER,
+                     {**EN_NUMBERS, **HI_NUMBERS}, {**EN_SCALES, **HI_SCALES}, HINDI_OPERATORS),
+}
+
+
+def normalize(text, language='en'):
+    """Routing form of a command for the configured language (falls back to English)."""
+    return TABLE_SETS.get(language, TABLE_SETS['en'])(text)
@@ -0,0 +1,225 @@
+"""
+============================================
+DIYA — Request Profiling
+============================================
+Opt-in profiling that stays compiled in, so it
+can be switched on in production mid-incident
+from /api/settings without a restart:
+
+  /api/command?profile=1         the response carries
+  (or X-Diya-Profile: 1)         that request's stack
+                                 samples, collapsed
+  profile_sample_rate = 0.01     1% of commands are
+                                 sampled into a ring of
+                                 profiles/*.folded files
+  slow_command_ms = 800          slower commands are
+                                 logged to profiles/slow.jsonl
+                                 with stages and stacks
+
+Collapsed stacks ("a;b;c 12" per line) feed
+straight into flamegraph.pl or speedscope.
+
+One background thread samples the stacks of
+the request threads being watched, and only
+runs while something is watched; with every
+switch off a request pays two comparisons.
+============================================
+"""
+
+import os
+import sys
+import glob
+import json
+import queue
+import random
+import threading
+import time
+from collections import Counter
+
+from logs import log
+
+SAMPLE_INTERVAL = 0.002      # seconds between stack samples
+MAX_DEPTH = 64               # frames kept per sample (innermost)
+RING_SIZE = 200              # sampled profiles kept on disk
+SLOW_LOG_MAX_BYTES = 5 << 20 # slow.jsonl is rotated to slow.jsonl.1 past this
+QUEUE_SIZE = 1000            # pending writes before new ones are dropped
+
+
+def fold(frame):
+    """One collapsed-stack line (root first) for a frame."""
+    names = []
+    while frame is not None and len(names) < MAX_DEPTH:
+        code = frame.f_code
+        names.append(f'{os.path.basename(code.co_filename)}:{code.co_name}')
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+class Trace:
+    """Stage timings and stack samples for one request."""
+
+    __slots__ = ('thread_id', 'started', 'sample_from', 'sampled', 'stacks', 'stages')
+
+    def __init__(self, sample_after, sampled):
+        self.thread_id = threading.get_ident()
+        self.started = time.perf_counter()
+        # Slow-log-only traces start sampling once a request is already running long
+        self.sample_from = self.started + sample_after
+        self.sampled = sampled
+        self.stacks = Counter()
+        self.stages = []
+
+    def stage(self, name):
+        return _Stage(self, name)
+
+    def elapsed_ms(self):
+        return (time.perf_counter() - self.started) * 1000
+
+    def collapsed(self):
+        return '\n'.join(f'{stack} {count}' for stack, count in self.stacks.most_common())
+
+    def summary(self):
+        return {
+            'stages': [{'stage': name, 'ms': round(ms, 3)} for name, ms in self.stages],
+            'samples': sum(self.stacks.values()),
+            'interval_ms': SAMPLE_INTERVAL * 1000,
+            'collapsed': self.collapsed(),
+        }
+
+
+class _Stage:
+    __slots__ = ('trace', 'name', 'started')
+
+    def __init__(self, trace, name):
+        self.trace = trace
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+
+    def __exit__(self, *exc):
+        self.trace.stages.append((self.name, (time.perf_counter() - self.started) * 1000))
+
+
+class Profiler:
+    """Starts and finishes traces, samples their stacks and writes the results."""
+
+    def __init__(self, directory, ring_size=RING_SIZE):
+        self.directory = directory
+        self.ring_size = ring_size
+        self.slow_log = os.path.join(directory, 'slow.jsonl')
+        self.traces = {}
+        self.lock = threading.Lock()
+        self.wake = threading.Event()
+        self.sampler = None
+        self.writes = queue.Queue(QUEUE_SIZE)
+        self.writer = None
+        self.dropped = 0
+        self.written = 0
+
+    # ---- request hooks ----
+
+    def begin(self, explicit=False, sample_rate=0.0, slow_ms=0):
+        """A Trace if this request should be profiled, else None."""
+        sampled = explicit or (sample_rate > 0 and random.random() < sample_rate)
+        if not sampled and not slow_ms:
+            return None
+        trace = Trace(0.0 if sampled else slow_ms / 2000, sampled)
+        with self.lock:
+            self.traces[trace.thread_id] = trace
+            if self.sampler is None:
+                self.sampler = threading.Thread(target=self._sample, daemon=True, name='profiler')
+                self.sampler.start()
+        self.wake.set()
+        return trace
+
+    def end(self, trace, command, intent, latency_ms, explicit=False, slow_ms=0):
+        """Stop sampling a trace and queue its ring profile / slow-log entry."""
+        with self.lock:
+            self.traces.pop(trace.thread_id, None)
+        if trace.sampled and not explicit:
+            self._queue('ring', trace.collapsed())
+        if slow_ms and latency_ms >= slow_ms:
+            self._queue('slow', json.dumps({
+                'ts': time.time(),
+                'command': command,
+                'intent': intent,
+                'latency_ms': round(latency_ms, 3),
+                **trace.summary(),
+            }, ensure_ascii=False))
+
+    # ---- sampling ----
+
+    def _sample(self):
+        while True:
+            if not self.traces:
+                self.wake.wait()
+                self.wake.clear()
+                continue
+            time.sleep(SAMPLE_INTERVAL)
+            now = time.perf_counter()
+            with self.lock:
+                watched = [t for t in self.traces.values() if now >= t.sample_from]
+            if not watched:
+                continue
+            frames = sys._current_frames()
+            for trace in watched:
+                frame = frames.get(trace.thread_id)
+                if frame is not None:
+                    trace.stacks[fold(frame)] += 1
+            del frames
+
+    # ---- output (off the request path) ----
+
+    def _queue(self, kind, payload):
+        if self.writer is None:
+            with self.lock:
+                if self.writer is None:
+                    os.makedirs(self.directory, exist_ok=True)
+                    self.writer = threading.Thread(target=self._write, daemon=True, name='profile-writer')
+                    self.writer.start()
+        try:
+            self.writes.put_nowait((kind, payload))
+        except queue.Full:
+            self.dropped += 1
+
+    def _write(self):
+        while True:
+            kind, payload = self.writes.get()
+            try:
+                if kind == 'ring':
+                    self._write_ring(payload)
+                else:
+                    self._write_slow(payload)
+            except OSError as e:
+                log.error('profile_write_error', error=str(e))
+
+    def _write_ring(self, collapsed):
+        self.written += 1
+        name = f'{int(time.time() * 1000)}-{os.getpid()}-{self.written}.folded'
+        with open(os.path.join(self.directory, name), 'w', encoding='utf-8') as f:
+            f.write(collapsed + '\n')
+        profiles = sorted(glob.glob(os.path.join(self.directory, '*.folded')), key=os.path.basename)
+        for old in profiles[:-self.ring_size]:
+            try:
+                os.remove(old)
+            except OSError:
+                pass  # another worker removed it first
+
+    def _write_slow(self, line):
+        try:
+            if os.path.getsize(self.slow_log) > SLOW_LOG_MAX_BYTES:
+                os.replace(self.slow_log, self.slow_log + '.1')
+        except OSError:
+            pass
+        with open(self.slow_log, 'a', encoding='utf-8') as f:
+            f.write(line + '\n')
+
+    def recent_slow(self, limit=20):
+        """Newest slow-log entries, newest first."""
+        try:
+            with open(self.slow_log, encoding='utf-8') as f:
+                lines = f.readlines()[-limit:]
+        except OSError:
+            return []
+        return [json.loads(line) for line in reversed(lines) if line.strip()]
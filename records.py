@@ -0,0 +1,257 @@
+"""
+============================================
+DIYA — Compact Records
+============================================
+Notes, command results and the upstream data
+they carry (weather, forecasts, videos) are
+__slots__ records instead of dicts: no per-
+instance dict, and timestamps are stored as
+epoch floats rather than preformatted strings.
+
+Records turn into the existing JSON shapes only
+at the edge (to_json(), used by the Flask JSON
+provider and json_default), so the wire format
+and notes.json stay backward compatible: a note
+still serializes as {"id", "content", "time"},
+plus the sortable "ts" it is now kept as.
+Handlers can keep reading records dict-style
+(result['response'], data.get('city')).
+
+  python records.py bench [--notes 1000000]
+
+prints bytes per note and per result, dicts vs
+records.
+============================================
+"""
+
+import sys
+import time
+import datetime
+import argparse
+
+from flask.json.provider import DefaultJSONProvider
+
+NOTE_TIME_FORMAT = '%d %b %Y, %I:%M %p'
+
+
+class Record:
+    """Base for compact records: __slots__ storage, dict-style reads, JSON at the edge."""
+
+    __slots__ = ()
+
+    def get(self, key, default=None):
+        return getattr(self, key, default)
+
+    def __getitem__(self, key):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def to_json(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+def json_default(obj):
+    """json.dumps default=: records by their JSON shape, anything else as a string."""
+    to_json = getattr(obj, 'to_json', None)
+    return to_json() if to_json is not None else str(obj)
+
+
+class RecordJSONProvider(DefaultJSONProvider):
+    """Lets jsonify() take records (and lists or dicts of them) directly."""
+
+    @staticmethod
+    def default(obj):
+        if isinstance(obj, Record):
+            return obj.to_json()
+        return DefaultJSONProvider.default(obj)
+
+
+# ============================================
+# NOTES
+# ============================================
+
+class Note(Record):
+    __slots__ = ('id', 'content', 'ts')
+
+    def __init__(self, id, content, ts):
+        self.id = id
+        self.content = content
+        self.ts = ts
+
+    @classmethod
+    def new(cls, content):
+        ts = time.time()
+        return cls(int(ts * 1000), content, ts)
+
+    @classmethod
+    def from_json(cls, value):
+        """A note from notes.json; files written before "ts" existed still load."""
+        note_id = value.get('id', 0)
+        ts = value.get('ts')
+        if ts is None:
+            if 1e12 <= note_id < 1e13:
+                ts = note_id / 1000   # ids are creation times in milliseconds
+            else:
+                try:
+                    ts = datetime.datetime.strptime(value.get('time', ''), NOTE_TIME_FORMAT).timestamp()
+                except ValueError:
+                    ts = 0.0
+        return cls(note_id, value.get('content', ''), ts)
+
+    @property
+    def time(self):
+        return datetime.datetime.fromtimestamp(self.ts).strftime(NOTE_TIME_FORMAT)
+
+    def to_json(self):
+        return {'id': self.id, 'content': self.content, 'time': self.time, 'ts': self.ts}
+
+
+# ============================================
+# COMMAND RESULTS
+# ============================================
+
+class Result(Record):
+    """What a skill answers: {'response', 'action', 'data'} plus any extra fields."""
+
+    __slots__ = ('response', 'action', 'data', 'extra')
+
+    def __init__(self, response, action=None, data=None, extra=None):
+        self.response = response
+        self.action = action
+        self.data = data
+        self.extra = extra
+
+    def get(self, key, default=None):
+        if key in ('response', 'action', 'data'):
+            return getattr(self, key)
+        return self.extra.get(key, default) if self.extra else default
+
+    def __getitem__(self, key):
+        value = self.get(key, KeyError)
+        if value is KeyError:
+            raise KeyError(key)
+        return value
+
+    def to_json(self):
+        body = {'response': self.response, 'action': self.action, 'data': self.data}
+        if self.extra:
+            body.update(self.extra)
+        return body
+
+
+def with_fields(result, **fields):
+    """A copy of a result (record or dict) with extra top-level fields."""
+    if isinstance(result, Result):
+        return Result(result.response, result.action, result.data, {**(result.extra or {}), **fields})
+    return dict(result, **fields)
+
+
+# ============================================
+# UPSTREAM DATA
+# ============================================
+
+class Weather(Record):
+    __slots__ = ('city', 'id', 'temp', 'feels_like', 'humidity', 'description', 'main')
+
+    def __init__(self, city, id, temp, feels_like, humidity, description, main):
+        self.city = city
+        self.id = id
+        self.temp = temp
+        self.feels_like = feels_like
+        self.humidity = humidity
+        self.description = description
+        self.main = main
+
+
+class Forecast(Record):
+    __slots__ = ('city', 'day', 'date', 'temp_min', 'temp_max', 'humidity', 'description', 'main')
+
+    def __init__(self, city, day, date, temp_min, temp_max, humidity, description, main):
+        self.city = city
+        self.day = day
+        self.date = date
+        self.temp_min = temp_min
+        self.temp_max = temp_max
+        self.humidity = humidity
+        self.description = description
+        self.main = main
+
+
+class Video(Record):
+    __slots__ = ('video_id', 'title', 'channel', 'thumbnail')
+
+    def __init__(self, video_id, title, channel, thumbnail):
+        self.video_id = video_id
+        self.title = title
+        self.channel = channel
+        self.thumbnail = thumbnail
+
+    def row(self):
+        return self.video_id, self.title, self.channel, self.thumbnail
+
+    def to_json(self):
+        return {'videoId': self.video_id, 'title': self.title, 'channel': self.channel, 'thumbnail': self.thumbnail}
+
+
+# ============================================
+# MEMORY BENCHMARK
+# ============================================
+
+def _measure(build, count):
+    """Bytes per object allocated by build(i), over count objects kept alive."""
+    import gc
+    import tracemalloc
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    kept = [build(i) for i in range(count)]
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    # The list holding them is the same either way; leave it out
+    used -= sys.getsizeof(kept)
+    del kept
+    return used / count
+
+
+def bench(count):
+    start = time.time() - count
+
+    def old_note(i):
+        ts = start + i
+        return {'id': int(ts * 1000), 'content': f'note number {i}',
+                'time': datetime.datetime.fromtimestamp(ts).strftime(NOTE_TIME_FORMAT)}
+
+    def new_note(i):
+        ts = start + i
+        return Note(int(ts * 1000), f'note number {i}', ts)
+
+    def old_result(i):
+        return {'response': f'Got it! I\'ve saved your note: "note number {i}".', 'action': 'note_saved', 'data': None}
+
+    def new_result(i):
+        return Result(f'Got it! I\'ve saved your note: "note number {i}".', 'note_saved')
+
+    results = min(count, 100000)
+    rows = [
+        ('note', count, _measure(old_note, count), _measure(new_note, count)),
+        ('result', results, _measure(old_result, results), _measure(new_result, results)),
+    ]
+    print(f"{'record':<8} {'count':>9} {'dict B':>8} {'slots B':>8} {'saved':>6}")
+    for name, n, old, new in rows:
+        print(f"{name:<8} {n:>9} {old:>8.0f} {new:>8.0f} {1 - new / old:>6.0%}")
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description='Memory per record: dicts vs __slots__ records.')
+    sub = parser.add_subparsers(dest='cmd', required=True)
+    b = sub.add_parser('bench', help='measure bytes per note and per command result')
+    b.add_argument('--notes', type=int, default=1000000)
+    args = parser.parse_args(argv)
+    if args.cmd == 'bench':
+        bench(args.notes)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
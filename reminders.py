@@ -0,0 +1,321 @@
+"""
+============================================
+DIYA — Reminders & Timers
+============================================
+"Remind me in 10 minutes to call mom" and "set
+a timer for 5 minutes" live in a heap keyed by
+due time, backed by a write-ahead log kept next
+to notes.json so they survive restarts. One
+JSON record per line:
+
+  {"op": "add", "id": "...", "due": 1700000000.0, "kind": "timer",
+   "text": "...", "session": "...", "speak": false}
+  {"op": "cancel", "id": "..."}
+  {"op": "fire", "id": "..."}
+
+Scheduling is a heap push (O(log n)). Cancelling
+drops the id from a dict (O(1)); its heap entry
+goes stale and is skipped when it surfaces. One
+thread sleeps on a Condition until the earliest
+due time, so an idle server wakes only when a
+reminder is due, an earlier one is added, or
+every MAX_WAIT seconds at most. The
+log is rewritten with just the pending reminders
+once dead records outnumber them.
+
+Worker processes share the log. Each replays
+what the others appended whenever it touches
+the log, and a due reminder is fired by the
+process that first appends its "fire" record
+under the log lock, so it is delivered once.
+============================================
+"""
+
+import os
+import json
+import heapq
+import uuid
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+
+from logs import log
+
+try:
+    import fcntl
+except ImportError:  # Windows: single process, thread lock is enough
+    fcntl = None
+
+MAX_WAIT = 300              # longest sleep: re-reads the wall clock and picks up other workers' reminders
+COMPACT_MIN = 1000          # dead log records tolerated before a rewrite is considered
+INBOX_PER_SESSION = 20      # fired reminders held for a session's next response
+INBOX_SESSIONS = 1000       # sessions with undelivered reminders kept at once
+INBOX_TTL = 60 * 60         # seconds a fired reminder waits for its session to come back
+
+
+def _parse_records(data):
+    """Log records in a run of complete lines, skipping any line that isn't valid JSON."""
+    try:
+        # One parse for the whole run: a restart replays the log much faster than line by line
+        return json.loads(b'[' + data.rstrip(b'\n').replace(b'\n', b',') + b']')
+    except ValueError:
+        records = []
+        for line in data.splitlines():
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                continue
+        return records
+
+
+class Reminder:
+    """One pending reminder or timer."""
+
+    __slots__ = ('id', 'due', 'kind', 'text', 'session', 'speak')
+
+    def __init__(self, id, due, kind, text='', session='', speak=False):
+        self.id = id
+        self.due = due
+        self.kind = kind
+        self.text = text
+        self.session = session
+        self.speak = speak
+
+    def record(self):
+        return {'op': 'add', 'id': self.id, 'due': self.due, 'kind': self.kind,
+                'text': self.text, 'session': self.session, 'speak': self.speak}
+
+    def to_dict(self):
+        return {'id': self.id, 'due': self.due, 'kind': self.kind, 'text': self.text}
+
+
+class ReminderScheduler:
+    """Heap of pending reminders, a write-ahead log, and the thread that fires them."""
+
+    def __init__(self, path, on_due):
+        """on_due(reminder) runs on the scheduler thread once per fired reminder."""
+        self.path = path
+        self.lock_path = path + '.lock'
+        self.on_due = on_due
+        self.pending = {}            # id -> Reminder
+        self.heap = []               # (due, id); stale once the id is cancelled or fired
+        self.cond = threading.Condition()
+        self.thread_lock = threading.Lock()
+        self.inode = None
+        self.offset = 0              # bytes of the log already applied
+        self.dead = 0                # log records that no longer describe a pending reminder
+        self.inbox = OrderedDict()   # session -> deque of (fired_at, Reminder)
+        self.thread = None
+        self.stats = {'scheduled': 0, 'cancelled': 0, 'fired': 0, 'compactions': 0}
+
+    def start(self):
+        """Start the firing thread (idempotent)."""
+        if self.thread is None:
+            with self.cond:
+                if self.thread is None:
+                    self.thread = threading.Thread(target=self._run, daemon=True, name='reminders')
+                    self.thread.start()
+
+    # ---------- log ----------
+
+    @contextmanager
+    def _log_locked(self):
+        """Hold the log lock across threads and worker processes (taken before self.cond)."""
+        with self.thread_lock:
+            if fcntl is None:
+                yield
+                return
+            with open(self.lock_path, 'a') as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _sync(self):
+        """Apply log records appended since the last read (by any process). Caller holds self.cond."""
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return
+        if st.st_ino != self.inode or st.st_size < self.offset:
+            # First read, or another process compacted the log: start over
+            loading = self.inode is None
+            self.pending, self.heap = {}, []
+            self.inode, self.offset, self.dead = st.st_ino, 0, 0
+        else:
+            loading = False
+        if st.st_size == self.offset:
+            return
+        with open(self.path, 'rb') as f:
+            f.seek(self.offset)
+            data = f.read(st.st_size - self.offset)
+        end = data.rfind(b'\n') + 1      # a line still being written is read next time
+        self.offset += end
+        now = time.time()
+        pending, heap = self.pending, self.heap
+        bulk = not heap     # replaying from scratch: heapify once at the end
+        for rec in _parse_records(data[:end]):
+            if rec.get('op') == 'add':
+                reminder = Reminder(rec['id'], rec['due'], rec.get('kind', 'reminder'), rec.get('text', ''),
+                                    rec.get('session', ''), rec.get('speak', False))
+                pending[reminder.id] = reminder
+                if bulk:
+                    heap.append((reminder.due, reminder.id))
+                else:
+                    heapq.heappush(heap, (reminder.due, reminder.id))
+            else:
+                reminder = pending.pop(rec.get('id'), None)
+                self.dead += 2 if reminder else 1
+                if reminder and rec['op'] == 'fire' and not loading:
+                    self._to_inbox(reminder, now)
+        if bulk:
+            heapq.heapify(heap)
+
+    def _append(self, records):
+        """Append records to the log and fsync. Caller holds the log lock and self.cond, after _sync()."""
+        data = ''.join(json.dumps(r, ensure_ascii=False) + '\n' for r in records).encode('utf-8')
+        with open(self.path, 'ab') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+            self.offset = f.tell()
+            self.inode = os.fstat(f.fileno()).st_ino
+
+    def _maybe_compact(self):
+        """Rewrite the log with only pending reminders once it is mostly dead records."""
+        if self.dead < COMPACT_MIN or self.dead < len(self.pending):
+            return
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp, 'wb') as f:
+            for reminder in self.pending.values():
+                f.write(json.dumps(reminder.record(), ensure_ascii=False).encode('utf-8') + b'\n')
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+        st = os.stat(self.path)
+        self.inode, self.offset, self.dead = st.st_ino, st.st_size, 0
+        self.stats['compactions'] += 1
+
+    # ---------- heap ----------
+
+    def _push(self, reminder):
+        self.pending[reminder.id] = reminder
+        heapq.heappush(self.heap, (reminder.due, reminder.id))
+
+    def _head(self):
+        """Earliest pending reminder, dropping stale heap entries on the way."""
+        heap, pending = self.heap, self.pending
+        while heap and heap[0][1] not in pending:
+            heapq.heappop(heap)
+        if len(heap) > 2 * len(pending) + 64:
+            # Mostly cancelled entries: rebuild rather than pop them one by one
+            self.heap = heap = [(r.due, r.id) for r in pending.values()]
+            heapq.heapify(heap)
+        return pending[heap[0][1]] if heap else None
+
+    # ---------- API ----------
+
+    def schedule(self, due, kind='reminder', text='', session='', speak=False):
+        """Add a reminder due at an epoch time; returns it."""
+        reminder = Reminder(uuid.uuid4().hex[:12], float(due), kind, text, session, bool(speak))
+        with self._log_locked(), self.cond:
+            self._sync()
+            self._append([reminder.record()])
+            head = self._head()
+            self._push(reminder)
+            self.stats['scheduled'] += 1
+            if head is None or reminder.due < head.due:
+                self.cond.notify()   # the firing thread is sleeping towards a later time
+        self.start()
+        return reminder
+
+    def cancel(self, ids):
+        """Cancel pending reminders by id; returns the ones that were still pending."""
+        with self._log_locked(), self.cond:
+            self._sync()
+            cancelled = [self.pending.pop(i) for i in ids if i in self.pending]
+            if cancelled:
+                self._append([{'op': 'cancel', 'id': r.id} for r in cancelled])
+                self.dead += 2 * len(cancelled)
+                self.stats['cancelled'] += len(cancelled)
+                self._maybe_compact()
+        return cancelled
+
+    def upcoming(self, kind=None, limit=10):
+        """The next pending reminders (all of them if limit is None), soonest first."""
+        with self.cond:
+            self._sync()
+            reminders = [r for r in self.pending.values() if kind is None or r.kind == kind]
+        if limit is None:
+            return sorted(reminders, key=lambda r: r.due)
+        return heapq.nsmallest(limit, reminders, key=lambda r: r.due)
+
+    def take_fired(self, session):
+        """Fired reminders not yet handed to this session (piggybacked on its next response)."""
+        with self.cond:
+            self._sync()    # one stat unless another process fired something
+            fired = self.inbox.pop(session, None) if self.inbox else None
+        if not fired:
+            return []
+        cutoff = time.time() - INBOX_TTL
+        return [r for fired_at, r in fired if fired_at >= cutoff]
+
+    def _to_inbox(self, reminder, now):
+        if not reminder.session:
+            return
+        box = self.inbox.get(reminder.session)
+        if box is None:
+            box = self.inbox[reminder.session] = deque(maxlen=INBOX_PER_SESSION)
+            while len(self.inbox) > INBOX_SESSIONS:
+                self.inbox.popitem(last=False)
+        box.append((now, reminder))
+
+    def snapshot(self):
+        with self.cond:
+            head = self._head()
+            return dict(self.stats, pending=len(self.pending), next_due=head.due if head else None)
+
+    # ---------- firing ----------
+
+    def _claim_due(self):
+        """Mark every due reminder fired in the log; returns the ones this process claimed."""
+        with self._log_locked(), self.cond:
+            self._sync()    # another process may have fired or cancelled them already
+            now = time.time()
+            due = []
+            head = self._head()
+            while head is not None and head.due <= now:
+                del self.pending[head.id]
+                due.append(head)
+                head = self._head()
+            if due:
+                self._append([{'op': 'fire', 'id': r.id} for r in due])
+                self.dead += 2 * len(due)
+                self.stats['fired'] += len(due)
+                for reminder in due:
+                    self._to_inbox(reminder, now)
+                self._maybe_compact()
+            return due
+
+    def _run(self):
+        while True:
+            with self.cond:
+                self._sync()
+                head = self._head()
+                delay = head.due - time.time() if head is not None else MAX_WAIT
+                if delay > 0:
+                    self.cond.wait(min(delay, MAX_WAIT))
+                    continue
+            try:
+                fired = self._claim_due()
+            except OSError as e:
+                log.error('reminder_log_error', error=str(e))
+                time.sleep(1)
+                continue
+            for reminder in fired:
+                try:
+                    self.on_due(reminder)
+                except Exception as e:
+                    log.error('reminder_delivery_error', error=str(e), reminder=reminder.id)
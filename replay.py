@@ -0,0 +1,289 @@
+"""
+============================================
+DIYA — Traffic Recording & Replay
+============================================
+Record real /api/command traffic, then replay
+it against a candidate build to compare latency
+and answers before rolling it out.
+
+Recording: start the server with
+  DIYA_RECORD=traffic.jsonl python serve.py
+Every command is appended as one JSON line
+(request_id / title / body, like requests.jsonl)
+with the request, the response, its latency and
+the upstream payloads it used (fixtures).
+
+Replaying:
+  python replay.py run traffic.jsonl --spawn            # 1x recorded pacing
+  python replay.py run traffic.jsonl --speed 10         # 10x faster
+  python replay.py run traffic.jsonl --rps 200          # open-loop fixed rate
+  python replay.py run traffic.jsonl --url http://host:5000
+
+--spawn starts serve.py with DIYA_REPLAY_FIXTURES
+set, so weather/YouTube/Wikipedia answers come
+from the recording instead of the network (point
+it at a scratch checkout: notes are written).
+Template variants are picked with a seed derived
+from the request id, so answers are repeatable.
+============================================
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import socket
+import argparse
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+from records import json_default
+
+# Volatile parts of an answer that may legitimately differ between runs
+DIFF_MASKS = [
+    (re.compile(r'\b\d{1,2}:\d{2}\s?[AP]M\b'), '<time>'),
+    (re.compile(r'\b(?:Monday|Tuesday|Wednesday|Thursday|Friday|Saturday|Sunday), \w+ \d{2}, \d{4}\b'), '<date>'),
+    (re.compile(r'\bGood (?:morning|afternoon|evening)\b'), 'Good <period>'),
+]
+VOLATILE_DATA_KEYS = {'id', 'time', 'ts'}
+
+
+# ============================================
+# RECORDING (used by main.py)
+# ============================================
+
+class TrafficRecorder:
+    """Appends one JSON line per command. Safe across threads and worker processes."""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._seq = 0
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    def new_id(self):
+        with self._lock:
+            self._seq += 1
+            return f'rec-{int(time.time() * 1000)}-{os.getpid()}-{self._seq}'
+
+    def record(self, request_id, payload, status, result, latency_ms, fixtures):
+        command = payload.get('command', '')
+        line = json.dumps({
+            'request_id': request_id,
+            'title': command[:80],
+            'body': command,
+            'ts': time.time(),
+            'request': payload,
+            'status': status,
+            'response': result,
+            'latency_ms': round(latency_ms, 3),
+            'fixtures': fixtures or [],
+        }, ensure_ascii=False, default=json_default) + '\n'
+        # One write() per line on an O_APPEND file keeps lines from interleaving
+        with self._lock, open(self.path, 'a', encoding='utf-8') as f:
+            f.write(line)
+
+
+def load_traffic(path):
+    """Recorded commands in order. Plain requests.jsonl-style lines replay their body as the command."""
+    records = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                rec = json.loads(line)
+                rec.setdefault('request', {'command': rec.get('body', '')})
+                records.append(rec)
+    return records
+
+
+def load_fixtures(path):
+    """{(kind, key): payload} for every upstream lookup in a recording (last one wins)."""
+    fixtures = {}
+    for rec in load_traffic(path):
+        for kind, key, value in rec.get('fixtures', []):
+            fixtures[(kind, key)] = value
+    return fixtures
+
+
+# ============================================
+# REPLAY
+# ============================================
+
+def schedule(records, speed=1.0, rps=None):
+    """Send offsets (seconds from start) for each record."""
+    if rps:
+        return [i / rps for i in range(len(records))]
+    if not speed:
+        return [0.0] * len(records)
+    first = next((r['ts'] for r in records if 'ts' in r), None)
+    if first is None:
+        return [0.0] * len(records)
+    return [max(0.0, (r.get('ts', first) - first) / speed) for r in records]
+
+
+def replay(records, url, offsets, concurrency=32, timeout=30):
+    """Open-loop replay: each request is sent at its offset whether or not earlier ones finished."""
+    import requests
+
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=concurrency, pool_maxsize=concurrency)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    results = [None] * len(records)
+
+    def send(i, due):
+        rec = records[i]
+        try:
+            r = session.post(
+                f'{url}/api/command', json=rec['request'], timeout=timeout,
+                headers={'X-Request-Id': str(rec.get('request_id', i))}
+            )
+            body = r.json() if r.headers.get('content-type', '').startswith('application/json') else None
+            status = r.status_code
+        except Exception as e:
+            body, status = {'error': str(e)}, None
+        # Latency from the scheduled send time, so a backed-up server can't hide its queueing
+        results[i] = (status, time.perf_counter() - due, body)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for i, offset in enumerate(offsets):
+            due = start + offset
+            delay = due - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(send, i, due)
+    return results, time.perf_counter() - start
+
+
+def _mask(text):
+    for pattern, replacement in DIFF_MASKS:
+        text = pattern.sub(replacement, text)
+    return text
+
+
+def comparable(result):
+    """The parts of a response a diff should look at."""
+    if not isinstance(result, dict):
+        return result
+    data = result.get('data')
+    if isinstance(data, dict):
+        data = {k: v for k, v in data.items() if k not in VOLATILE_DATA_KEYS}
+    return {'response': _mask(str(result.get('response', ''))), 'action': result.get('action'), 'data': data}
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, int(round(p / 100 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def report(records, results, elapsed, show_diffs=10):
+    """Latency percentiles, error rate and response diffs against the recording."""
+    latencies = sorted(lat * 1000 for status, lat, _ in results if status == 200)
+    errors = [(rec, res) for rec, res in zip(records, results) if res[0] != 200]
+    diffs = []
+    for rec, (status, _, body) in zip(records, results):
+        if status == 200 and 'response' in rec and comparable(rec['response']) != comparable(body):
+            diffs.append((rec, body))
+    recorded = sorted(r['latency_ms'] for r in records if 'latency_ms' in r)
+
+    summary = {
+        'requests': len(results),
+        'elapsed_s': round(elapsed, 3),
+        'throughput_rps': round(len(results) / elapsed, 1) if elapsed else None,
+        'error_rate': round(len(errors) / len(results), 4) if results else None,
+        'latency_ms': {f'p{p}': _round(percentile(latencies, p)) for p in (50, 90, 95, 99)},
+        'max_ms': _round(latencies[-1] if latencies else None),
+        'recorded_latency_ms': {f'p{p}': _round(percentile(recorded, p)) for p in (50, 95, 99)},
+        'diffs': len(diffs),
+    }
+
+    print(json.dumps(summary, indent=2))
+    for rec, body in diffs[:show_diffs]:
+        print(f"\n--- {rec.get('request_id')}: {rec['request'].get('command', '')!r}")
+        print(f"  recorded: {json.dumps(comparable(rec['response']), ensure_ascii=False)[:300]}")
+        print(f"  replayed: {json.dumps(comparable(body), ensure_ascii=False)[:300]}")
+    for rec, (status, _, body) in errors[:show_diffs]:
+        print(f"\n!!! {rec.get('request_id')}: status {status}: {json.dumps(body)[:200]}")
+    return summary
+
+
+def _round(value):
+    return round(value, 2) if value is not None else None
+
+
+# ============================================
+# CLI
+# ============================================
+
+def spawn_server(traffic, port, workers):
+    """Start serve.py on a free port with upstream calls answered from the recording."""
+    env = dict(os.environ, DIYA_REPLAY_FIXTURES=os.path.abspath(traffic))
+    env.pop('DIYA_RECORD', None)
+    here = os.path.dirname(os.path.abspath(__file__))
+    proc = subprocess.Popen(
+        [sys.executable, os.path.join(here, 'serve.py'), '--host', '127.0.0.1',
+         '--port', str(port), '--workers', str(workers)],
+        env=env, cwd=here, stdout=subprocess.DEVNULL
+    )
+    import requests
+    # The master binds the port before workers are ready; wait for real answers
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            if requests.get(f'http://127.0.0.1:{port}/api/health', timeout=1).ok:
+                return proc
+        except requests.RequestException:
+            pass
+        time.sleep(0.2)
+    proc.terminate()
+    raise RuntimeError('replay server did not start')
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Replay recorded DIYA traffic and report latency and diffs.')
+    sub = parser.add_subparsers(dest='cmd', required=True)
+    run = sub.add_parser('run', help='replay a recording against a server')
+    run.add_argument('traffic')
+    run.add_argument('--url', default='http://127.0.0.1:5000')
+    run.add_argument('--spawn', action='store_true', help='start a local server that serves recorded fixtures')
+    run.add_argument('--workers', type=int, default=2, help='workers for --spawn')
+    run.add_argument('--speed', type=float, default=1.0, help='pacing multiplier (0 = as fast as possible)')
+    run.add_argument('--rps', type=float, help='open-loop fixed request rate instead of recorded pacing')
+    run.add_argument('--concurrency', type=int, default=32, help='max requests in flight')
+    run.add_argument('--diffs', type=int, default=10, help='how many diffs/errors to print')
+    args = parser.parse_args(argv)
+
+    records = load_traffic(args.traffic)
+    if not records:
+        print('No traffic to replay.')
+        return 1
+
+    server, url = None, args.url
+    if args.spawn:
+        port = free_port()
+        server, url = spawn_server(args.traffic, port, args.workers), f'http://127.0.0.1:{port}'
+    try:
+        offsets = schedule(records, args.speed, args.rps)
+        results, elapsed = replay(records, url, offsets, args.concurrency)
+        summary = report(records, results, elapsed, args.diffs)
+    finally:
+        if server:
+            server.terminate()
+            server.wait(timeout=40)
+    return 1 if summary['error_rate'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
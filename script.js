@@ -9,6 +9,7 @@
     // Auto-detect: local dev or Vercel deployment
     const isLocal = window.location.hostname === 'localhost' || window.location.hostname === '127.0.0.1';
     const API_BASE = isLocal ? 'http://localhost:5000/api' : '/api';
+    const WS_URL = isLocal ? 'ws://localhost:5000/ws' : `${location.protocol === 'https:' ? 'wss' : 'ws'}://${location.host}/ws`;
 
     // ========== DOM ==========
     const $ = s => document.querySelector(s);
@@ -28,6 +29,7 @@
     const responseLabel = $('#responseLabel');
     const typingIndicator = $('#typingIndicator');
     const suggestionChips = $('#suggestionChips');
+    const quickChips = $('#quickChips');
     const textInput = $('#textInput');
     const sendBtn = $('#sendBtn');
     const voiceInputBtn = $('#voiceInputBtn');
@@ -75,6 +77,20 @@
     let restartTimer = null;
     let commandCount = 0;
 
+    // Per-tab conversation id so the backend can resolve follow-ups ("play the next one")
+    const sessionId = sessionStorage.getItem('diya_session') || (() => {
+        const id = (crypto.randomUUID ? crypto.randomUUID() : `${Date.now()}-${Math.random().toString(36).slice(2)}`);
+        sessionStorage.setItem('diya_session', id);
+        return id;
+    })();
+
+    // Per-browser user id: the backend keeps this user's settings (name, city, voice) apart from everyone else's
+    const userId = localStorage.getItem('diya_user') || (() => {
+        const id = (crypto.randomUUID ? crypto.randomUUID() : `${Date.now()}-${Math.random().toString(36).slice(2)}`);
+        localStorage.setItem('diya_user', id);
+        return id;
+    })();
+
     let settings = {
         voiceSpeed: 1,
         voicePitch: 1.2,
@@ -150,15 +166,23 @@
     }
 
     // ========== BACKEND ==========
+    // One request on load: health, settings, newest notes and suggested commands
+    // (the server answers a revalidation with 304 when nothing changed)
     async function checkBackend() {
         try {
-            const res = await fetch(`${API_BASE}/health`, { signal: AbortSignal.timeout(3000) });
+            const res = await fetch(`${API_BASE}/bootstrap`, {
+                headers: { 'X-Diya-User': userId },
+                signal: AbortSignal.timeout(3000)
+            });
             if (res.ok) {
                 const data = await res.json();
                 backendAvailable = true;
-                assistantName = data.assistant || 'Diya';
-                console.log(`✅ Connected to ${assistantName} v${data.version}`);
-                await loadBackendSettings();
+                assistantName = data.health.assistant || 'Diya';
+                console.log(`✅ Connected to ${assistantName} v${data.health.version}`);
+                applyBackendSettings(data.settings);
+                notesSnapshot = data.notes.total <= data.notes.items.length ? data.notes.items : null;
+                showQuickChips(data.suggestions);
+                if (data.health.websocket?.enabled) connectChannel();
             }
         } catch (e) {
             backendAvailable = false;
@@ -168,21 +192,110 @@
         connectionStatus.classList.toggle('connected', backendAvailable);
     }
 
-    async function loadBackendSettings() {
-        try {
-            const res = await fetch(`${API_BASE}/settings`);
-            if (res.ok) {
-                const d = await res.json();
-                assistantName = d.assistant_name || 'Diya';
-                settings.weatherCity = d.weather_city || 'Delhi';
-                settings.weatherApiKey = d.weather_api_key || '';
-                settings.assistantName = assistantName;
-                weatherCityInput.value = settings.weatherCity;
-                weatherApiKeyInput.value = settings.weatherApiKey;
-                assistantNameInput.value = settings.assistantName;
-                responseLabel.textContent = assistantName;
+    // ========== COMMAND CHANNEL (WebSocket, falls back to HTTP) ==========
+    // One socket carries every command; ids match replies to requests, so
+    // several commands can be in flight. The server pings when the line is
+    // quiet; if nothing at all arrives for two heartbeats we reconnect.
+    const WS_HEARTBEAT_MS = 25000;
+    const WS_COMMAND_TIMEOUT_MS = 15000;
+    let ws = null;
+    let wsReady = false;
+    let wsNextId = 1;
+    let wsRetryMs = 1000;
+    let wsWatchdog = null;
+    const wsPending = new Map();
+
+    function connectChannel() {
+        if (ws || !('WebSocket' in window)) return;
+        try { ws = new WebSocket(`${WS_URL}?session_id=${encodeURIComponent(sessionId)}`); } catch (e) { ws = null; return; }
+
+        ws.onopen = () => { wsReady = true; wsRetryMs = 1000; armChannelWatchdog(); };
+        ws.onmessage = (e) => {
+            armChannelWatchdog();
+            let msg;
+            try { msg = JSON.parse(e.data); } catch (err) { return; }
+            if (msg.type === 'ping') { ws.send('{"type":"pong"}'); return; }
+            if (msg.type === 'event') {
+                window.dispatchEvent(new CustomEvent(`diya:${msg.event}`, { detail: msg.data }));
+                return;
             }
-        } catch (e) { /* silent */ }
+            const pending = wsPending.get(msg.id);
+            if (!pending) return;
+            wsPending.delete(msg.id);
+            clearTimeout(pending.timer);
+            if (msg.type === 'result') pending.resolve(msg.result);
+            else pending.reject(Object.assign(new Error(msg.error || 'channel error'), { retryMs: msg.retry_ms }));
+        };
+        ws.onclose = () => {
+            wsReady = false;
+            ws = null;
+            clearTimeout(wsWatchdog);
+            for (const pending of wsPending.values()) {
+                clearTimeout(pending.timer);
+                pending.reject(new Error('channel closed'));
+            }
+            wsPending.clear();
+            if (backendAvailable) setTimeout(connectChannel, wsRetryMs);
+            wsRetryMs = Math.min(wsRetryMs * 2, 30000);
+        };
+    }
+
+    function armChannelWatchdog() {
+        clearTimeout(wsWatchdog);
+        wsWatchdog = setTimeout(() => ws?.close(), WS_HEARTBEAT_MS * 2 + 5000);
+    }
+
+    function channelCommand(payload) {
+        return new Promise((resolve, reject) => {
+            const id = wsNextId++;
+            const timer = setTimeout(() => {
+                wsPending.delete(id);
+                reject(new Error('channel timeout'));
+            }, WS_COMMAND_TIMEOUT_MS);
+            wsPending.set(id, { resolve, reject, timer });
+            ws.send(JSON.stringify({ id, type: 'command', user_id: userId, ...payload }));
+        });
+    }
+
+    async function postCommand(payload) {
+        notesSnapshot = null;   // any command may add or remove notes
+        if (wsReady) {
+            try {
+                return await channelCommand(payload);
+            } catch (e) {
+                // Server is busy: back off once on the socket instead of adding HTTP load
+                if (e.retryMs && wsReady) {
+                    await new Promise(r => setTimeout(r, e.retryMs));
+                    try { return await channelCommand(payload); } catch (err) { /* fall through */ }
+                }
+                console.warn('Channel unavailable, using HTTP:', e.message);
+            }
+        }
+        const res = await fetch(`${API_BASE}/command`, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json', 'X-Diya-User': userId },
+            body: JSON.stringify(payload)
+        });
+        if (!res.ok) throw new Error(`HTTP ${res.status}`);
+        return res.json();
+    }
+
+    function applyBackendSettings(d) {
+        assistantName = d.assistant_name || 'Diya';
+        settings.weatherCity = d.weather_city || 'Delhi';
+        settings.assistantName = assistantName;
+        weatherCityInput.value = settings.weatherCity;
+        // The server never sends keys back, only whether one is saved
+        weatherApiKeyInput.placeholder = d.weather_api_key_set ? 'Saved (enter a new key to replace it)' : 'Enter API key';
+        assistantNameInput.value = settings.assistantName;
+        responseLabel.textContent = assistantName;
+    }
+
+    function showQuickChips(suggestions) {
+        if (!suggestions || !suggestions.length) return;
+        quickChips.innerHTML = suggestions.map(s =>
+            `<button class="chip" data-cmd="${s.command.replace(/"/g, '&quot;')}">${s.label}</button>`
+        ).join('');
     }
 
     // ========== PARTICLES ==========
@@ -404,6 +517,24 @@
         synth.speak(utt);
     }
 
+    // ========== REMINDERS ==========
+    // Due reminders arrive as a pushed 'reminder' event on the channel, or on
+    // the next command response; either way each one is announced once.
+    const announcedReminders = new Set();
+
+    function announceReminder(reminder) {
+        if (!reminder || announcedReminders.has(reminder.id)) return;
+        if (reminder.session_id && reminder.session_id !== sessionId) return;
+        announcedReminders.add(reminder.id);
+        playTone(880, 0.2);
+        setTimeout(() => playTone(880, 0.2), 300);
+        toast(reminder.response, 'info');
+        addToHistory('⏰ Reminder', reminder.response);
+        speak(reminder.response);
+    }
+
+    window.addEventListener('diya:reminder', (e) => announceReminder(e.detail));
+
     // ========== SEND COMMAND ==========
     async function sendCommand(input) {
         if (!input) return;
@@ -421,39 +552,35 @@
 
         if (backendAvailable) {
             try {
-                const res = await fetch(`${API_BASE}/command`, {
-                    method: 'POST',
-                    headers: { 'Content-Type': 'application/json' },
-                    body: JSON.stringify({ command: input, use_server_tts: false })
+                const data = await postCommand({ command: input, session_id: sessionId, use_server_tts: false });
+                hideTyping();
+                typeResponse(data.response, () => {
+                    sfxResponse();
+                    speak(data.response);
                 });
-
-                if (res.ok) {
-                    const data = await res.json();
-                    hideTyping();
-                    typeResponse(data.response, () => {
-                        sfxResponse();
-                        speak(data.response);
-                    });
-                    addToHistory(input, data.response);
-                    showSuggestions(data.response, input);
-
-                    // Handle special actions
-                    if (data.action === 'show_notes') openNotes(data.data?.notes || []);
-                    else if (data.action === 'note_saved') {
-                        toast('📝 Note saved!', 'success');
-                        if (notesPanel.classList.contains('active')) fetchAndShowNotes();
-                    } else if (data.action === 'notes_cleared') renderNotes([]);
-                    else if (data.action === 'play_youtube' && data.data) {
-                        showYouTubePlayer(data.data);
-                        toast(`🎵 Playing: ${data.data.title}`, 'success');
-                    } else if (data.action === 'play_music' && data.data?.fallback) {
-                        toast('🎵 Opening YouTube...', 'info');
-                    } else if (data.action === 'open_website' && data.data?.url) {
-                        window.open(data.data.url, '_blank');
-                        toast(`🌐 Opening ${data.data.name || 'website'}...`, 'info');
-                    }
-                    return;
+                addToHistory(input, data.response);
+                showSuggestions(data.response, input);
+                (data.reminders || []).forEach(announceReminder);
+
+                // Handle special actions
+                if (data.action === 'show_notes') openNotes(data.data?.notes || []);
+                else if (data.action === 'note_saved') {
+                    toast('📝 Note saved!', 'success');
+                    if (notesPanel.classList.contains('active')) fetchAndShowNotes();
+                } else if (data.action === 'note_deleted') {
+                    if (notesPanel.classList.contains('active')) fetchAndShowNotes();
+                } else if (data.action === 'notes_cleared') renderNotes([]);
+                else if (data.action === 'reminder_set') toast('⏰ Reminder set', 'success');
+                else if (data.action === 'play_youtube' && data.data) {
+                    showYouTubePlayer(data.data);
+                    toast(`🎵 Playing: ${data.data.title}`, 'success');
+                } else if (data.action === 'play_music' && data.data?.fallback) {
+                    toast('🎵 Opening YouTube...', 'info');
+                } else if (data.action === 'open_website' && data.data?.url) {
+                    window.open(data.data.url, '_blank');
+                    toast(`🌐 Opening ${data.data.name || 'website'}...`, 'info');
                 }
+                return;
             } catch (e) {
                 console.warn('Backend error:', e);
             }
@@ -693,7 +820,11 @@
     }
 
     // ========== NOTES ==========
+    // Notes from the bootstrap, until a command or a delete may have changed them
+    let notesSnapshot = null;
+
     async function fetchAndShowNotes() {
+        if (notesSnapshot) { renderNotes(notesSnapshot); return; }
         if (backendAvailable) {
             try {
                 const res = await fetch(`${API_BASE}/notes`);
@@ -727,6 +858,7 @@
 
     window.__deleteNote = async function (id) {
         if (backendAvailable) {
+            notesSnapshot = null;
             try { await fetch(`${API_BASE}/notes/${id}`, { method: 'DELETE' }); } catch (e) { /* */ }
         }
         fetchAndShowNotes();
@@ -756,6 +888,7 @@
         settings.voiceSpeed = parseFloat(voiceSpeedInput.value);
         settings.voicePitch = parseFloat(voicePitchInput.value);
         settings.weatherCity = weatherCityInput.value.trim() || 'Delhi';
+        const keyChanged = weatherApiKeyInput.value.trim() !== settings.weatherApiKey;
         settings.weatherApiKey = weatherApiKeyInput.value.trim();
         settings.assistantName = assistantNameInput.value.trim() || 'Diya';
         assistantName = settings.assistantName;
@@ -767,11 +900,12 @@
             try {
                 await fetch(`${API_BASE}/settings`, {
                     method: 'POST',
-                    headers: { 'Content-Type': 'application/json' },
+                    headers: { 'Content-Type': 'application/json', 'X-Diya-User': userId },
                     body: JSON.stringify({
                         assistant_name: settings.assistantName,
                         weather_city: settings.weatherCity,
-                        weather_api_key: settings.weatherApiKey,
+                        // Only when edited, so a key saved from another browser isn't wiped
+                        ...(keyChanged ? { weather_api_key: settings.weatherApiKey } : {}),
                         voice_speed: Math.round(settings.voiceSpeed * 150)
                     })
                 });
@@ -932,13 +1066,13 @@
             startManualListening();
         });
 
-        // Quick chips
-        $$('.quick-chips .chip').forEach(chip => {
-            chip.addEventListener('click', () => {
-                const cmd = chip.dataset.cmd;
-                showTranscript(cmd);
-                sendCommand(cmd);
-            });
+        // Quick chips (delegated: the bootstrap may replace them)
+        quickChips.addEventListener('click', (e) => {
+            const chip = e.target.closest('.chip');
+            if (!chip) return;
+            const cmd = chip.dataset.cmd;
+            showTranscript(cmd);
+            sendCommand(cmd);
         });
 
         // Feature cards
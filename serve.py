@@ -0,0 +1,330 @@
+"""
+============================================
+DIYA — AI Voice Assistant | Production Server
+============================================
+Pre-fork launcher for main.py. The master
+binds the port once, forks one worker per CPU
+(each a threaded WSGI server on the shared
+socket) plus a single TTS owner process, and
+restarts workers that die.
+
+  python serve.py [--port 5000] [--workers N]
+
+Signals (sent to the master):
+  HUP        graceful reload: start fresh workers
+             with re-imported code, then retire
+             the old ones once their requests finish
+             (if a fresh worker dies while starting,
+             the old ones stay and the reload is
+             dropped)
+  TERM/INT   graceful shutdown
+
+A worker that keeps dying soon after it starts
+is restarted with exponential backoff, so a
+broken import doesn't fork-loop the master.
+============================================
+"""
+
+import os
+import time
+import queue
+import signal
+import socket
+import argparse
+import threading
+import multiprocessing
+
+from logs import log
+
+GRACEFUL_TIMEOUT = 30    # seconds a retiring worker may spend finishing requests
+STARTUP_GRACE = 10       # a worker that dies sooner than this after starting has crashed on startup
+RESPAWN_BACKOFF = 1      # seconds before restarting a worker that crashed on startup (then doubled)
+RESPAWN_BACKOFF_MAX = 60
+THREAD_STACK_SIZE = 512 * 1024   # per connection thread; idle /ws clients each hold one or two
+
+
+def default_workers():
+    """One worker per CPU this process may run on."""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def bind_socket(host, port, backlog=2048):
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+# ============================================
+# TTS OWNER PROCESS
+# ============================================
+
+def tts_owner(tts_queue):
+    """Speak every queued text, one at a time, for all workers."""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    import main
+    while True:
+        text = tts_queue.get()
+        if text is None:
+            return
+        main.refresh_config()
+        main.speak_now(text)
+
+
+# ============================================
+# WORKER PROCESS
+# ============================================
+
+def init_worker(main, warm):
+    """Set up a process that serves the app (a forked worker, or the only process)."""
+    main.skill_registry.preload('open_app')
+    if warm:
+        # Other workers start their reminder thread on first use; a due reminder fires once either way
+        main.reminder_scheduler.start()
+        main.start_cache_warmer()
+        if main.config.get('prerender_tts'):
+            main.prerender_template_audio()
+
+
+def run_worker(sock, tts_queue, warm):
+    """Serve the app on the inherited socket until told to stop."""
+    from werkzeug.serving import make_server, WSGIRequestHandler
+
+    threading.stack_size(THREAD_STACK_SIZE)
+
+    # Imported after the fork, so a reload picks up new code
+    import main
+    main.tts_queue = tts_queue
+    init_worker(main, warm)
+
+    in_flight = [0]
+    in_flight_lock = threading.Lock()
+
+    def app(environ, start_response):
+        with in_flight_lock:
+            in_flight[0] += 1
+        try:
+            # Count the request as done only once its body has been sent
+            result = main.app(environ, start_response)
+            try:
+                yield from result
+            finally:
+                if hasattr(result, 'close'):
+                    result.close()
+        finally:
+            with in_flight_lock:
+                in_flight[0] -= 1
+
+    class QuietHandler(WSGIRequestHandler):
+        def log_request(self, *args, **kwargs):
+            pass
+
+    host, port = sock.getsockname()[:2]
+    server = make_server(host, port, app, threaded=True, request_handler=QuietHandler, fd=sock.fileno())
+
+    def stop(signum, frame):
+        threading.Thread(target=server.shutdown, daemon=True).start()
+        # Open sockets would hold the worker until the timeout; clients reconnect elsewhere
+        threading.Thread(target=main.ws_hub.close_all, daemon=True).start()
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGHUP, signal.SIG_IGN)
+
+    server.serve_forever()
+
+    # Stopped accepting; the master's other workers keep taking new connections
+    deadline = time.time() + GRACEFUL_TIMEOUT
+    while in_flight[0] and time.time() < deadline:
+        time.sleep(0.05)
+    os._exit(0)
+
+
+# ============================================
+# MASTER
+# ============================================
+
+class Master:
+    """Keeps N workers and one TTS owner alive; handles reload and shutdown."""
+
+    def __init__(self, sock, workers):
+        self.sock = sock
+        self.num_workers = workers
+        self.workers = {}          # pid -> slot index
+        self.incoming = {}         # pid -> slot index of a reload's workers, until they are up
+        self.promote_at = 0.0
+        self.retiring = set()
+        self.started = {}          # pid -> when it was forked
+        self.crashes = {}          # slot -> startup crashes in a row
+        self.respawn = {}          # slot -> when to restart it
+        self.tts_queue = multiprocessing.Queue()
+        self.tts_process = None
+        self.reload_requested = False
+        self.stopping = False
+
+    def spawn(self, slot):
+        pid = os.fork()
+        if pid == 0:
+            try:
+                # Slot 0 owns the cache warmer, so warm-up calls aren't multiplied
+                run_worker(self.sock, self.tts_queue, warm=(slot == 0))
+            finally:
+                os._exit(1)
+        self.started[pid] = time.time()
+        return pid
+
+    def start_tts(self):
+        self.tts_process = multiprocessing.Process(target=tts_owner, args=(self.tts_queue,), daemon=True)
+        self.tts_process.start()
+
+    def reload(self):
+        """Start a new generation; the old one is retired once it has come up (see promote)."""
+        if self.incoming:
+            log.warning('reload_ignored', reason='a reload is already starting')
+            return
+        self.incoming = {self.spawn(slot): slot for slot in range(self.num_workers)}
+        self.promote_at = time.time() + STARTUP_GRACE
+
+    def promote(self):
+        """The new generation survived startup: gracefully retire the old one."""
+        old = list(self.workers)
+        self.workers, self.incoming = self.incoming, {}
+        self.crashes.clear()
+        self.respawn.clear()
+        for pid in old:
+            self.retire(pid)
+        log.info('workers_reloaded', workers=self.num_workers, retiring=len(old))
+
+    def abort_reload(self, pid, status):
+        """A new worker died while starting: drop the new generation, keep serving with the old."""
+        self.incoming.pop(pid, None)
+        for other in list(self.incoming):
+            self.retire(other)
+        self.incoming = {}
+        log.error('reload_failed', worker=pid, status=status, workers=len(self.workers))
+
+    def retire(self, pid):
+        self.retiring.add(pid)
+        self.kill(pid, signal.SIGTERM)
+
+    def kill(self, pid, signum):
+        try:
+            os.kill(pid, signum)
+        except ProcessLookupError:
+            pass
+
+    def reap(self):
+        """Collect exited children; schedule restarts for workers that died unexpectedly."""
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            lived = time.time() - self.started.pop(pid, 0.0)
+            if pid in self.retiring:
+                self.retiring.discard(pid)
+            elif pid in self.incoming:
+                self.abort_reload(pid, status)
+            elif pid in self.workers:
+                slot = self.workers.pop(pid)
+                if self.stopping:
+                    continue
+                # Dying right after starting (a broken import, a bad config) backs off
+                crashes = self.crashes.get(slot, 0) + 1 if lived < STARTUP_GRACE else 0
+                self.crashes[slot] = crashes
+                delay = min(RESPAWN_BACKOFF * 2 ** (crashes - 1), RESPAWN_BACKOFF_MAX) if crashes else 0
+                self.respawn[slot] = time.time() + delay
+                log.warning('worker_exited', worker=pid, status=status, crashes=crashes, restart_in=delay)
+
+    def restart_due(self):
+        now = time.time()
+        for slot, when in list(self.respawn.items()):
+            if when <= now:
+                del self.respawn[slot]
+                self.workers[self.spawn(slot)] = slot
+
+    def run(self):
+        signal.signal(signal.SIGHUP, lambda *_: setattr(self, 'reload_requested', True))
+        signal.signal(signal.SIGTERM, lambda *_: setattr(self, 'stopping', True))
+        signal.signal(signal.SIGINT, lambda *_: setattr(self, 'stopping', True))
+
+        self.start_tts()
+        for slot in range(self.num_workers):
+            self.workers[self.spawn(slot)] = slot
+
+        while not self.stopping:
+            if self.reload_requested:
+                self.reload_requested = False
+                self.reload()
+            if self.tts_process and not self.tts_process.is_alive():
+                self.start_tts()
+            self.reap()
+            if self.incoming and time.time() >= self.promote_at:
+                self.promote()
+            self.restart_due()
+            time.sleep(0.5)
+
+        self.shutdown()
+
+    def shutdown(self):
+        self.retiring.update(self.workers, self.incoming)
+        self.workers, self.incoming = {}, {}
+        for pid in self.retiring:
+            self.kill(pid, signal.SIGTERM)
+        deadline = time.time() + GRACEFUL_TIMEOUT + 5
+        while self.retiring and time.time() < deadline:
+            try:
+                pid, _ = os.waitpid(-1, 0)
+            except ChildProcessError:
+                break
+            self.retiring.discard(pid)
+        for pid in self.retiring:
+            self.kill(pid, signal.SIGKILL)
+        try:
+            self.tts_queue.put_nowait(None)
+        except queue.Full:
+            pass
+        if self.tts_process:
+            self.tts_process.join(timeout=5)
+
+
+def run_single(host, port):
+    """Platforms without fork (Windows): one threaded process, no debugger or reloader."""
+    from werkzeug.serving import make_server
+    import main
+    init_worker(main, warm=True)
+    make_server(host, port, main.app, threaded=True).serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run DIYA with multiple worker processes.')
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=int(os.environ.get('PORT', 5000)))
+    parser.add_argument('--workers', type=int, default=int(os.environ.get('WEB_CONCURRENCY', 0)) or default_workers())
+    args = parser.parse_args()
+
+    print("")
+    print("  ==========================================")
+    print("    DIYA -- Production Server")
+    print(f"    http://{args.host}:{args.port}  ({args.workers} worker(s))")
+    print("  ==========================================")
+    print("")
+
+    if not hasattr(os, 'fork'):
+        run_single(args.host, args.port)
+        return
+
+    sock = bind_socket(args.host, args.port)
+    multiprocessing.set_start_method('fork', force=True)
+    Master(sock, max(1, args.workers)).run()
+
+
+if __name__ == '__main__':
+    main()
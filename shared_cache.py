@@ -0,0 +1,120 @@
+"""
+============================================
+DIYA — Shared Upstream Cache (L2)
+============================================
+Cross-process cache tier behind each worker's
+in-memory cache. Entries carry an absolute
+expiry so every process agrees on freshness,
+and a short-lived lock per key lets one process
+fetch a missing entry while the others wait.
+
+Backends:
+  SqliteCache  local file, no server needed (default)
+  RedisCache   any redis-py compatible client
+               (redis.Redis, fakeredis.FakeRedis)
+============================================
+"""
+
+import os
+import json
+import time
+import uuid
+import sqlite3
+import threading
+
+
+class SqliteCache:
+    """Shared cache in a local SQLite file (WAL mode, safe across processes)."""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._writes = 0
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with self._connect() as db:
+            db.execute('CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value TEXT, expires REAL)')
+            db.execute('CREATE TABLE IF NOT EXISTS locks (key TEXT PRIMARY KEY, token TEXT, expires REAL)')
+
+    def _connect(self):
+        # One connection per thread and per process (never reuse one across a fork)
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def get(self, key):
+        """Return (expires, value) for a live entry, or None."""
+        row = self._connect().execute(
+            'SELECT expires, value FROM cache WHERE key = ? AND expires > ?', (key, time.time())
+        ).fetchone()
+        return (row[0], json.loads(row[1])) if row else None
+
+    def set(self, key, value, expires):
+        db = self._connect()
+        db.execute(
+            'INSERT OR REPLACE INTO cache (key, value, expires) VALUES (?, ?, ?)',
+            (key, json.dumps(value), expires)
+        )
+        self._writes += 1
+        if self._writes % 500 == 0:
+            db.execute('DELETE FROM cache WHERE expires <= ?', (time.time(),))
+
+    def acquire(self, key, lease):
+        """Try to take the fill lock for a key. Returns a token, or None if someone else holds it."""
+        token = uuid.uuid4().hex
+        now = time.time()
+        db = self._connect()
+        db.execute('DELETE FROM locks WHERE key = ? AND expires <= ?', (key, now))
+        cur = db.execute(
+            'INSERT OR IGNORE INTO locks (key, token, expires) VALUES (?, ?, ?)', (key, token, now + lease)
+        )
+        return token if cur.rowcount == 1 else None
+
+    def release(self, key, token):
+        self._connect().execute('DELETE FROM locks WHERE key = ? AND token = ?', (key, token))
+
+
+class RedisCache:
+    """Shared cache in Redis (or anything speaking the redis-py client API)."""
+
+    def __init__(self, client, prefix='diya:'):
+        self.client = client
+        self.prefix = prefix
+
+    def get(self, key):
+        raw = self.client.get(self.prefix + key)
+        if raw is None:
+            return None
+        entry = json.loads(raw)
+        return (entry[0], entry[1]) if entry[0] > time.time() else None
+
+    def set(self, key, value, expires):
+        ttl_ms = int((expires - time.time()) * 1000)
+        if ttl_ms > 0:
+            self.client.set(self.prefix + key, json.dumps([expires, value]), px=ttl_ms)
+
+    def acquire(self, key, lease):
+        token = uuid.uuid4().hex
+        ok = self.client.set(f'{self.prefix}lock:{key}', token, nx=True, px=int(lease * 1000))
+        return token if ok else None
+
+    def release(self, key, token):
+        lock_key = f'{self.prefix}lock:{key}'
+        held = self.client.get(lock_key)
+        if held is not None and (held.decode() if isinstance(held, bytes) else held) == token:
+            self.client.delete(lock_key)
+
+
+def open_shared_cache(path, redis_url=None):
+    """Redis when a URL is configured and redis-py is installed, otherwise SQLite."""
+    if redis_url:
+        try:
+            import redis    # only when configured: redis-py is slow to import
+        except ImportError:
+            redis = None
+        if redis is not None:
+            return RedisCache(redis.Redis.from_url(redis_url))
+    return SqliteCache(path)
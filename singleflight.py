@@ -0,0 +1,90 @@
+"""
+============================================
+DIYA — Single-Flight Call Coalescing
+============================================
+When several callers ask for the same key at
+the same time, only the first (the leader) runs
+the call; the others wait on its future and get
+the same result, or the same exception.
+
+Works from threads (do) and from asyncio code
+(do_async); both share one table of in-flight
+calls, so a thread and a coroutine asking for
+the same key still make a single call.
+============================================
+"""
+
+import asyncio
+import threading
+from concurrent.futures import Future
+
+
+class SingleFlight:
+    """Table of in-flight calls keyed by a normalized request key."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.stats = {'calls': 0, 'coalesced': 0, 'errors': 0, 'timeouts': 0}
+
+    def _join(self, key):
+        """Return (future, is_leader) for a key."""
+        with self._lock:
+            self.stats['calls'] += 1
+            future = self._calls.get(key)
+            if future is not None:
+                self.stats['coalesced'] += 1
+                return future, False
+            future = self._calls[key] = Future()
+            return future, True
+
+    def _run(self, key, future, fn):
+        try:
+            future.set_result(fn())
+        except BaseException as e:
+            with self._lock:
+                self.stats['errors'] += 1
+            future.set_exception(e)
+        finally:
+            # New callers start a fresh call; waiters already hold the future
+            with self._lock:
+                if self._calls.get(key) is future:
+                    del self._calls[key]
+
+    def do(self, key, fn, timeout=None):
+        """
+        Run fn() once for all concurrent callers of key and return its result.
+        Followers give up after timeout seconds (TimeoutError); the leader's call
+        keeps running and its result still reaches everyone else waiting.
+        """
+        future, leader = self._join(key)
+        if leader:
+            self._run(key, future, fn)
+            return future.result()
+        try:
+            return future.result(timeout)
+        except TimeoutError:
+            with self._lock:
+                self.stats['timeouts'] += 1
+            raise
+
+    async def do_async(self, key, fn, timeout=None):
+        """Coroutine flavour of do(): a leader runs fn in the loop's executor."""
+        future, leader = self._join(key)
+        if leader:
+            asyncio.get_running_loop().run_in_executor(None, self._run, key, future, fn)
+        try:
+            return await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), timeout)
+        except asyncio.TimeoutError:
+            with self._lock:
+                self.stats['timeouts'] += 1
+            raise
+
+    def in_flight(self):
+        with self._lock:
+            return len(self._calls)
+
+    def snapshot(self):
+        """Counters plus the current number of in-flight keys."""
+        with self._lock:
+            return dict(self.stats, in_flight=len(self._calls))
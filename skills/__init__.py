@@ -0,0 +1,135 @@
+"""
+============================================
+DIYA — Skill Registry
+============================================
+Every command DIYA understands is a skill,
+declared by a manifest entry: its triggers,
+the slots it takes (see slots.py), whether it
+is CPU-only or calls an upstream service, and
+what it caches. The registry compiles all the
+triggers once at startup and routes commands
+to the first skill whose trigger matches and
+whose handler accepts the command.
+
+A skill either lives on the host (main.py) or
+in its own module under skills/. Modules are
+imported on first dispatch, so an instance that
+never hears "tell me about ..." never imports
+the wikipedia package. A skill module may define
+setup(host) to get a reference to the host
+(config, response(), the upstream cache...).
+============================================
+"""
+
+import re
+import importlib
+import threading
+
+from slots import extract
+
+COST_CPU = 'cpu'
+COST_UPSTREAM = 'upstream'
+
+UPSTREAM_CONCURRENCY = 16   # upstream-bound skills running at once per process
+
+
+class Skill:
+    """One manifest entry."""
+
+    __slots__ = ('name', 'trigger', 'handler', 'module', 'template', 'slots', 'slots_from', 'cost', 'cache')
+
+    def __init__(self, name, keywords=(), pattern=None, handler=None, module=None, template=None,
+                 slots=None, slots_from='text', cost=COST_CPU, cache=None):
+        """
+        keywords    substrings of the normalized command, any of which triggers the skill
+        pattern     regex searched in the normalized command (combined with keywords)
+        handler     function name: handler(text, lower, slots) -> response dict or None to pass
+        module      module holding the handler (None: the host); imported on first dispatch
+        template    static intent answered straight from the host's template catalogue
+        slots       slots.py grammar to extract before calling the handler
+        slots_from  'text' (the user's wording, falling back to the normalized form) or 'lower'
+        cost        COST_CPU or COST_UPSTREAM
+        cache       {upstream cache kind: ttl seconds} this skill's lookups use
+        """
+        parts = [re.escape(k) for k in keywords] + ([pattern] if pattern else [])
+        self.name = name
+        self.trigger = re.compile('|'.join(parts)) if parts else None
+        self.handler = handler
+        self.module = module
+        self.template = template
+        self.slots = slots
+        self.slots_from = slots_from
+        self.cost = cost
+        self.cache = cache or {}
+
+
+class SkillRegistry:
+    """Routes normalized commands to skills in manifest order."""
+
+    def __init__(self, manifest, host):
+        self.skills = list(manifest)
+        self.host = host
+        self.handlers = {}
+        self.load_lock = threading.Lock()
+        self.upstream_gate = threading.BoundedSemaphore(UPSTREAM_CONCURRENCY)
+
+    def cache_policy(self):
+        """{kind: ttl} merged from every skill's manifest."""
+        policy = {}
+        for skill in self.skills:
+            policy.update(skill.cache)
+        return policy
+
+    def loaded_modules(self):
+        return sorted({s.module for s in self.skills if s.module and s.name in self.handlers})
+
+    def preload(self, *names):
+        """Load the named skills' modules now rather than on first dispatch."""
+        for skill in self.skills:
+            if skill.name in names:
+                self._handler(skill)
+
+    def _handler(self, skill):
+        """Resolve a skill's handler, importing its module the first time."""
+        handler = self.handlers.get(skill.name)
+        if handler is not None:
+            return handler
+        with self.load_lock:
+            handler = self.handlers.get(skill.name)
+            if handler is None:
+                if skill.template:
+                    def handler(text, lower, slots, intent=skill.template):
+                        return self.host.template_reply(intent)
+                elif skill.module:
+                    module = importlib.import_module(skill.module)
+                    if hasattr(module, 'setup') and not getattr(module, 'host', None):
+                        module.setup(self.host)
+                    handler = getattr(module, skill.handler)
+                else:
+                    handler = getattr(self.host, skill.handler)
+                self.handlers[skill.name] = handler
+        return handler
+
+    def _slots(self, skill, text, lower):
+        if not skill.slots:
+            return {}
+        if skill.slots_from == 'lower':
+            return extract(skill.slots, lower)
+        return extract(skill.slots, text) or extract(skill.slots, lower)
+
+    def dispatch(self, text, lower):
+        """Run the first skill that triggers and accepts the command. Returns (skill, result)."""
+        for skill in self.skills:
+            if skill.trigger is not None and not skill.trigger.search(lower):
+                continue
+            handler = self._handler(skill)
+            slots = self._slots(skill, text, lower)
+            if skill.cost == COST_UPSTREAM:
+                # Cheap skills never queue behind slow upstream calls
+                with self.upstream_gate:
+                    result = handler(text, lower, slots)
+            else:
+                result = handler(text, lower, slots)
+            if result is not None:
+                return skill, result
+        return None, None
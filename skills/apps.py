@@ -0,0 +1,331 @@
+"""
+"Open <app>": launch desktop applications on Windows, Linux and macOS.
+
+An index of launchable apps is built once in the background when the skill
+loads: executables on PATH, .desktop entries (Linux), .app bundles (macOS),
+Start Menu shortcuts (Windows) and an alias table mapping spoken names
+("calculator", "vs code") to per-OS candidates. config['app_aliases'] adds
+or overrides aliases ({"editor": ["code", "gedit"]}).
+
+Resolving a name is a dict lookup. The scanned directories' mtimes are
+checked every CHECK_INTERVAL seconds and the index is rebuilt in the
+background when one changes. Apps start without a shell, detached, on a
+launcher thread, so the reply never waits for the process.
+"""
+
+import os
+import re
+import sys
+import glob
+import shlex
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+host = None
+
+CHECK_INTERVAL = 5       # seconds between directory mtime checks
+FIRST_BUILD_WAIT = 2     # seconds a command may wait for the very first index
+
+# Spoken name -> candidates, first one found wins. A candidate is a command
+# (looked up on PATH, may carry arguments), an absolute path, an indexed app
+# name (.desktop Name, .app bundle, Start Menu shortcut) or a Windows URI.
+DEFAULT_ALIASES = {
+    'calculator': ['calc', 'gnome-calculator', 'kcalc', 'galculator', 'qalculate-gtk', 'xcalc', 'calculator'],
+    'notepad': ['notepad', 'gnome-text-editor', 'gedit', 'kate', 'mousepad', 'xed', 'textedit'],
+    'paint': ['mspaint', 'pinta', 'kolourpaint', 'gimp'],
+    'task manager': ['taskmgr', 'gnome-system-monitor', 'plasma-systemmonitor', 'ksysguard', 'activity monitor'],
+    'terminal': ['wt', 'gnome-terminal', 'konsole', 'xfce4-terminal', 'x-terminal-emulator', 'xterm', 'terminal'],
+    'command prompt': ['cmd'],
+    'powershell': ['powershell', 'pwsh'],
+    'file explorer': ['explorer', 'nautilus', 'dolphin', 'thunar', 'nemo', 'pcmanfm', 'finder'],
+    'control panel': ['control', 'gnome-control-center', 'systemsettings', 'system settings', 'system preferences'],
+    'settings': ['ms-settings:', 'gnome-control-center', 'systemsettings', 'xfce4-settings-manager',
+                 'system settings', 'system preferences'],
+    'word': ['winword', 'lowriter', 'microsoft word'],
+    'excel': ['excel', 'localc', 'microsoft excel'],
+    'powerpoint': ['powerpnt', 'loimpress', 'microsoft powerpoint'],
+    'snipping tool': ['snippingtool', 'gnome-screenshot', 'spectacle', 'flameshot gui', 'screenshot'],
+    'camera': ['microsoft.windows.camera:', 'cheese', 'guvcview', 'photo booth'],
+    'vs code': ['code', 'code-oss', 'codium', 'visual studio code'],
+    'chrome': ['chrome', 'google-chrome', 'google-chrome-stable', 'chromium', 'chromium-browser',
+               r'C:\Program Files\Google\Chrome\Application\chrome.exe', 'google chrome'],
+}
+ALIAS_SYNONYMS = {
+    'calc': 'calculator', 'text editor': 'notepad', 'cmd': 'command prompt', 'explorer': 'file explorer',
+    'files': 'file explorer', 'file manager': 'file explorer', 'vscode': 'vs code',
+    'visual studio code': 'vs code', 'google chrome': 'chrome', 'system monitor': 'task manager',
+}
+
+# Leading words before the app name; trailing ones ("app for me") fall away in lookup()
+NAME_NOISE = re.compile(r'^(?:the|my|a)\s+')
+
+URI = re.compile(r'^[\w.-]+:$')
+DESKTOP_FIELD_CODES = re.compile(r'^%[a-zA-Z]$')
+
+
+def setup(app_host):
+    global host
+    host = app_host
+    app_index.start()
+
+
+# ============================================
+# SOURCES
+# ============================================
+
+def _path_dirs():
+    return [d for d in os.environ.get('PATH', '').split(os.pathsep) if d]
+
+
+def _desktop_dirs():
+    if sys.platform in ('win32', 'darwin'):
+        return []
+    data_home = os.environ.get('XDG_DATA_HOME') or os.path.expanduser('~/.local/share')
+    data_dirs = (os.environ.get('XDG_DATA_DIRS') or '/usr/local/share:/usr/share').split(':')
+    extra = ['/var/lib/flatpak/exports/share', os.path.expanduser('~/.local/share/flatpak/exports/share')]
+    dirs = [os.path.join(d, 'applications') for d in [data_home] + data_dirs + extra]
+    return dirs + ['/var/lib/snapd/desktop/applications']
+
+
+def _bundle_dirs():
+    if sys.platform == 'darwin':
+        return ['/Applications', '/System/Applications', '/System/Applications/Utilities',
+                os.path.expanduser('~/Applications')]
+    if sys.platform == 'win32':
+        return [os.path.join(os.environ.get(var, ''), r'Microsoft\Windows\Start Menu\Programs')
+                for var in ('ProgramData', 'APPDATA') if os.environ.get(var)]
+    return []
+
+
+def scan_path(dirs):
+    """{lowercase command: full path} for executables on PATH (first directory wins)."""
+    exts = [e.lower() for e in os.environ.get('PATHEXT', '.EXE;.BAT;.CMD').split(';')] if sys.platform == 'win32' else None
+    found = {}
+    for directory in dirs:
+        try:
+            entries = list(os.scandir(directory))
+        except OSError:
+            continue
+        for entry in entries:
+            name = entry.name.lower()
+            if exts is not None:
+                stem, ext = os.path.splitext(name)
+                if ext not in exts:
+                    continue
+                name = stem
+            elif not os.access(entry.path, os.X_OK):
+                continue
+            found.setdefault(name, entry.path)
+    return found
+
+
+def parse_desktop_entry(path):
+    """(name, argv) for a visible application .desktop file, or None."""
+    fields = {}
+    section = None
+    try:
+        with open(path, encoding='utf-8', errors='replace') as f:
+            for line in f:
+                line = line.strip()
+                if line.startswith('['):
+                    section = line
+                elif section == '[Desktop Entry]' and '=' in line:
+                    key, value = line.split('=', 1)
+                    fields.setdefault(key.strip(), value.strip())
+    except OSError:
+        return None
+    if fields.get('Type', 'Application') != 'Application' or 'Exec' not in fields:
+        return None
+    if fields.get('NoDisplay') == 'true' or fields.get('Hidden') == 'true':
+        return None
+    try:
+        argv = [a for a in shlex.split(fields['Exec']) if not DESKTOP_FIELD_CODES.match(a)]
+    except ValueError:
+        return None
+    if not argv:
+        return None
+    return (fields.get('Name') or os.path.basename(path)[:-8]), argv
+
+
+def scan_apps(executables):
+    """{lowercase app name: (kind, target)} from .desktop files, .app bundles and Start Menu shortcuts."""
+    apps = {}
+    for directory in _desktop_dirs():
+        for path in glob.glob(os.path.join(directory, '*.desktop')):
+            entry = parse_desktop_entry(path)
+            if not entry:
+                continue
+            name, argv = entry
+            program = argv[0] if os.path.isabs(argv[0]) else executables.get(argv[0].lower())
+            if program and os.path.exists(program):
+                spec = ('exec', (program, *argv[1:]))
+                apps.setdefault(name.lower(), spec)
+                apps.setdefault(os.path.basename(path)[:-8].lower(), spec)
+    for directory in _bundle_dirs():
+        pattern = '*.app' if sys.platform == 'darwin' else os.path.join('**', '*.lnk')
+        for path in glob.glob(os.path.join(directory, pattern), recursive=True):
+            name = os.path.splitext(os.path.basename(path))[0].lower()
+            spec = ('exec', ('open', '-a', path)) if sys.platform == 'darwin' else ('start', path)
+            apps.setdefault(name, spec)
+    return apps
+
+
+# ============================================
+# INDEX
+# ============================================
+
+class AppIndex:
+    """Spoken app name -> launch spec, rebuilt when a scanned directory changes."""
+
+    def __init__(self):
+        self.names = {}        # lowercase name -> ((kind, target), display name)
+        self.mtimes = {}
+        self.aliases = None
+        self.checked = 0.0
+        self.ready = threading.Event()
+        self.building = threading.Lock()
+
+    def start(self):
+        threading.Thread(target=self.rebuild, daemon=True, name='app-index').start()
+
+    def _watched(self):
+        return _path_dirs() + _desktop_dirs() + _bundle_dirs()
+
+    def _stat(self, dirs):
+        mtimes = {}
+        for directory in dirs:
+            try:
+                mtimes[directory] = os.stat(directory).st_mtime
+            except OSError:
+                mtimes[directory] = None
+        return mtimes
+
+    def rebuild(self):
+        if not self.building.acquire(blocking=False):
+            return  # a rebuild is already running
+        try:
+            started = time.perf_counter()
+            dirs = self._watched()
+            mtimes = self._stat(dirs)
+            aliases = self.configured_aliases()
+            executables = scan_path(_path_dirs())
+            apps = scan_apps(executables)
+
+            names = {name: (spec, name.title()) for name, spec in apps.items()}
+            for alias, candidates in aliases.items():
+                for candidate in candidates:
+                    spec = self._resolve_candidate(candidate, executables, apps)
+                    if spec:
+                        names[alias] = (spec, alias.title())
+                        break
+            for synonym, alias in ALIAS_SYNONYMS.items():
+                if alias in names and synonym not in aliases:
+                    names[synonym] = names[alias]
+
+            self.names, self.mtimes, self.aliases = names, mtimes, aliases
+            self.checked = time.time()
+            host.log.info('app_index_built', apps=len(names), ms=round((time.perf_counter() - started) * 1000))
+        except Exception as e:
+            host.log.error('app_index_error', error=str(e))
+        finally:
+            self.ready.set()
+            self.building.release()
+
+    @staticmethod
+    def configured_aliases():
+        aliases = dict(DEFAULT_ALIASES)
+        custom = (host.config.get('app_aliases') if host else None) or {}
+        for name, candidates in custom.items():
+            aliases[name.lower()] = [candidates] if isinstance(candidates, str) else list(candidates)
+        return aliases
+
+    @staticmethod
+    def _resolve_candidate(candidate, executables, apps):
+        if URI.match(candidate):
+            return ('start', candidate) if sys.platform == 'win32' else None
+        if os.path.isabs(candidate):
+            return ('exec', (candidate,)) if os.path.exists(candidate) else None
+        parts = shlex.split(candidate)
+        program = executables.get(parts[0].lower())
+        if program:
+            return ('exec', (program, *parts[1:]))
+        return apps.get(candidate.lower())
+
+    def maybe_refresh(self):
+        """Every CHECK_INTERVAL, rebuild in the background if a directory or the alias config changed."""
+        now = time.time()
+        if now - self.checked < CHECK_INTERVAL:
+            return
+        self.checked = now
+        if self._stat(self._watched()) != self.mtimes or self.configured_aliases() != self.aliases:
+            threading.Thread(target=self.rebuild, daemon=True, name='app-index').start()
+
+    def lookup(self, phrase):
+        """(spec, display name) for the longest leading run of words in phrase that names an app."""
+        if not self.ready.is_set():
+            self.ready.wait(FIRST_BUILD_WAIT)
+        self.maybe_refresh()
+        words = phrase.split()
+        for n in range(len(words), 0, -1):
+            found = self.names.get(' '.join(words[:n]))
+            if found:
+                return found
+        return None
+
+    def known_alias(self, phrase):
+        """Display name of the app alias phrase starts with, installed or not (None if it names none)."""
+        aliases = self.aliases if self.aliases is not None else self.configured_aliases()
+        words = phrase.split()
+        for n in range(len(words), 0, -1):
+            name = ' '.join(words[:n])
+            alias = name if name in aliases else ALIAS_SYNONYMS.get(name)
+            if alias:
+                return alias.title()
+        return None
+
+
+app_index = AppIndex()
+
+
+# ============================================
+# LAUNCHING
+# ============================================
+
+if os.name == 'posix':
+    DETACH = {'start_new_session': True}
+else:
+    DETACH = {'creationflags': getattr(subprocess, 'DETACHED_PROCESS', 0) | getattr(subprocess, 'CREATE_NEW_PROCESS_GROUP', 0)}
+
+launcher = ThreadPoolExecutor(max_workers=1, thread_name_prefix='app-launch')
+
+
+def launch(spec, name):
+    """Start an app without a shell, detached from the server."""
+    kind, target = spec
+    try:
+        if kind == 'start':
+            os.startfile(target)
+        else:
+            subprocess.Popen(list(target), stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+                             stderr=subprocess.DEVNULL, close_fds=True, **DETACH)
+    except Exception as e:
+        host.log.error('app_open_error', app=name, error=str(e))
+
+
+def handle_open_app(text, lower, slots):
+    """Open an installed application by name."""
+    phrase = slots.get('app') or ''
+    phrase = NAME_NOISE.sub('', phrase.lower()).strip()
+    if not phrase:
+        return None
+    found = app_index.lookup(phrase)
+    if not found:
+        missing = app_index.known_alias(phrase)
+        if missing:
+            return host.response(f"I couldn't find {missing} on this machine.")
+        return None  # Not an app command
+    spec, name = found
+    launcher.submit(launch, spec, name)
+    return host.response(f"Opening {name}! 🚀")
@@ -0,0 +1,36 @@
+"""
+Offline conversions: "convert 5 km to miles", "100 usd in inr", "what day is
+45 days from today" (see conversions.py).
+
+Answered locally from precomputed unit tables, an exchange-rate table kept in
+cache/rates.json and date arithmetic, instead of falling through to a web
+search. The rate table refreshes itself in the background through the host's
+shared upstream cache, so one worker's fetch serves them all.
+"""
+
+import re
+
+from conversions import RateTable, answer
+
+host = None
+rate_table = None
+
+# "1,000 usd": normalize() drops commas, so digit groups are joined up first
+DIGIT_GROUPS = re.compile(r'(?<=\d),(?=\d{3}\b)')
+
+
+def setup(app_host):
+    global host, rate_table
+    host = app_host
+    rate_table = RateTable(host.RATES_FILE, host.fetch_exchange_rates)
+    rate_table.start()
+
+
+def handle_convert(text, lower, slots):
+    if DIGIT_GROUPS.search(text):
+        lower = host.normalize(DIGIT_GROUPS.sub('', text), host.config.get('language', 'en'))
+    hit = answer(lower, rates=rate_table)
+    if hit is None:
+        return None
+    reply, data = hit
+    return host.response(reply, action='conversion', data=data)
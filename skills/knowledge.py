@@ -0,0 +1,67 @@
+"""
+Wikipedia lookups: "who is / what is / tell me about ...".
+
+Answered from the offline index when one is configured (see wiki_index.py),
+otherwise through the host's cached Wikipedia fetch.
+"""
+
+import os
+import webbrowser
+
+import requests
+import wikipedia
+
+from wiki_index import WikiIndex
+
+host = None
+offline_wiki_state = {'path': None, 'index': None}
+
+
+def setup(app_host):
+    global host
+    host = app_host
+
+
+def offline_wiki():
+    """The local Wikipedia index if one is configured and present (opened once), else None."""
+    path = host.config.get('wiki_index') or host.WIKI_INDEX_FILE
+    if offline_wiki_state['path'] != path:
+        index = None
+        if os.path.exists(path):
+            try:
+                index = WikiIndex(path)
+            except Exception as e:
+                host.log.error('wiki_index_error', path=path, error=str(e))
+        offline_wiki_state.update(path=path, index=index)
+    return offline_wiki_state['index']
+
+
+def handle_wikipedia(text, lower, slots):
+    """Fetch a Wikipedia summary (offline index first, then the network)."""
+    query = slots.get('query')
+    if not query:
+        return None
+    response = host.response
+
+    offline = offline_wiki()
+    if offline is not None:
+        hit = offline.lookup(query)
+        if hit:
+            return response(hit[1], action='wikipedia', data={'query': query, 'title': hit[0], 'source': 'offline'})
+
+    try:
+        summary = host.fetch_wikipedia(query)
+        if len(summary) > 400:
+            summary = summary[:400] + '...'
+        return response(summary, action='wikipedia', data={'query': query})
+    except wikipedia.exceptions.DisambiguationError as e:
+        options = ', '.join(e.options[:5])
+        return response(f'"{query}" could refer to multiple topics: {options}. Please be more specific.')
+    except wikipedia.exceptions.PageError:
+        url = f"https://www.google.com/search?q={requests.utils.quote(query)}"
+        webbrowser.open(url)
+        return response(f"I couldn't find a Wikipedia article for \"{query}\". I've searched Google instead.")
+    except Exception:
+        url = f"https://www.google.com/search?q={requests.utils.quote(query)}"
+        webbrowser.open(url)
+        return response(f"Let me search that for you online.")
@@ -0,0 +1,21 @@
+"""
+"System info": describe the machine the assistant runs on.
+"""
+
+import platform
+
+host = None
+
+
+def setup(app_host):
+    global host
+    host = app_host
+
+
+def handle_system_info(text, lower, slots):
+    info = (
+        f"You're running {platform.system()} {platform.release()} "
+        f"({platform.machine()}). Processor: {platform.processor()}. "
+        f"Computer: {platform.node()}."
+    )
+    return host.response(info)
@@ -0,0 +1,173 @@
+"""
+============================================
+DIYA — Slot Extraction
+============================================
+Declarative grammar for the values commands
+carry: the city in "weather in Pune tomorrow",
+the song in "play some Arijit", the body of
+"take a note ...". Shared by main.py and the
+serverless api/index.py so both read commands
+the same way.
+
+Each intent lists one or more patterns with
+{slot} or {slot:type} placeholders. An intent's
+patterns are compiled into a single regex and
+scanned once over the command; the first match
+of each slot wins. Slot types are unambiguous
+(words and whitespace never overlap), so a match
+never backtracks over long dictated input.
+
+  extract('weather', 'weather in New Delhi tomorrow')
+  -> {'city': 'New Delhi', 'day': 1}
+============================================
+"""
+
+import re
+
+# Words that end a city name ("pune tomorrow", "delhi right now"); names are
+# capped at four words so a failed match never rescans the rest of the input
+CITY_STOP = (
+    r'(?:today|tonight|tomorrow|day\s+after|now|right\s+now|please|weather|forecast|'
+    r'like|in|for|on|at|and|this\s+week|abhi|kal|ka|ki|ke|mein|me)\b'
+)
+
+MEDIA_TRAILERS = re.compile(r'(?:\s+(?:on\s+youtube|for\s+me|please|now))+$', re.IGNORECASE)
+
+
+def _words(value):
+    return ' '.join(value.split())
+
+
+def _media(value):
+    return MEDIA_TRAILERS.sub('', _words(value)).strip(' .?!')
+
+
+def _query(value):
+    return _words(value).strip(' .?!')
+
+
+OPERATOR_WORDS = re.compile(r'\b(?:plus|minus|times|into|multiplied\s+by|divided\s+by|x)\b', re.IGNORECASE)
+OPERATOR_SYMBOLS = {'plus': '+', 'minus': '-', 'times': '*', 'into': '*', 'x': '*', 'multiplied by': '*', 'divided by': '/'}
+
+
+def _expr(value):
+    value = value.strip().rstrip('?=').strip()
+    return OPERATOR_WORDS.sub(lambda m: OPERATOR_SYMBOLS[_words(m.group().lower())], value)
+
+
+DURATION_UNIT = r'(?:seconds?|secs?|minutes?|mins?|hours?|hrs?|days?)\b'
+DURATION_AMOUNT = r'(?:\d+(?:\.\d+)?\s*|(?:half\s+)?an?\s+)'
+DURATION_PART = re.compile(rf'({DURATION_AMOUNT})({DURATION_UNIT})', re.IGNORECASE)
+DURATION_SECONDS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def _duration(value):
+    """Seconds in "10 minutes", "1 hour and 30 minutes", "half an hour"."""
+    seconds = 0.0
+    for amount, unit in DURATION_PART.findall(value.lower()):
+        amount = amount.strip()
+        count = 0.5 if amount.startswith('half') else 1.0 if amount in ('a', 'an') else float(amount)
+        seconds += count * DURATION_SECONDS[unit[0]]
+    return seconds
+
+
+def _clock(value):
+    """(hour, minute, 'am'/'pm'/'') for "5 pm", "5 30 pm", "17:45", "noon"."""
+    value = value.lower()
+    if value == 'noon':
+        return 12, 0, 'pm'
+    if value == 'midnight':
+        return 0, 0, 'am'
+    numbers = re.findall(r'\d+', value)
+    meridiem = 'am' if 'a' in value else 'pm' if 'p' in value else ''
+    return int(numbers[0]), int(numbers[1]) if len(numbers) > 1 else 0, meridiem
+
+
+def _day(value):
+    value = _words(value.lower())
+    if value in ('today', 'tonight'):
+        return 0
+    if value == 'tomorrow':
+        return 1
+    if value == 'day after tomorrow':
+        return 2
+    return int(re.search(r'\d', value).group())
+
+
+# Each type: (regex for the raw value, normalizer)
+SLOT_TYPES = {
+    'city': (rf'(?!{CITY_STOP})[^\W\d_]+(?:\s+(?!{CITY_STOP})[^\W\d_]+){{0,3}}', _words),
+    'day': (r'day\s+after\s+tomorrow|tomorrow|today|tonight|in\s+\d\s+days?', _day),
+    'number': (r'\d+(?:\.\d+)?', float),
+    'operator': (r'plus|minus|times|multiplied\s+by|divided\s+by|into|x', lambda v: _words(v.lower())),
+    'media': (r'\S.*', _media),
+    'query': (r'\S.*', _query),
+    'expr': (r'\S.*', _expr),
+    'text': (r'\S.*', str.strip),
+    'task': (r'\S.*?', _query),
+    'duration': (rf'{DURATION_AMOUNT}{DURATION_UNIT}(?:\s+(?:and\s+)?{DURATION_AMOUNT}{DURATION_UNIT})*', _duration),
+    'clock': (r"noon|midnight|\d{1,2}(?:[: ]\d{2})?(?:\s*(?:am|pm|a\.m|p\.m)\b|\s+o'?clock\b)?", _clock),
+}
+
+GRAMMAR = {
+    'weather': [
+        r'\b{day}\b',
+        r'\b(?:in|of|for|at) {city}',
+        r'\b{city} (?:ka|ki|ke|mein|me) (?:weather|temperature)',
+    ],
+    'search': [r'^(?:search for|search|google) {query}'],
+    'play': [r'\bplay (?:(?:a|the|some|me) )?(?:(?:songs?|music|video|gaana|gana) )?{query:media}'],
+    'calculate': [r"\b(?:calculate|what is|what's) {expr}"],
+    'arithmetic': [r'\b{a:number}\s*{op:operator}\s*{b:number}'],
+    'note': [r'\b(?:take a note|save a note|note down|remember this)(?: that)?:? {content:text}'],
+    'wikipedia': [r'\b(?:who is|what is|tell me about|define|explain|wikipedia) {query}'],
+    'open_app': [r'\b(?:open|launch) {app:query}'],
+    'reminder': [
+        r'\bremind me (?:to |that |about )?{message:task} (?:in|after) {delay:duration}$',
+        r'\bremind me (?:to |that |about )?{message:task} at {at:clock}$',
+        r'\bremind me (?:in|after) {delay:duration}(?: (?:to|that|about))? (?!and\b){message:text}',
+        r'\bremind me at {at:clock}(?: (?:to|that|about))? {message:text}',
+        r'\bremind me (?:in|after) {delay:duration}',
+        r'\bremind me at {at:clock}',
+        r'\bremind me (?:to |that |about )?{message:text}',
+    ],
+    'timer': [r'\b{delay:duration} timer\b', r'\btimer (?:for |of )?{delay:duration}'],
+}
+
+PLACEHOLDER = re.compile(r'\{(\w+)(?::(\w+))?\}')
+
+
+def compile_intent(patterns):
+    """Compile an intent's patterns into one regex plus {group: (slot, normalizer)}."""
+    slots = {}
+    alternatives = []
+    for pattern in patterns:
+        def placeholder(m):
+            slot, kind = m.group(1), m.group(2) or m.group(1)
+            group = f'{slot}_{len(slots)}'
+            regex, normalize = SLOT_TYPES[kind]
+            slots[group] = (slot, normalize)
+            return f'(?P<{group}>{regex})'
+        # A literal space in the grammar matches any run of whitespace
+        alternatives.append(PLACEHOLDER.sub(placeholder, pattern.replace(' ', r'\s+')))
+    regex = re.compile('|'.join(f'(?:{a})' for a in alternatives), re.IGNORECASE | re.DOTALL)
+    return regex, slots
+
+
+EXTRACTORS = {intent: compile_intent(patterns) for intent, patterns in GRAMMAR.items()}
+
+
+def extract(intent, text):
+    """Typed slots found in a command for an intent ({} if none)."""
+    regex, slots = EXTRACTORS[intent]
+    found = {}
+    for match in regex.finditer(text):
+        for group, value in match.groupdict().items():
+            if value is None:
+                continue
+            slot, normalize = slots[group]
+            if slot not in found:
+                found[slot] = normalize(value)
+        if len(found) == len({slot for slot, _ in slots.values()}):
+            break
+    return found
@@ -0,0 +1,186 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+np = pytest.importorskip('numpy')
+
+import audio
+from audio import AudioIngest, FakeASR, VoiceSegmenter, WakeGate, voiced_frames
+
+RATE = audio.SAMPLE_RATE
+FRAME = RATE * audio.FRAME_MS // 1000
+
+
+def silence(ms):
+    return np.zeros(RATE * ms // 1000, dtype='<i2')
+
+
+def tone(ms, hz=300, level=0.3):
+    t = np.arange(RATE * ms // 1000) / RATE
+    return (np.sin(2 * np.pi * hz * t) * level * 32767).astype('<i2')
+
+
+def noise(ms, level=0.012, seed=7):
+    """Hiss around -38 dBFS: above the energy floor, but with a high zero-crossing rate."""
+    rng = np.random.default_rng(seed)
+    return np.clip(rng.normal(0, level * 32768, RATE * ms // 1000), -32768, 32767).astype('<i2')
+
+
+def pcm(*parts):
+    return np.concatenate(parts).tobytes()
+
+
+def segments(data, chunk=None):
+    segmenter = VoiceSegmenter(RATE)
+    chunk = chunk or len(data)
+    found = []
+    for i in range(0, len(data), chunk):
+        found += segmenter.feed(data[i:i + chunk])
+    return found + segmenter.flush()
+
+
+def ms(samples):
+    return len(samples) * 1000 // RATE
+
+
+# ============================================
+# VOICE ACTIVITY DETECTION
+# ============================================
+
+def test_voiced_frames():
+    frames = np.concatenate([silence(20), tone(20), noise(20), tone(20, level=0.01)]).reshape(-1, FRAME)
+    # A quiet tone is still speech-like (low ZCR); hiss at a similar level is not
+    assert voiced_frames(frames).tolist() == [False, True, False, True]
+
+
+def test_silence_and_noise_make_no_segments():
+    assert segments(pcm(silence(2000))) == []
+    assert segments(pcm(noise(2000))) == []
+
+
+def test_tone_burst_with_preroll_and_hangover():
+    found = segments(pcm(silence(500), tone(1000), silence(1000)))
+    assert len(found) == 1
+    # The preroll (which holds the frames that opened the segment) plus the rest
+    # of the burst; the hangover's trailing silence is trimmed off
+    assert ms(found[0]) == audio.PREROLL_MS - audio.START_MS + 1000
+    lead = RATE * (audio.PREROLL_MS - audio.START_MS) // 1000
+    assert not found[0][:lead].any()
+    assert np.array_equal(found[0][lead:], tone(1000))
+
+
+def test_pause_shorter_than_hangover_keeps_one_segment():
+    found = segments(pcm(silence(500), tone(400), silence(audio.HANGOVER_MS // 2), tone(400), silence(1000)))
+    assert len(found) == 1
+    found = segments(pcm(silence(500), tone(400), silence(audio.HANGOVER_MS * 2), tone(400), silence(1000)))
+    assert len(found) == 2
+
+
+def test_clicks_are_dropped():
+    # Too short to open a segment
+    assert segments(pcm(silence(500), tone(audio.START_MS - audio.FRAME_MS), silence(1000))) == []
+    # Opens one, but with no preroll behind it the segment stays under MIN_SEGMENT_MS
+    assert segments(pcm(tone(audio.MIN_SEGMENT_MS - 2 * audio.FRAME_MS), silence(1000))) == []
+
+
+def test_long_speech_is_cut_at_max_segment():
+    found = segments(pcm(tone(audio.MAX_SEGMENT_S * 1000 + 1000), silence(1000)))
+    assert [ms(s) for s in found] == [audio.MAX_SEGMENT_S * 1000, 1000]
+
+
+def test_flush_returns_the_open_segment():
+    segmenter = VoiceSegmenter(RATE)
+    assert segmenter.feed(pcm(silence(300), tone(800))) == []
+    [segment] = segmenter.flush()
+    assert ms(segment) == audio.PREROLL_MS - audio.START_MS + 800
+    assert segmenter.flush() == []
+
+
+@pytest.mark.parametrize('chunk', [1, 333, 640, 4097])
+def test_chunk_boundaries_do_not_matter(chunk):
+    data = pcm(silence(300), noise(200), tone(700), silence(600), tone(500), silence(800))
+    whole = segments(data)
+    split = segments(data, chunk)
+    assert len(whole) == 2
+    assert len(split) == len(whole)
+    assert all(np.array_equal(a, b) for a, b in zip(whole, split))
+
+
+# ============================================
+# WAKE GATING & STREAMS
+# ============================================
+
+PHRASES = ('hey diya',)
+
+
+def test_wake_gate():
+    gate = WakeGate(window=0.2)
+    assert not gate.admit('open youtube', PHRASES)
+    assert gate.admit('hey diya open youtube', PHRASES)
+    assert not gate.admit('what time is it', PHRASES)      # a full command doesn't open the window
+    assert gate.admit('hey diya', PHRASES)
+    assert gate.admit('what time is it', PHRASES)          # the command right after a bare wake
+    assert not gate.admit('and the weather', PHRASES)      # ...and only that one
+    assert gate.admit('hey diya', PHRASES)
+    time.sleep(0.3)
+    assert not gate.admit('what time is it', PHRASES)      # the window ran out
+
+
+def ingest_with(asr, heard=None):
+    def on_transcript(stream, text):
+        if not stream.gate.admit(text.lower(), PHRASES):
+            return None
+        if heard is not None:
+            heard.append(text)
+        return {'response': text}
+
+    ingest = AudioIngest(on_transcript, lambda: ('fake', ''))
+    ingest.asr, ingest.asr_config = asr, ('fake', '')
+    return ingest
+
+
+def test_stream_runs_transcripts_through_the_wake_window():
+    asr = FakeASR(['hey diya', 'what time is it', 'open youtube', 'hey diya play some music'])
+    ingest = ingest_with(asr)
+    ingest.pool = ThreadPoolExecutor(max_workers=1)    # FakeASR answers in call order
+    stream = ingest.open_stream(RATE)
+    burst = pcm(tone(500), silence(800))
+
+    delivered = []
+    futures = [stream.submit(s, delivered.append) for s in stream.feed(burst * 4)]
+    futures += [stream.submit(s, delivered.append) for s in stream.segmenter.flush()]
+    events = [f.result(timeout=5) for f in futures]
+
+    assert [e['transcript'] for e in events] == ['hey diya', 'what time is it', 'open youtube',
+                                                 'hey diya play some music']
+    assert [e['ignored'] for e in events] == [False, False, True, False]
+    assert events[1]['result'] == {'response': 'what time is it'}
+    assert delivered == events
+    # Every burst after the first carries the silence of its preroll
+    lead = (audio.PREROLL_MS - audio.START_MS) / 1000
+    assert asr.segments == [0.5] + [0.5 + lead] * 3
+    assert ingest.stats['commands'] == 3 and ingest.stats['ignored'] == 1
+
+
+class SlowFirstASR:
+    """Names a segment by its length (with preroll); the longer the segment, the slower the answer."""
+
+    def transcribe(self, samples, rate):
+        seconds = round(len(samples) / rate, 2)
+        time.sleep(seconds / 5)
+        return {0.9: 'hey diya', 0.64: 'open youtube', 0.44: 'hey diya what time is it'}[seconds]
+
+
+def test_commands_run_in_order_while_transcription_overlaps():
+    heard = []
+    ingest = ingest_with(SlowFirstASR(), heard)
+    stream = ingest.open_stream(RATE)
+    data = pcm(tone(900), silence(800), tone(500), silence(800), tone(300), silence(800))
+
+    futures = [stream.submit(s) for s in stream.feed(data)]
+    events = [f.result(timeout=5) for f in futures]
+
+    # The wake gate saw the bare wake first, so "open youtube" was admitted
+    assert heard == ['hey diya', 'open youtube', 'hey diya what time is it']
+    assert [e['ignored'] for e in events] == [False, False, False]
@@ -0,0 +1,67 @@
+import os
+import time
+
+import pytest
+
+import history
+from history import HistoryLog
+
+
+@pytest.fixture
+def fast(monkeypatch):
+    monkeypatch.setattr(history, 'FLUSH_INTERVAL', 0.01)
+
+
+def fill(log, n, start=0):
+    for i in range(start, start + n):
+        log.record('weather', 10.0, upstream='weather', query=f'city {i}', ts=1000.0 + i)
+        time.sleep(0.002)   # several batches, so rollovers happen along the way
+
+
+def test_rollover_keeps_max_segments(tmp_path, fast):
+    log = HistoryLog(str(tmp_path), segment_records=10, max_segments=3, max_age=0)
+    fill(log, 95)
+    time.sleep(0.5)
+    assert len(log.segments()) <= 3
+    kept = list(log.iter_records())
+    # Only the newest records survive, and every one still resolves
+    assert kept and kept[-1][0] == 1094.0
+    assert kept[0][0] > 1000.0
+    stats = log.stats()
+    assert stats['intents'] == {'weather': len(kept)}
+    assert all(q['query'].startswith('city ') for q in stats['top_queries'])
+
+
+def test_old_segments_expire(tmp_path, fast):
+    log = HistoryLog(str(tmp_path), segment_records=10, max_segments=0, max_age=60)
+    fill(log, 30)
+    time.sleep(0.5)
+    before = log.segments()
+    for path in before[:2]:
+        os.utime(path, (time.time() - 120, time.time() - 120))
+    fill(log, 20, start=30)    # two more rollovers apply retention
+    time.sleep(0.5)
+    after = log.segments()
+    assert not set(before[:2]) & set(after)
+    assert set(before[2:]) <= set(after)
+
+
+def test_strings_are_compacted(tmp_path, fast, monkeypatch):
+    monkeypatch.setattr(history, 'STRINGS_MAX_BYTES', 200)
+    log = HistoryLog(str(tmp_path), segment_records=10, max_segments=2, max_age=0)
+    fill(log, 5)
+    time.sleep(0.3)
+    other = HistoryLog(str(tmp_path))    # another worker, reading the table as it was
+    assert other.top_queries('weather', k=100)
+    fill(log, 55, start=5)
+    time.sleep(0.5)
+    with open(log.strings_file, encoding='utf-8') as f:
+        texts = {line.rstrip('\n').split('\t', 1)[1] for line in f}
+    # Queries of deleted segments are gone; everything still on disk resolves
+    assert 'city 0' not in texts
+    assert {'weather', 'city 59'} <= texts
+    assert log.top_queries('weather', k=100)
+    assert all(q.startswith('city ') for q in log.top_queries('weather', k=100))
+
+    # The other worker notices the rewritten file and reads it from the start
+    assert other.top_queries('weather', k=100) == log.top_queries('weather', k=100)
@@ -0,0 +1,33 @@
+import pytest
+
+from normalize import normalize
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('open gaana', 'open gaana'),
+    ('tata consultancy stock', 'tata consultancy stock'),
+    ('jama masjid history', 'jama masjid history'),
+    ('kal ho naa ho', 'kal ho naa ho'),
+    ('kitne baje hain', 'what time hain'),
+    ('मौसम कैसा है?', 'weather kaisa hai'),
+    ('calculate five plus 3', 'calculate 5 plus 3'),
+    ('how do you do', 'how do you do'),
+    ('tata', 'bye'),
+])
+def test_english_keeps_names(text, expected):
+    assert normalize(text, 'en') == expected
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('kal ka mausam', 'tomorrow ka weather'),
+    ('aaj ki tarikh kya hai', 'today ki date what hai'),
+    ('do jama teen', '2 plus 3'),
+    ('das bhaag do', '10 divided by 2'),
+    ('jama masjid history', 'jama masjid history'),
+    ('tata consultancy stock', 'tata consultancy stock'),
+    ('open gaana', 'open gaana'),
+    ('hey diya open gaana', 'hey diya open gaana'),
+    ('kal ho naa ho bajao', 'play kal ho naa ho'),
+])
+def test_hindi_aliases_stay_out_of_slots(text, expected):
+    assert normalize(text, 'hi') == expected
@@ -0,0 +1,100 @@
+import time
+import threading
+
+import pytest
+
+import main
+from shared_cache import RedisCache, SqliteCache
+
+
+@pytest.fixture(params=['sqlite', 'redis'])
+def backend(request, tmp_path):
+    if request.param == 'redis':
+        fakeredis = pytest.importorskip('fakeredis')
+        return RedisCache(fakeredis.FakeRedis(server=fakeredis.FakeServer()))
+    return SqliteCache(str(tmp_path / 'cache.sqlite3'))
+
+
+@pytest.fixture
+def tiers(backend, monkeypatch):
+    """main's L1 (empty) in front of the backend as its L2."""
+    monkeypatch.setattr(main, 'shared_cache', backend)
+    monkeypatch.setattr(main, 'upstream_cache', {})
+    return backend
+
+
+def test_get_set(backend):
+    expires = time.time() + 60
+    assert backend.get('weather:pune') is None
+    backend.set('weather:pune', {'temp': 31, 'city': 'Pune'}, expires)
+    assert backend.get('weather:pune') == (expires, {'temp': 31, 'city': 'Pune'})
+    backend.set('weather:pune', {'temp': 29}, expires)
+    assert backend.get('weather:pune')[1] == {'temp': 29}
+
+
+def test_ttl_expiry(backend):
+    backend.set('youtube:lofi', ['a'], time.time() + 0.2)
+    backend.set('youtube:old', ['b'], time.time() - 1)
+    assert backend.get('youtube:lofi') is not None
+    assert backend.get('youtube:old') is None
+    time.sleep(0.3)
+    assert backend.get('youtube:lofi') is None
+
+
+def test_l1_keeps_the_shared_expiry(tiers):
+    main.cache_set('weather', 'pune', {'temp': 31})
+    expires = tiers.get('weather:pune')[0]
+    assert main.upstream_cache[('weather', 'pune')][0] == expires
+
+    # Another process: empty L1, filled from L2 with L2's expiry rather than a fresh TTL
+    main.upstream_cache.clear()
+    assert main.cache_get('weather', 'pune') == {'temp': 31}
+    assert main.upstream_cache[('weather', 'pune')][0] == expires
+    assert main.cache_ttl_left('weather', 'pune') <= main.CACHE_TTL['weather']
+
+
+def test_l1_entry_expires_with_l2(tiers):
+    tiers.set('weather:agra', {'temp': 40}, time.time() + 0.2)
+    assert main.cache_get('weather', 'agra') == {'temp': 40}
+    time.sleep(0.3)
+    assert main.cache_get('weather', 'agra') is None
+    assert main.cache_ttl_left('weather', 'agra') == 0.0
+
+
+def test_fill_lock(backend):
+    token = backend.acquire('weather:pune', 5)
+    assert token
+    assert backend.acquire('weather:pune', 5) is None
+    assert backend.acquire('weather:agra', 5)        # locks are per key
+    backend.release('weather:pune', 'not-the-holder')
+    assert backend.acquire('weather:pune', 5) is None
+    backend.release('weather:pune', token)
+    assert backend.acquire('weather:pune', 5)
+
+
+def test_fill_lock_lease_expires(backend):
+    assert backend.acquire('weather:pune', 0.2)
+    assert backend.acquire('weather:pune', 0.2) is None
+    time.sleep(0.3)
+    assert backend.acquire('weather:pune', 5)    # a crashed holder doesn't block the key for good
+
+
+def test_one_fill_per_key(tiers):
+    calls = []
+
+    def loader():
+        calls.append(1)
+        time.sleep(0.2)
+        return {'temp': 31}, True
+
+    # _shared_fill is the cross-process step, so no in-process coalescing helps here
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(main._shared_fill('weather', 'pune', loader, False)))
+               for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert calls == [1]
+    assert results == [{'temp': 31}] * 6
+    assert tiers.acquire('weather:pune', 5)    # released after the fill
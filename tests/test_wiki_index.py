@@ -0,0 +1,79 @@
+import os
+
+import pytest
+
+import wiki_index
+from wiki_index import WikiIndex, build_index
+
+FIXTURES = os.path.join(os.path.dirname(__file__), 'fixtures')
+DUMP = os.path.join(FIXTURES, 'wiki_sample.xml')
+CORPUS = os.path.join(FIXTURES, 'wiki_sample.jsonl')
+
+
+@pytest.fixture(params=['zlib', 'zstd'])
+def codec(request, monkeypatch):
+    if request.param == 'zstd':
+        pytest.importorskip('zstandard')
+    else:
+        monkeypatch.setattr(wiki_index, 'zstandard', None)
+    # Tiny blocks and runs, so lookups cross block boundaries and the build merges several runs
+    monkeypatch.setattr(wiki_index, 'BLOCK_ENTRIES', 2)
+    monkeypatch.setattr(wiki_index, 'RUN_ENTRIES', 2)
+    return wiki_index.CODEC_ZSTD if request.param == 'zstd' else wiki_index.CODEC_ZLIB
+
+
+def build(source, tmp_path):
+    out = str(tmp_path / 'wiki.idx')
+    count = build_index(source, out)
+    return count, WikiIndex(out)
+
+
+def test_dump_exact_lookups(codec, tmp_path):
+    count, index = build(DUMP, tmp_path)
+    assert count == 4       # three articles and a redirect; the talk page is skipped
+    with open(tmp_path / 'wiki.idx', 'rb') as f:
+        assert wiki_index.HEADER.unpack(f.read(wiki_index.HEADER.size))[2] == codec
+
+    assert index.lookup('Taj Mahal') == (
+        'Taj Mahal',
+        'The Taj Mahal is an ivory-white marble mausoleum on the right bank of the river Yamuna '
+        'in Agra, India. It was commissioned in 1631 by the fifth Mughal emperor, Shah Jahan. '
+        'It is widely regarded as a masterpiece.'
+    )
+    assert index.lookup('Agra') == (
+        'Agra', 'Agra is a city on the banks of the Yamuna river in Uttar Pradesh, India.'
+    )
+    assert index.lookup('The Beatles') == (
+        'The Beatles', 'The Beatles were an English rock band formed in Liverpool in 1960.'
+    )
+
+
+def test_dump_alias_lookups(codec, tmp_path):
+    _, index = build(DUMP, tmp_path)
+    assert index.lookup('tajmahal')[0] == 'Taj Mahal'        # redirect
+    assert index.lookup('  TAJ   mahal? ')[0] == 'Taj Mahal'  # case, spacing, punctuation
+    assert index.lookup('beatles')[0] == 'The Beatles'       # missing leading article
+    assert index.lookup('the agra')[0] == 'Agra'             # extra leading article
+
+
+def test_dump_misses(codec, tmp_path):
+    _, index = build(DUMP, tmp_path)
+    assert index.lookup('Talk:Taj Mahal') is None
+    assert index.lookup('Mumbai') is None
+    assert index.lookup('') is None
+
+
+def test_corpus_lookups(codec, tmp_path):
+    count, index = build(CORPUS, tmp_path)
+    assert count == 3       # the empty article and the duplicate key are dropped
+
+    assert index.lookup('Python (programming language)') == (
+        'Python (programming language)', 'Python is a high-level, general-purpose programming language.'
+    )
+    assert index.lookup('python programming language')[0] == 'Python (programming language)'
+    assert index.lookup('QUTUB MINAR') == (
+        'Qutub Minar', 'The Qutub Minar is a minaret and victory tower in Delhi.'
+    )
+    assert index.lookup('the red fort')[1] == 'The Red Fort is a historic fort in Old Delhi.'
+    assert index.lookup('Empty article') is None
+    assert index.lookup('Lotus Temple') is None
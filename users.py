@@ -0,0 +1,324 @@
+"""
+============================================
+DIYA — Per-User Settings
+============================================
+config.json holds the shared defaults. Each
+user's own settings (assistant name, weather
+city, voice...) are a small overlay holding
+only the keys they changed, kept in a keyed
+store so every worker sees them.
+
+Reads go through a Profile: the defaults
+merged with one user's overlay, built once per
+process and cached. A Profile is never
+modified; saving settings builds a new one and
+swaps it in, so reading `config` is a thread-
+local and a dict lookup, with no lock. Things
+derived from a user's settings (wake phrases,
+the template catalogue for their assistant
+name, their weather cache key) are built on
+first use and cached on the Profile, so they
+are dropped along with it.
+
+API keys are stored but never sent back (see
+public_settings): a user id is not a secret.
+
+Workers pick up each other's writes by polling
+the store's change sequence at most every
+CHECK_INTERVAL seconds.
+
+Stores:
+  SqliteOverlays  local file (default)
+  RedisOverlays   any redis-py compatible client
+  MemoryOverlays  this process only (serverless
+                  without Redis)
+============================================
+"""
+
+import os
+import re
+import json
+import time
+import sqlite3
+import threading
+from collections.abc import Mapping
+
+from logs import log
+
+# Settings a user may override; the rest (profiling, ASR, budgets...) are server-wide
+USER_KEYS = (
+    'assistant_name', 'weather_city', 'weather_api_key', 'youtube_api_key',
+    'voice_speed', 'voice_volume', 'language',
+)
+# Never sent back to clients: user ids are not authenticated, so anyone could ask for anyone's
+SECRET_KEYS = ('weather_api_key', 'youtube_api_key')
+USER_ID = re.compile(r'^[A-Za-z0-9_.:-]{1,64}$')
+CHECK_INTERVAL = 1.0      # seconds between polls for other workers' writes
+MAX_PROFILES = 4096       # profiles cached per process (oldest dropped first)
+
+MISSING = object()
+
+
+def public_settings(settings):
+    """Settings as clients may see them: secrets replaced by whether they are set (<key>_set)."""
+    public = {k: v for k, v in settings.items() if k not in SECRET_KEYS}
+    for key in SECRET_KEYS:
+        if key in settings:
+            public[key + '_set'] = bool(settings[key])
+    return public
+
+
+# ============================================
+# OVERLAY STORES
+# ============================================
+# get(user) -> (overlay, seq) or None; put(user, overlay) -> seq;
+# changes(since) -> [(user, seq)] written after since; latest() -> seq.
+
+class SqliteOverlays:
+    """Overlays in a local SQLite file (WAL mode, safe across processes)."""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        db = self._connect()
+        db.execute('CREATE TABLE IF NOT EXISTS overlays (user TEXT PRIMARY KEY, data TEXT, seq INTEGER)')
+        db.execute('CREATE INDEX IF NOT EXISTS overlays_seq ON overlays (seq)')
+
+    def _connect(self):
+        # One connection per thread and per process (never reuse one across a fork)
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def get(self, user):
+        row = self._connect().execute('SELECT data, seq FROM overlays WHERE user = ?', (user,)).fetchone()
+        return (json.loads(row[0]), row[1]) if row else None
+
+    def put(self, user, overlay):
+        db = self._connect()
+        # One statement, so the next sequence number is taken under SQLite's write lock
+        db.execute(
+            'INSERT OR REPLACE INTO overlays (user, data, seq) '
+            'VALUES (?, ?, (SELECT COALESCE(MAX(seq), 0) + 1 FROM overlays))',
+            (user, json.dumps(overlay))
+        )
+        return db.execute('SELECT seq FROM overlays WHERE user = ?', (user,)).fetchone()[0]
+
+    def changes(self, since):
+        return self._connect().execute('SELECT user, seq FROM overlays WHERE seq > ?', (since,)).fetchall()
+
+    def latest(self):
+        return self._connect().execute('SELECT COALESCE(MAX(seq), 0) FROM overlays').fetchone()[0]
+
+
+class RedisOverlays:
+    """Overlays in a Redis hash, with a sorted set of users by write sequence."""
+
+    def __init__(self, client, prefix='diya:users:'):
+        self.client = client
+        self.data_key = prefix + 'overlays'
+        self.seq_key = prefix + 'seq'
+        self.counter_key = prefix + 'counter'
+
+    def get(self, user):
+        raw = self.client.hget(self.data_key, user)
+        if raw is None:
+            return None
+        return json.loads(raw), int(self.client.zscore(self.seq_key, user) or 0)
+
+    def put(self, user, overlay):
+        seq = self.client.incr(self.counter_key)
+        pipe = self.client.pipeline()
+        pipe.hset(self.data_key, user, json.dumps(overlay))
+        pipe.zadd(self.seq_key, {user: seq})
+        pipe.execute()
+        return seq
+
+    def changes(self, since):
+        rows = self.client.zrangebyscore(self.seq_key, f'({since}', '+inf', withscores=True)
+        return [(u.decode() if isinstance(u, bytes) else u, int(seq)) for u, seq in rows]
+
+    def latest(self):
+        return int(self.client.get(self.counter_key) or 0)
+
+
+class MemoryOverlays:
+    """Overlays kept in this process only."""
+
+    def __init__(self):
+        self.rows = {}
+        self.seq = 0
+        self.lock = threading.Lock()
+
+    def get(self, user):
+        return self.rows.get(user)
+
+    def put(self, user, overlay):
+        with self.lock:
+            self.seq += 1
+            self.rows[user] = (dict(overlay), self.seq)
+            return self.seq
+
+    def changes(self, since):
+        return [(user, seq) for user, (_, seq) in list(self.rows.items()) if seq > since]
+
+    def latest(self):
+        return self.seq
+
+
+def open_overlay_store(path, redis_url=None):
+    """Redis when a URL is configured and redis-py is installed, else SQLite (or memory without a path)."""
+    if redis_url:
+        try:
+            import redis    # only when configured: redis-py is slow to import
+        except ImportError:
+            redis = None
+        if redis is not None:
+            return RedisOverlays(redis.Redis.from_url(redis_url))
+    return SqliteOverlays(path) if path else MemoryOverlays()
+
+
+# ============================================
+# PROFILES
+# ============================================
+
+class Profile:
+    """One user's merged settings (defaults + overlay) and what has been derived from them."""
+
+    __slots__ = ('user', 'overlay', 'settings', 'seq', 'derived')
+
+    def __init__(self, user, overlay, base, seq=0):
+        self.user = user
+        self.overlay = overlay
+        self.settings = {**base, **overlay}
+        self.seq = seq
+        self.derived = {}
+
+    def derive(self, name, build):
+        """build(settings), computed once per profile (a race just builds it twice)."""
+        value = self.derived.get(name, MISSING)
+        if value is MISSING:
+            value = self.derived[name] = build(self.settings)
+        return value
+
+
+class ActiveConfig(Mapping):
+    """The config as the user on this thread sees it (the defaults when there is none)."""
+
+    __slots__ = ('_users',)
+
+    def __init__(self, users):
+        self._users = users
+
+    def __getitem__(self, key):
+        return self._users.current().settings[key]
+
+    def get(self, key, default=None):
+        return self._users.current().settings.get(key, default)
+
+    def __iter__(self):
+        return iter(self._users.current().settings)
+
+    def __len__(self):
+        return len(self._users.current().settings)
+
+
+class UserSettings:
+    """Per-user overlays on shared defaults, read through cached per-user Profiles."""
+
+    def __init__(self, store, base):
+        self.store = store
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.base = dict(base)
+        self.default = Profile('', {}, self.base)
+        self.profiles = {}
+        self.seen = store.latest()
+        self.next_check = time.monotonic() + CHECK_INTERVAL
+        self.config = ActiveConfig(self)
+
+    def activate(self, user):
+        """Make `config` read user's settings on this thread (no or an invalid id: the defaults)."""
+        self.local.profile = self.profile(user)
+
+    def current(self):
+        return getattr(self.local, 'profile', None) or self.default
+
+    def profile(self, user):
+        if not user or not USER_ID.match(user):
+            return self.default
+        self.sync()
+        profile = self.profiles.get(user)
+        return profile if profile is not None else self._load(user)
+
+    def _load(self, user):
+        row = self.store.get(user)
+        overlay, seq = row if row else ({}, 0)
+        profile = Profile(user, overlay, self.base, seq)
+        with self.lock:
+            current = self.profiles.get(user)
+            if current is not None and current.seq >= seq:
+                return current   # someone cached the same or a newer one meanwhile
+            if len(self.profiles) >= MAX_PROFILES:
+                self.profiles.pop(next(iter(self.profiles)), None)
+            self.profiles[user] = profile
+        return profile
+
+    def update(self, user, changes):
+        """
+        Apply changes to user's overlay and return their new Profile.
+        Keys equal to the default are left out, so they keep following it;
+        keys that aren't USER_KEYS are ignored.
+        """
+        overlay = dict(self.profile(user).overlay)
+        for key, value in changes.items():
+            if key not in USER_KEYS:
+                continue
+            if value == self.base.get(key):
+                overlay.pop(key, None)
+            else:
+                overlay[key] = value
+        seq = self.store.put(user, overlay)
+        profile = Profile(user, overlay, self.base, seq)
+        with self.lock:
+            self.profiles[user] = profile
+        if self.current().user == user:
+            self.local.profile = profile
+        return profile
+
+    def sync(self):
+        """Drop cached profiles other workers have changed (polls at most every CHECK_INTERVAL)."""
+        now = time.monotonic()
+        if now < self.next_check:
+            return
+        self.next_check = now + CHECK_INTERVAL
+        try:
+            changes = self.store.changes(self.seen)
+        except Exception as e:
+            log.warning('profile_sync_error', error=str(e))
+            return
+        with self.lock:
+            for user, seq in changes:
+                profile = self.profiles.get(user)
+                if profile is not None and profile.seq < seq:
+                    del self.profiles[user]
+                self.seen = max(self.seen, seq)
+
+    def rebase(self, base):
+        """New shared defaults: every profile is rebuilt on its next use."""
+        with self.lock:
+            self.base = dict(base)
+            self.default = Profile('', {}, self.base)
+            self.profiles = {}
+
+    def active(self):
+        """The defaults plus every cached profile (users seen recently by this process)."""
+        return [self.default] + list(self.profiles.values())
+
+    def snapshot(self):
+        return {'cached_profiles': len(self.profiles), 'seq': self.seen}
@@ -0,0 +1,336 @@
+"""
+============================================
+DIYA — Offline Wikipedia Index
+============================================
+Compact on-disk index of article titles and
+lead paragraphs, so "who is / tell me about"
+can be answered without a network connection.
+
+Build one from a MediaWiki XML dump (.xml or
+.xml.bz2), a JSONL corpus ({"title", "text"})
+or a TSV file (title<TAB>text):
+
+  python wiki_index.py build enwiki-pages-articles.xml.bz2 data/wiki.idx
+  python wiki_index.py lookup data/wiki.idx "Taj Mahal"
+
+File layout: sorted entries packed into
+compressed blocks (zstd if installed, else
+zlib), followed by a block table holding each
+block's first key. Lookups bisect the block
+table in memory and decompress one block from
+the memory-mapped file.
+============================================
+"""
+
+import os
+import re
+import sys
+import bz2
+import json
+import mmap
+import zlib
+import heapq
+import struct
+import bisect
+import tempfile
+import threading
+from collections import OrderedDict
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+MAGIC = b'DIYAWIKI'
+HEADER = struct.Struct('<8sBBxxIQ')      # magic, version, codec, block count, table offset
+BLOCK_REF = struct.Struct('<QIH')        # offset, length, first-key length
+VERSION = 1
+CODEC_ZLIB = 0
+CODEC_ZSTD = 1
+
+BLOCK_ENTRIES = 64          # entries per compressed block
+RUN_ENTRIES = 200000        # entries sorted in memory per temporary run while building
+SUMMARY_CHARS = 600
+BLOCK_CACHE_SIZE = 256      # decompressed blocks kept per reader
+
+
+def normalize_title(title):
+    """Lookup key: lowercase, punctuation stripped, whitespace collapsed."""
+    return ' '.join(re.sub(r'[^\w\s]', ' ', title.lower()).split())
+
+
+# ============================================
+# WIKITEXT → LEAD PARAGRAPH
+# ============================================
+
+def _strip_templates(text):
+    """Remove {{...}} and {|...|} blocks, which may nest."""
+    out, depth, i = [], 0, 0
+    while i < len(text):
+        pair = text[i:i + 2]
+        if pair in ('{{', '{|'):
+            depth += 1
+            i += 2
+        elif pair in ('}}', '|}') and depth:
+            depth -= 1
+            i += 2
+        else:
+            if not depth:
+                out.append(text[i])
+            i += 1
+    return ''.join(out)
+
+
+def lead_paragraph(wikitext):
+    """Plain-text lead section of an article, trimmed to a few sentences."""
+    text = wikitext.split('\n==', 1)[0]
+    text = _strip_templates(text)
+    text = re.sub(r'<ref[^>/]*/>|<ref[^>]*>.*?</ref>', '', text, flags=re.S)
+    text = re.sub(r'<!--.*?-->|<[^>]+>', '', text, flags=re.S)
+    text = re.sub(r'\[\[(?:File|Image|Category):[^\]]*(?:\[\[[^\]]*\]\][^\]]*)*\]\]', '', text, flags=re.I)
+    text = re.sub(r'\[\[(?:[^|\]]*\|)?([^\]]*)\]\]', r'\1', text)
+    text = re.sub(r'\[https?://\S+\s*([^\]]*)\]', r'\1', text)
+    text = text.replace("'''", '').replace("''", '')
+
+    paragraphs = [p.strip() for p in text.split('\n\n') if p.strip()]
+    if not paragraphs:
+        return ''
+    lead = ' '.join(paragraphs[0].split())
+    sentences = re.split(r'(?<=[.!?])\s+', lead)
+    return ' '.join(sentences[:3])[:SUMMARY_CHARS]
+
+
+# ============================================
+# SOURCE READERS
+# ============================================
+
+def read_mediawiki_xml(path):
+    """Yield (title, summary, redirect_target) from a MediaWiki XML dump."""
+    import xml.etree.ElementTree as ET
+    opener = bz2.open if path.endswith('.bz2') else open
+    with opener(path, 'rb') as f:
+        title = redirect = None
+        for event, elem in ET.iterparse(f, events=('end',)):
+            tag = elem.tag.rsplit('}', 1)[-1]
+            if tag == 'title':
+                title = elem.text or ''
+            elif tag == 'redirect':
+                redirect = elem.get('title')
+            elif tag == 'ns' and elem.text != '0':
+                title = None    # not an article (talk, user, template pages...)
+            elif tag == 'text' and title:
+                if redirect:
+                    yield title, '', redirect
+                else:
+                    summary = lead_paragraph(elem.text or '')
+                    if summary:
+                        yield title, summary, None
+            elif tag == 'page':
+                title = redirect = None
+                elem.clear()
+
+
+def read_corpus(path):
+    """Yield (title, summary, redirect_target) from a JSONL or TSV corpus."""
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.rstrip('\n')
+            if not line:
+                continue
+            if path.endswith(('.jsonl', '.json')):
+                doc = json.loads(line)
+                title, text = doc.get('title', ''), doc.get('summary') or doc.get('text', '')
+            else:
+                title, _, text = line.partition('\t')
+            summary = ' '.join(text.split())[:SUMMARY_CHARS]
+            if title and summary:
+                yield title, summary, None
+
+
+def read_source(path):
+    if path.endswith(('.xml', '.xml.bz2')):
+        return read_mediawiki_xml(path)
+    return read_corpus(path)
+
+
+# ============================================
+# BUILDING
+# ============================================
+
+def _clean(text):
+    return ' '.join(text.replace('\t', ' ').split())
+
+
+def _entry_line(title, summary, redirect):
+    """One entry as a TSV line: key, title, then the summary or '>' + redirect target."""
+    body = '>' + _clean(redirect) if redirect else _clean(summary)
+    return f"{normalize_title(title)}\t{_clean(title)}\t{body}\n"
+
+
+def _sorted_runs(entries, workdir):
+    """Spill entries into sorted temporary runs (external sort for large dumps)."""
+    runs, batch = [], []
+
+    def spill():
+        batch.sort()
+        path = os.path.join(workdir, f'run{len(runs)}.tsv')
+        with open(path, 'w', encoding='utf-8') as f:
+            f.writelines(batch)
+        runs.append(path)
+        batch.clear()
+
+    for title, summary, redirect in entries:
+        if normalize_title(title):
+            batch.append(_entry_line(title, summary, redirect))
+            if len(batch) >= RUN_ENTRIES:
+                spill()
+    if batch:
+        spill()
+    return runs
+
+
+def _compressor():
+    if zstandard is not None:
+        cctx = zstandard.ZstdCompressor(level=10)
+        return CODEC_ZSTD, cctx.compress
+    return CODEC_ZLIB, lambda data: zlib.compress(data, 9)
+
+
+def build_index(source, out_path):
+    """Build an index file from a dump/corpus. Returns the number of entries."""
+    codec, compress = _compressor()
+    refs, count = [], 0
+
+    with tempfile.TemporaryDirectory() as workdir:
+        runs = _sorted_runs(read_source(source), workdir)
+        files = [open(p, encoding='utf-8') for p in runs]
+        tmp_out = out_path + '.tmp'
+        os.makedirs(os.path.dirname(os.path.abspath(out_path)), exist_ok=True)
+        try:
+            with open(tmp_out, 'wb') as out:
+                out.write(HEADER.pack(MAGIC, VERSION, codec, 0, 0))
+                block, last_key = [], None
+
+                def flush():
+                    data = compress(''.join(block).encode('utf-8'))
+                    first_key = block[0].split('\t', 1)[0].encode('utf-8')
+                    refs.append((out.tell(), len(data), first_key))
+                    out.write(data)
+                    block.clear()
+
+                for line in heapq.merge(*files):
+                    key = line.split('\t', 1)[0]
+                    if key == last_key:
+                        continue    # first title wins for duplicate keys
+                    last_key = key
+                    block.append(line)
+                    count += 1
+                    if len(block) >= BLOCK_ENTRIES:
+                        flush()
+                if block:
+                    flush()
+
+                table_offset = out.tell()
+                for offset, length, first_key in refs:
+                    out.write(BLOCK_REF.pack(offset, length, len(first_key)))
+                    out.write(first_key)
+                out.seek(0)
+                out.write(HEADER.pack(MAGIC, VERSION, codec, len(refs), table_offset))
+            os.replace(tmp_out, out_path)
+        finally:
+            for f in files:
+                f.close()
+            if os.path.exists(tmp_out):
+                os.remove(tmp_out)
+    return count
+
+
+# ============================================
+# LOOKUPS
+# ============================================
+
+class WikiIndex:
+    """Read-only, memory-mapped view of an index file."""
+
+    def __init__(self, path):
+        self._file = open(path, 'rb')
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, codec, blocks, table_offset = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a DIYA wiki index")
+        if codec == CODEC_ZSTD:
+            if zstandard is None:
+                raise RuntimeError("this index is zstd-compressed; install 'zstandard' to read it")
+            self._decompress = zstandard.ZstdDecompressor().decompress
+        else:
+            self._decompress = zlib.decompress
+
+        self._first_keys, self._refs = [], []
+        pos = table_offset
+        for _ in range(blocks):
+            offset, length, key_len = BLOCK_REF.unpack_from(self._mm, pos)
+            pos += BLOCK_REF.size
+            self._first_keys.append(self._mm[pos:pos + key_len].decode('utf-8'))
+            self._refs.append((offset, length))
+            pos += key_len
+
+        self._blocks = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._refs)
+
+    def _block(self, index):
+        """Decompressed {key: (title, body)} for a block, via a small LRU."""
+        with self._lock:
+            block = self._blocks.get(index)
+            if block is not None:
+                self._blocks.move_to_end(index)
+                return block
+        offset, length = self._refs[index]
+        block = {}
+        for line in self._decompress(self._mm[offset:offset + length]).decode('utf-8').splitlines():
+            key, title, body = line.split('\t', 2)
+            block[key] = (title, body)
+        with self._lock:
+            self._blocks[index] = block
+            if len(self._blocks) > BLOCK_CACHE_SIZE:
+                self._blocks.popitem(last=False)
+        return block
+
+    def _get(self, key):
+        index = bisect.bisect_right(self._first_keys, key) - 1
+        if index < 0:
+            return None
+        return self._block(index).get(key)
+
+    def lookup(self, query):
+        """Return (title, summary) for a query, following one redirect, or None."""
+        key = normalize_title(query)
+        entry = self._get(key)
+        if entry is None and key.startswith(('the ', 'a ', 'an ')):
+            entry = self._get(key.split(' ', 1)[1])
+        if entry is None:
+            entry = self._get('the ' + key)
+        if entry and entry[1].startswith('>'):
+            entry = self._get(normalize_title(entry[1][1:]))
+        if not entry or entry[1].startswith('>'):
+            return None
+        return entry
+
+
+def main(argv):
+    if len(argv) == 3 and argv[0] == 'build':
+        count = build_index(argv[1], argv[2])
+        print(f"Indexed {count} entries into {argv[2]}")
+    elif len(argv) == 3 and argv[0] == 'lookup':
+        hit = WikiIndex(argv[1]).lookup(argv[2])
+        print(f"{hit[0]}: {hit[1]}" if hit else "Not found")
+    else:
+        print(__doc__)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))